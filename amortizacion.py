@@ -0,0 +1,182 @@
+"""
+Cronogramas de amortización de préstamos, período por período.
+
+Sistemas:
+- "frances": cuota fija (interés decreciente, amortización creciente)
+- "aleman": amortización fija (cuota decreciente)
+- "americano": solo intereses y el capital entero en la última cuota (bullet)
+
+Los prepagos (cancelaciones anticipadas) se aplican al final del período
+indicado, después de la cuota. Con reducir="plazo" se mantiene la cuota (o la
+amortización, en el alemán) y el préstamo termina antes; con reducir="cuota"
+se mantiene el plazo y se recalculan las cuotas restantes.
+
+`cronograma()` es un generador: una hipoteca a 360 meses nunca se arma
+completa en memoria (así la sirve /api/calc/amortizacion). `cronograma_array()`
+junta las filas en un array estructurado para análisis o gráficos.
+"""
+from typing import Dict, Iterable, Iterator, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+SISTEMAS = ("frances", "aleman", "americano")
+
+# Campos de cada fila, en el orden de CSV/array
+CAMPOS = ("periodo", "cuota", "interes", "amortizacion", "prepago", "saldo")
+
+AMORTIZACION_DTYPE = np.dtype([("periodo", "i8")] + [(c, "f8") for c in CAMPOS[1:]])
+
+Prepagos = Union[Mapping[int, float], Iterable[Tuple[int, float]]]
+
+
+def _cuota_francesa(saldo: float, tasa_mensual: float, periodos: int) -> float:
+    if tasa_mensual == 0:
+        return saldo / periodos
+    return saldo * tasa_mensual / (1 - (1 + tasa_mensual) ** -periodos)
+
+
+def _normalizar_prepagos(prepagos: Optional[Prepagos]) -> Dict[int, float]:
+    items = prepagos.items() if isinstance(prepagos, Mapping) else (prepagos or ())
+    total: Dict[int, float] = {}
+    for periodo, monto in items:
+        if monto < 0:
+            raise ValueError("Los prepagos no pueden ser negativos")
+        total[int(periodo)] = total.get(int(periodo), 0.0) + float(monto)
+    return total
+
+
+def cronograma(monto: float, tasa_anual: float, meses: int, sistema: str = "frances",
+               prepagos: Optional[Prepagos] = None, reducir: str = "plazo") -> Iterator[Dict]:
+    """
+    Genera el cronograma de amortización fila por fila.
+
+    Args:
+        monto: Monto del préstamo
+        tasa_anual: Tasa de interés anual (ej: 50 para 50%)
+        meses: Plazo en meses
+        sistema: "frances", "aleman" o "americano"
+        prepagos: {periodo: monto} o pares (periodo, monto) de cancelaciones anticipadas
+        reducir: "plazo" o "cuota", qué se acorta después de un prepago
+
+    Yields:
+        Dict con periodo, cuota, interes, amortizacion, prepago y saldo, en centavos:
+        cuota = interes + amortizacion en cada fila y el saldo cierra exactamente en 0
+
+    Raises:
+        ValueError: sistema o modo desconocido, monto/plazo/tasa inválidos
+    """
+    if sistema not in SISTEMAS:
+        raise ValueError(f"Sistema desconocido: {sistema} (opciones: {', '.join(SISTEMAS)})")
+    if reducir not in ("plazo", "cuota"):
+        raise ValueError("reducir debe ser 'plazo' o 'cuota'")
+    if monto <= 0 or meses < 1 or tasa_anual < 0:
+        raise ValueError("El monto y el plazo deben ser positivos y la tasa no negativa")
+
+    tasa_mensual = (tasa_anual / 100) / 12
+    extra = _normalizar_prepagos(prepagos)
+    saldo = round(float(monto), 2)
+    cuota_fija = round(_cuota_francesa(saldo, tasa_mensual, meses), 2)
+    amortizacion_fija = round(saldo / meses, 2)
+
+    for periodo in range(1, meses + 1):
+        restantes = meses - periodo + 1
+        interes = round(saldo * tasa_mensual, 2)
+        if sistema == "frances":
+            amortizacion = cuota_fija - interes
+        elif sistema == "aleman":
+            amortizacion = amortizacion_fija
+        else:
+            amortizacion = 0.0
+        # La última cuota (o la que cancela el saldo antes, tras prepagos) absorbe los centavos
+        if restantes == 1 or amortizacion >= saldo:
+            amortizacion = saldo
+        amortizacion = round(amortizacion, 2)
+        saldo = round(saldo - amortizacion, 2)
+
+        prepago = round(min(extra.get(periodo, 0.0), saldo), 2)
+        saldo = round(saldo - prepago, 2)
+
+        yield {
+            "periodo": periodo,
+            "cuota": round(interes + amortizacion, 2),
+            "interes": interes,
+            "amortizacion": amortizacion,
+            "prepago": prepago,
+            "saldo": saldo,
+        }
+        if saldo <= 0:
+            return
+        if prepago and reducir == "cuota":
+            # Mismo plazo, cuotas más bajas
+            cuota_fija = round(_cuota_francesa(saldo, tasa_mensual, restantes - 1), 2)
+            amortizacion_fija = round(saldo / (restantes - 1), 2)
+
+
+def cronograma_array(monto: float, tasa_anual: float, meses: int, sistema: str = "frances",
+                     prepagos: Optional[Prepagos] = None, reducir: str = "plazo") -> np.ndarray:
+    """
+    Cronograma completo como array estructurado (AMORTIZACION_DTYPE), una fila por período.
+    Mismos argumentos que cronograma().
+    """
+    filas = cronograma(monto, tasa_anual, meses, sistema, prepagos, reducir)
+    return np.fromiter((tuple(f[c] for c in CAMPOS) for f in filas), dtype=AMORTIZACION_DTYPE, count=-1)
+
+
+def resumen(filas: Iterable[Dict]) -> Dict:
+    """Totales de un cronograma: períodos efectivos, total pagado, intereses y prepagos."""
+    periodos, pagado, intereses, prepagos = 0, 0.0, 0.0, 0.0
+    primera = ultima = None
+    for fila in filas:
+        periodos += 1
+        pagado += fila["cuota"] + fila["prepago"]
+        intereses += fila["interes"]
+        prepagos += fila["prepago"]
+        primera = fila["cuota"] if primera is None else primera
+        ultima = fila["cuota"]
+    return {
+        "periodos": periodos,
+        "primera_cuota": primera,
+        "ultima_cuota": ultima,
+        "total_a_pagar": round(pagado, 2),
+        "intereses_totales": round(intereses, 2),
+        "prepagos": round(prepagos, 2),
+    }
+
+
+def resumen_sin_prepagos(monto: float, tasa_anual: float, meses: int, sistema: str = "frances") -> Dict:
+    """
+    Mismos totales que resumen(cronograma(...)) sin prepagos, en O(1) sin importar
+    el plazo (para respuestas del chat). Pueden diferir en centavos del cronograma,
+    que redondea fila por fila.
+
+    Raises:
+        ValueError: sistema desconocido, monto/plazo/tasa inválidos
+    """
+    if sistema not in SISTEMAS:
+        raise ValueError(f"Sistema desconocido: {sistema} (opciones: {', '.join(SISTEMAS)})")
+    if monto <= 0 or meses < 1 or tasa_anual < 0:
+        raise ValueError("El monto y el plazo deben ser positivos y la tasa no negativa")
+
+    tasa_mensual = (tasa_anual / 100) / 12
+    if sistema == "frances":
+        cuota = _cuota_francesa(monto, tasa_mensual, meses)
+        primera = ultima = cuota
+        intereses = cuota * meses - monto
+    elif sistema == "aleman":
+        # Amortización fija: el interés baja en progresión aritmética
+        amortizacion = monto / meses
+        primera = amortizacion + monto * tasa_mensual
+        ultima = amortizacion * (1 + tasa_mensual)
+        intereses = monto * tasa_mensual * (meses + 1) / 2
+    else:
+        primera = monto * tasa_mensual
+        ultima = monto + monto * tasa_mensual
+        intereses = monto * tasa_mensual * meses
+    return {
+        "periodos": meses,
+        "primera_cuota": round(primera, 2),
+        "ultima_cuota": round(ultima, 2),
+        "total_a_pagar": round(monto + intereses, 2),
+        "intereses_totales": round(intereses, 2),
+        "prepagos": 0.0,
+    }
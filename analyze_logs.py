@@ -1,21 +1,27 @@
 """
 Script para analizar logs de interacciones y detectar errores/patrones
-Uso: python analyze_logs.py
+Uso: python analyze_logs.py [ruta] [--since 2024-05-01]
+
+La ruta puede ser el directorio de segmentos (chat_logs/) o un CSV; con
+--since solo se leen los segmentos y bloques desde esa fecha.
 """
-import csv
+import argparse
 import json
 from collections import Counter, defaultdict
 from datetime import datetime
 from pathlib import Path
 
+from log_store import SegmentedLogStore, default_log_source, read_logs
+
 
-def load_logs(csv_path="chat_logs.csv"):
-    """Carga el CSV de logs"""
-    logs = []
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            logs.append(row)
+def load_logs(path=None, since=None):
+    """Carga los logs (segmentos o CSV), opcionalmente desde una fecha"""
+    path = Path(path) if path is not None else default_log_source()
+    if since and path.is_dir():
+        return list(SegmentedLogStore(path).between(start=since))
+    logs = list(read_logs(path))
+    if since:
+        logs = [log for log in logs if log['timestamp'] >= since]
     return logs
 
 
@@ -227,14 +233,17 @@ def main():
     print("🤖 ANÁLISIS DE LOGS - BOT FINANCIERO")
     print("="*80)
     
-    csv_path = Path(__file__).parent / "chat_logs.csv"
+    parser = argparse.ArgumentParser(description="Análisis de logs de interacciones")
+    parser.add_argument("path", nargs="?", default=str(default_log_source()))
+    parser.add_argument("--since", help="solo interacciones desde esta fecha (AAAA-MM-DD[THH:MM])")
+    args = parser.parse_args()
     
-    if not csv_path.exists():
-        print(f"\n❌ No se encontró el archivo: {csv_path}")
+    if not Path(args.path).exists():
+        print(f"\n❌ No se encontró el archivo: {args.path}")
         return
     
     # Cargar logs
-    logs = load_logs(csv_path)
+    logs = load_logs(args.path, since=args.since)
     print(f"\n✅ Cargados {len(logs)} registros de interacciones\n")
     
     # Análisis
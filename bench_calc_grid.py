@@ -0,0 +1,67 @@
+"""
+Microbenchmark de las tablas de sensibilidad: una llamada escalar a
+calcular_interes_compuesto por celda contra calcular_interes_compuesto_lote
+sobre la grilla completa (tasas × plazos × aportes), y el endpoint /api/calc/grid.
+
+Verifica además que ambos caminos den los mismos montos y que el POST por
+defecto (solo el campo principal) de una grilla de 10k celdas quede dentro
+de CALC_GRID_BUDGET_MS.
+
+Uso: python bench_calc_grid.py [REPETICIONES]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from calculators import calcular_interes_compuesto, calcular_interes_compuesto_lote, grilla_calculo
+
+TASAS = np.linspace(1, 40, 20)
+AÑOS = np.arange(1, 31)
+APORTES = np.linspace(0, 90_000, 10)
+CALC_GRID_BUDGET_MS = float(os.getenv("CALC_GRID_BUDGET_MS", "10"))
+PARAMS = {"capital": 100_000, "tasa_anual": TASAS.tolist(), "años": AÑOS.tolist(), "aporte_mensual": APORTES.tolist()}
+
+
+def escalar():
+    return [[[calcular_interes_compuesto(100_000, t, int(a), ap)["monto_final"] for ap in APORTES]
+             for a in AÑOS] for t in TASAS]
+
+
+def lote():
+    return calcular_interes_compuesto_lote(100_000, TASAS[:, None, None], AÑOS[None, :, None], APORTES[None, None, :])
+
+
+def timeit(fn, reps):
+    start = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - start) / reps * 1e3
+
+
+def main():
+    reps = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    celdas = TASAS.size * AÑOS.size * APORTES.size
+    np.testing.assert_allclose(lote()["monto_final"], escalar(), rtol=1e-12, atol=0.011)
+
+    print(f"grilla {TASAS.size}×{AÑOS.size}×{APORTES.size} = {celdas} celdas")
+    print(f"  escalar (una llamada por celda) {timeit(escalar, max(reps // 10, 1)):8.2f} ms")
+    print(f"  calcular_interes_compuesto_lote {timeit(lote, reps):8.2f} ms")
+
+    grande = dict(PARAMS, tasa_anual=np.linspace(1, 40, 40).tolist(), años=np.arange(1, 26).tolist())
+    print("grilla 40×25×10 = 10000 celdas")
+    print(f"  grilla_calculo                  {timeit(lambda: grilla_calculo('interes_compuesto', grande), reps):8.2f} ms")
+
+    from web_app import app
+    with app.test_client() as c:
+        default = timeit(lambda: c.post('/api/calc/grid', json={'params': grande}), reps)
+        print(f"  POST /api/calc/grid (por defecto) {default:6.2f} ms")
+        body = {"params": grande, "campos": list(lote().dtype.names)}
+        print(f"  POST /api/calc/grid (4 campos)    "
+              f"{timeit(lambda: c.post('/api/calc/grid', json=body), reps):6.2f} ms")
+    assert default < CALC_GRID_BUDGET_MS, f"/api/calc/grid por defecto: {default:.2f} ms > {CALC_GRID_BUDGET_MS} ms"
+
+
+if __name__ == "__main__":
+    main()
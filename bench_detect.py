@@ -0,0 +1,84 @@
+"""
+Benchmark de detección sobre mensajes libres de ~200 caracteres.
+
+Compara la etapa de coincidencia aproximada anterior (SequenceMatcher por cada
+par palabra × keyword) contra el índice por borrados de IntentLexicon, y mide
+el tiempo total de ChatBot.detect.
+
+Uso: python bench_detect.py [N_MENSAJES]
+"""
+import random
+import sys
+import time
+
+from chatbot_core import ChatBot, INTENT_LEXICON, STOP_WORDS, normalize_text
+
+VOCAB = [
+    "hola", "che", "quiero", "tengo", "mucha", "plata", "ahorrarr", "inverir", "presupusto",
+    "deudas", "tarjta", "mensualidad", "sueldo", "familia", "gastos", "viaje", "necesito",
+    "organizarme", "mejor", "porque", "cuando", "siempre", "termino", "debiendo", "banco",
+    "cuotas", "interes", "rendimento", "fondos", "comprar", "departamento", "ayudame",
+    "entender", "como", "hago", "para", "llegar", "fin", "de", "mes", "sin", "problemas",
+]
+
+
+def make_message(rng: random.Random, size: int = 200) -> str:
+    words = []
+    while sum(len(w) + 1 for w in words) < size:
+        words.append(rng.choice(VOCAB))
+    return " ".join(words)[:size]
+
+
+def legacy_fuzzy(bot: ChatBot, text: str) -> int:
+    """Etapa aproximada anterior: SequenceMatcher contra todas las keywords."""
+    words = [w for w in normalize_text(text).split() if w not in STOP_WORDS and len(w) > 2]
+    hits = 0
+    for keywords in INTENT_LEXICON.keywords.values():
+        for keyword in keywords:
+            for word in words:
+                if len(word) > 3 and bot.similarity(word, keyword) > 0.85:
+                    hits += 1
+    return hits
+
+
+def indexed_fuzzy(bot: ChatBot, text: str) -> int:
+    """Etapa aproximada actual: candidatos del índice + mismo umbral."""
+    words = [w for w in normalize_text(text).split() if w not in STOP_WORDS and len(w) > 2]
+    hits = 0
+    for word in words:
+        if len(word) > 3:
+            for keyword in INTENT_LEXICON.fuzzy.lookup(word):
+                if bot.similarity(word, keyword) > 0.85:
+                    hits += 1
+    return hits
+
+
+def timeit(fn, bot, messages):
+    start = time.perf_counter()
+    for m in messages:
+        fn(bot, m)
+    return (time.perf_counter() - start) / len(messages) * 1e3
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = random.Random(42)
+    messages = [make_message(rng) for _ in range(n)]
+    bot = ChatBot()
+
+    legacy = timeit(legacy_fuzzy, bot, messages)
+    INTENT_LEXICON.fuzzy.lookup.cache_clear()
+    indexed_cold = timeit(indexed_fuzzy, bot, messages)
+    indexed_warm = timeit(indexed_fuzzy, bot, messages)
+    INTENT_LEXICON.fuzzy.lookup.cache_clear()
+    detect = timeit(lambda b, m: b.detect(m), bot, messages)
+
+    print(f"Mensajes: {n} x {len(messages[0])} caracteres")
+    print(f"Etapa aproximada (SequenceMatcher x keywords): {legacy:8.3f} ms/mensaje")
+    print(f"Etapa aproximada (índice, caché fría):         {indexed_cold:8.3f} ms/mensaje")
+    print(f"Etapa aproximada (índice, caché caliente):     {indexed_warm:8.3f} ms/mensaje")
+    print(f"ChatBot.detect completo:                       {detect:8.3f} ms/mensaje")
+
+
+if __name__ == "__main__":
+    main()
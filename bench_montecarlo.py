@@ -0,0 +1,44 @@
+"""
+Benchmark del simulador Monte Carlo (montecarlo.py): 10.000 caminos × 480 meses
+(jubilación a 40 años) en serie y con el pool de procesos, verificando que con la
+misma semilla ambos den el mismo resultado.
+
+Uso: python bench_montecarlo.py [CAMINOS] [MESES]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from montecarlo import MONTECARLO_PROCESOS, simular_montecarlo
+
+
+def correr(caminos, meses, procesos):
+    start = time.perf_counter()
+    r = simular_montecarlo(0, 50_000, meses, rendimiento_anual=12, volatilidad_anual=15,
+                           inflacion_anual=30, volatilidad_inflacion=8, caminos=caminos,
+                           objetivo=1e9, semilla=2024, presupuesto_s=60, procesos=procesos)
+    return (time.perf_counter() - start) * 1e3, r
+
+
+def main():
+    caminos = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    meses = int(sys.argv[2]) if len(sys.argv) > 2 else 480
+    procesos = max(MONTECARLO_PROCESOS, 2)
+    print(f"{caminos} caminos × {meses} meses, {os.cpu_count()} CPUs")
+
+    serie_ms, serie = correr(caminos, meses, 1)
+    correr(caminos, meses, procesos)  # arranque del pool
+    pool_ms, pool = correr(caminos, meses, procesos)
+    np.testing.assert_array_equal(serie["bandas"]["p50"], pool["bandas"]["p50"])
+
+    print(f"  en serie           {serie_ms:8.1f} ms")
+    print(f"  pool ({procesos} procesos)  {pool_ms:8.1f} ms")
+    f = serie["final"]
+    print(f"  final p10/p50/p90  {f['p10']:,.0f} / {f['p50']:,.0f} / {f['p90']:,.0f}  "
+          f"P(≥ objetivo) = {serie['prob_objetivo']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Microbenchmark de normalize_text: implementación anterior (NFD + categoría por
+carácter + re.sub) contra la actual (camino ASCII, tabla de traducción y caché).
+
+Verifica además que ambas devuelvan exactamente lo mismo para cada entrada.
+
+Uso: python bench_normalize.py [REPETICIONES]
+"""
+import re
+import sys
+import time
+import unicodedata
+
+from chatbot_core import _normalize, normalize_text
+
+CASOS = {
+    "cortos repetidos": ["dale", "ok", "si", "Sí", "listo", "no"],
+    "ascii": [
+        "quiero invertir 150000 por 7 meses",
+        "tengo una deuda con la tarjeta de credito y no se como pagarla",
+    ],
+    "con acentos": [
+        "¿Cuánto ganaría si invierto en un plazo fijo a un año?",
+        "Quiero ahorrar para mi Educación_Financiera y el CRÉDITO del año",
+    ],
+    "con emojis": [
+        "dale 👍 quiero ahorrar para las vacaciones ✈️",
+        "¡Gracias! 🙌 ¿y si invierto en dólares? 💵",
+    ],
+}
+
+
+def legacy_normalize(text: str) -> str:
+    """normalize_text tal como estaba antes del camino rápido."""
+    text = text.lower()
+    text = text.replace('_', ' ').replace('-', ' ')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def timeit(fn, textos, reps):
+    start = time.perf_counter()
+    for _ in range(reps):
+        for t in textos:
+            fn(t)
+    return (time.perf_counter() - start) / (reps * len(textos)) * 1e6
+
+
+def main():
+    reps = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    for nombre, textos in CASOS.items():
+        for t in textos:
+            assert normalize_text(t) == legacy_normalize(t), t
+        antes = timeit(legacy_normalize, textos, reps)
+        sin_cache = timeit(_normalize, textos, reps)
+        ahora = timeit(normalize_text, textos, reps)
+        print(f"{nombre:18s} antes {antes:6.2f} µs | sin caché {sin_cache:6.2f} µs | "
+              f"normalize_text {ahora:6.2f} µs  (x{antes / ahora:.1f})")
+
+
+if __name__ == "__main__":
+    main()
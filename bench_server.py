@@ -0,0 +1,126 @@
+"""
+Prueba de carga: servidor de desarrollo de Flask vs serve.py (gunicorn/waitress).
+
+Levanta cada servidor en un subproceso, dispara /api/chat desde varios hilos
+(un usuario y una conexión keep-alive por hilo) durante unos segundos y
+reporta throughput y latencias.
+
+Uso: python bench_server.py [--clients 16] [--seconds 10] [--workers 2] [--threads 8]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+BASE_DIR = Path(__file__).parent
+MESSAGES = [
+    "hola", "quiero armar un presupuesto", "gano 350000 por mes",
+    "quiero ahorrar para un auto", "500000", "12 meses",
+    "tengo deudas con la tarjeta", "qué es un plazo fijo", "quiero invertir 100 lucas",
+]
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"❌ El servidor terminó (código {proc.returncode})")
+        try:
+            if requests.get(f"{url}/health", timeout=1).ok:
+                return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise SystemExit("❌ El servidor no respondió a tiempo")
+
+
+def load(url: str, clients: int, seconds: float) -> dict:
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def client(i: int) -> None:
+        session = requests.Session()
+        session.cookies.set("uid", f"bench_{i}")
+        local, n = [], 0
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                r = session.post(f"{url}/api/chat", json={"message": MESSAGES[n % len(MESSAGES)]}, timeout=30)
+                ok = r.status_code == 200
+            except requests.RequestException:
+                ok = False
+            local.append(time.perf_counter() - start)
+            n += 1
+            if not ok:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1e3 if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1e3 if latencies else 0.0,
+    }
+
+
+def run(name: str, cmd: list, env: dict, port: int, args) -> dict:
+    url = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, env={**os.environ, **env},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(url, proc)
+        load(url, args.clients, 1.0)  # calentamiento
+        result = load(url, args.clients, args.seconds)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=15)
+    print(f"{name:28s} {result['rps']:8.1f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+          f"p95 {result['p95_ms']:7.1f} ms  ({result['requests']} req, {result['errors']} errores)")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--port", type=int, default=5055)
+    args = parser.parse_args()
+
+    print(f"Clientes concurrentes: {args.clients}, {args.seconds:.0f}s por servidor")
+    dev = run(
+        "Flask dev (threaded)",
+        [sys.executable, "-c", f"from web_app import app; app.run(port={args.port}, threaded=True)"],
+        {}, args.port, args,
+    )
+    prod = run(
+        f"serve.py ({args.workers}w × {args.threads}t)",
+        [sys.executable, "serve.py"],
+        {"WEB_BIND": f"127.0.0.1:{args.port + 1}", "WEB_WORKERS": str(args.workers),
+         "WEB_THREADS": str(args.threads)},
+        args.port + 1, args,
+    )
+    if dev["rps"]:
+        print(f"Mejora de throughput: ×{prod['rps'] / dev['rps']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
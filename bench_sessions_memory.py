@@ -0,0 +1,50 @@
+"""
+Benchmark de memoria: crea N sesiones (un ChatBot por uid, como las sesiones de web_app)
+y compara el costo por sesión antes/después del léxico compartido (IntentLexicon).
+
+Uso: python bench_sessions_memory.py [N]
+"""
+import gc
+import sys
+import tracemalloc
+
+from chatbot_core import ChatBot, KEYWORDS, INTENT_PATTERNS
+
+
+class LegacyChatBot(ChatBot):
+    """Reproduce el comportamiento anterior: cada instancia copia sus propios léxicos."""
+    keywords = None
+    intent_patterns = None
+
+    def __init__(self):
+        super().__init__()
+        self.keywords = {scen: list(kws) for scen, kws in KEYWORDS.items()}
+        self.intent_patterns = {scen: list(pats) for scen, pats in INTENT_PATTERNS.items()}
+
+
+def measure(factory, n: int) -> int:
+    """Bytes asignados para mantener n sesiones vivas en un dict."""
+    gc.collect()
+    tracemalloc.start()
+    sessions = {}
+    for i in range(n):
+        sessions[f"web_{i:010x}"] = factory()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del sessions
+    gc.collect()
+    return current
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    before = measure(LegacyChatBot, n)
+    after = measure(ChatBot, n)
+    print(f"Sesiones: {n:,}")
+    print(f"Antes (léxico por instancia): {before / 2**20:8.1f} MiB  ({before / n:,.0f} B/sesión)")
+    print(f"Ahora (IntentLexicon compartido): {after / 2**20:8.1f} MiB  ({after / n:,.0f} B/sesión)")
+    print(f"Reducción: {(1 - after / before) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Caché de resultados de calculadoras y gráficos (LRU + TTL), compartida por el
+chatbot (handle_calculadora, handle_inversiones) y los endpoints /api/grafico/*.
+
+El tráfico real repite pocas simulaciones (el gráfico por defecto 10000 / 12% /
+5 años, la comparación de 100000 a 10 años...), así que cada resultado se
+guarda la primera vez y se reutiliza:
+
+- Clave: nombre de la función + parámetros en orden canónico (posicionales,
+  keyword o default dan la misma clave), con los floats redondeados a
+  `decimales` (CALC_CACHE_DECIMALES) para que 12 y 12.0000000001 compartan
+  entrada. Ante un miss la función se llama con los valores originales.
+- LRU: a lo sumo `max_entries` resultados; TTL: se recalculan después de
+  `ttl` segundos.
+- Los resultados se devuelven tal cual están guardados: no modificarlos.
+
+Los contadores (hits, misses, expulsiones, vencidos, por función) se
+exponen con `stats()` en /debug/calc-cache. CALC_CACHE_MAX=0 la desactiva.
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import calculators
+
+CALC_CACHE_MAX = int(os.environ.get("CALC_CACHE_MAX", "1024"))
+CALC_CACHE_TTL = float(os.environ.get("CALC_CACHE_TTL", "600"))
+CALC_CACHE_DECIMALES = int(os.environ.get("CALC_CACHE_DECIMALES", "6"))
+
+
+class CalcCache:
+    """Resultados por (función, parámetros cuantizados), con expulsión LRU + TTL, thread-safe."""
+
+    def __init__(
+        self,
+        max_entries: int = CALC_CACHE_MAX,
+        ttl: float = CALC_CACHE_TTL,
+        decimales: int = CALC_CACHE_DECIMALES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.decimales = decimales
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.counters: Dict[str, int] = dict.fromkeys(("hits", "misses", "evicted", "expired"), 0)
+        self.by_function: Dict[str, Counter] = {}
+
+    def _quantize(self, value: Any) -> Hashable:
+        if isinstance(value, float):
+            # + 0.0 unifica -0.0 con 0.0
+            return round(value, self.decimales) + 0.0
+        return value
+
+    def wrap(self, fn: Callable) -> Callable:
+        """Versión cacheada de fn (mismo nombre y firma)."""
+        name = fn.__name__
+        params = list(inspect.signature(fn).parameters.values())
+        names = [p.name for p in params]
+        defaults = {p.name: p.default for p in params if p.default is not inspect.Parameter.empty}
+        self.by_function.setdefault(name, Counter())
+
+        @functools.wraps(fn)
+        def cached(*args, **kwargs):
+            if self.max_entries <= 0:
+                return fn(*args, **kwargs)
+            try:
+                if len(args) > len(names) or not kwargs.keys() <= set(names[len(args):]):
+                    raise TypeError
+                values = list(args) + [kwargs[n] if n in kwargs else defaults[n] for n in names[len(args):]]
+                key = (name, *map(self._quantize, values))
+                hash(key)
+            except (KeyError, TypeError):
+                # Argumentos faltantes/extra o no hasheables: que fn decida
+                return fn(*args, **kwargs)
+            hit, result = self._lookup(key, name)
+            if hit:
+                return result
+            result = fn(*args, **kwargs)
+            self._store(key, result)
+            return result
+
+        cached.cache = self
+        return cached
+
+    def _lookup(self, key: Hashable, name: str) -> Tuple[bool, Any]:
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl:
+                del self._entries[key]
+                self.counters["expired"] += 1
+                entry = None
+            if entry is None:
+                self.counters["misses"] += 1
+                self.by_function[name]["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            self.by_function[name]["hits"] += 1
+            return True, entry[1]
+
+    def _store(self, key: Hashable, result: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self.clock(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evicted"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "decimales": self.decimales,
+                "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+                **self.counters,
+                "by_function": {name: dict(c) for name, c in self.by_function.items()},
+            }
+
+
+CALC_CACHE = CalcCache()
+
+# Calculadoras cacheadas, con los mismos nombres que en calculators
+# (los gráficos se envuelven en web_app, para no cargar plotly en el chatbot)
+calcular_interes_compuesto = CALC_CACHE.wrap(calculators.calcular_interes_compuesto)
+calcular_cuota_prestamo = CALC_CACHE.wrap(calculators.calcular_cuota_prestamo)
+tiempo_pagar_deuda = CALC_CACHE.wrap(calculators.tiempo_pagar_deuda)
+comparar_inversiones = CALC_CACHE.wrap(calculators.comparar_inversiones)
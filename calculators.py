@@ -2,7 +2,33 @@
 Calculadoras financieras avanzadas
 """
 import math
-from typing import Dict, List
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+def _potencia(base: float, meses: int) -> float:
+    """base^n como el bucle mes a mes: ±inf si se desborda, en vez de OverflowError."""
+    try:
+        return base ** meses
+    except OverflowError:
+        return -math.inf if base < 0 and meses % 2 else math.inf
+
+
+def _factor_acumulacion(tasa_mensual: float, meses: int) -> float:
+    """
+    Suma de la serie de aportes: ((1 + r)^n - 1) / r, o n si r = 0.
+    expm1/log1p evitan la cancelación con tasas chicas y plazos largos;
+    con r <= -100% (log1p no definido) o si se desborda se usa la potencia.
+    """
+    if tasa_mensual == 0:
+        return float(meses)
+    if tasa_mensual > -1:
+        try:
+            return math.expm1(meses * math.log1p(tasa_mensual)) / tasa_mensual
+        except OverflowError:
+            pass
+    return (_potencia(1 + tasa_mensual, meses) - 1) / tasa_mensual
 
 
 def calcular_interes_compuesto(capital: float, tasa_anual: float, años: float, 
@@ -10,6 +36,10 @@ def calcular_interes_compuesto(capital: float, tasa_anual: float, años: float,
     """
     Calcula interés compuesto con ahorro mensual opcional.
     
+    Usa la fórmula cerrada de la anualidad (O(1) sin importar el plazo):
+    monto = capital·(1 + r)^n + aporte·((1 + r)^n - 1) / r
+    Como el bucle mes a mes que reemplaza, un plazo/tasa extremos dan inf en vez de error.
+    
     Args:
         capital: Capital inicial
         tasa_anual: Tasa de interés anual (ej: 10 para 10%)
@@ -22,12 +52,13 @@ def calcular_interes_compuesto(capital: float, tasa_anual: float, años: float,
     tasa_mensual = (tasa_anual / 100) / 12
     meses = int(años * 12)
     
-    monto = capital
-    total_invertido = capital
-    
-    for mes in range(meses):
-        monto = monto * (1 + tasa_mensual) + aporte_mensual
-        total_invertido += aporte_mensual
+    # Cada término solo si aporta: 0·inf sería NaN
+    monto = 0.0
+    if capital:
+        monto += capital * _potencia(1 + tasa_mensual, meses)
+    if aporte_mensual:
+        monto += aporte_mensual * _factor_acumulacion(tasa_mensual, meses)
+    total_invertido = capital + aporte_mensual * meses
     
     ganancia = monto - total_invertido
     
@@ -39,6 +70,43 @@ def calcular_interes_compuesto(capital: float, tasa_anual: float, años: float,
     }
 
 
+def evolucion_interes_compuesto(capital: float, tasa_anual: float, años: float,
+                                aporte_mensual: float = 0) -> Dict[str, np.ndarray]:
+    """
+    Evolución mes a mes del interés compuesto (para gráficos o tablas).
+    
+    Returns:
+        Dict de arrays NumPy de largo meses + 1 (el índice 0 es el inicio):
+        "mes", "saldo" (monto acumulado) y "aportado" (capital + aportes hasta ese mes)
+    """
+    tasa_mensual = (tasa_anual / 100) / 12
+    meses = int(años * 12)
+    
+    mes = np.arange(meses + 1)
+    n = mes.astype(float)
+    # Como calcular_interes_compuesto: plazos/tasas extremos dan inf, sin warnings
+    with np.errstate(over="ignore", invalid="ignore"):
+        crecimiento = (1 + tasa_mensual) ** n
+        if tasa_mensual == 0:
+            serie_aportes = n
+        elif tasa_mensual > -1:
+            serie_aportes = np.expm1(n * np.log1p(tasa_mensual)) / tasa_mensual
+        else:
+            serie_aportes = (crecimiento - 1) / tasa_mensual
+        
+        # Cada término solo si aporta: 0·inf sería NaN
+        saldo = np.zeros(meses + 1)
+        if capital:
+            saldo += capital * crecimiento
+        if aporte_mensual:
+            saldo += aporte_mensual * serie_aportes
+    return {
+        "mes": mes,
+        "saldo": saldo,
+        "aportado": capital + aporte_mensual * n,
+    }
+
+
 def calcular_cuota_prestamo(monto: float, tasa_anual: float, meses: int) -> Dict:
     """
     Calcula cuota mensual de un préstamo (sistema francés).
@@ -156,7 +224,7 @@ def presupuesto_50_30_20(ingreso: float) -> Dict:
     }
 
 
-def comparar_inversiones(monto: float, años: int) -> List[Dict]:
+def comparar_inversiones(monto: float, años: float) -> List[Dict]:
     """
     Compara diferentes opciones de inversión con el mismo monto y plazo.
     
@@ -164,7 +232,7 @@ def comparar_inversiones(monto: float, años: int) -> List[Dict]:
     
     Args:
         monto: Monto a invertir
-        años: Plazo en años
+        años: Plazo en años (acepta fracciones: 0.5 = 6 meses)
     
     Returns:
         Lista de opciones con rendimientos estimados
@@ -225,3 +293,170 @@ def jubilacion_estimada(edad_actual: int, edad_jubilacion: int,
         "retiro_mensual_seguro": round(retiro_mensual_seguro, 2),
         "nota": "Retiro seguro = 4% anual (regla conservadora)"
     }
+
+
+# --- Versiones en lote (tablas de sensibilidad) ---
+#
+# Aceptan escalares, listas o arrays NumPy en cada parámetro, los combinan con
+# broadcasting y devuelven un array estructurado con los mismos campos que la
+# versión escalar. Para una grilla completa (tasas × plazos × aportes) pasar
+# ejes ortogonales, p. ej. tasas[:, None, None], años[None, :, None], o usar
+# grilla_calculo().
+
+INTERES_COMPUESTO_DTYPE = np.dtype([
+    ("monto_final", "f8"), ("total_invertido", "f8"),
+    ("ganancia", "f8"), ("rendimiento_porcentaje", "f8"),
+])
+CUOTA_PRESTAMO_DTYPE = np.dtype([
+    ("cuota_mensual", "f8"), ("total_a_pagar", "f8"), ("intereses_totales", "f8"),
+])
+# pagable=False cuando el pago no cubre los intereses (la versión escalar
+# devuelve "error"): meses_necesarios queda en 0 y los montos en NaN
+TIEMPO_DEUDA_DTYPE = np.dtype([
+    ("meses_necesarios", "i8"), ("años", "f8"), ("total_a_pagar", "f8"),
+    ("intereses_totales", "f8"), ("pagable", "?"),
+])
+
+
+def _tasa_mensual_lote(tasa_anual: np.ndarray) -> np.ndarray:
+    return (tasa_anual / 100) / 12
+
+
+def calcular_interes_compuesto_lote(capital, tasa_anual, años, aporte_mensual=0) -> np.ndarray:
+    """
+    calcular_interes_compuesto sobre todas las combinaciones (broadcasting).
+    
+    Returns:
+        Array estructurado (INTERES_COMPUESTO_DTYPE) con la forma del broadcast
+    """
+    capital, tasa_anual, años, aporte_mensual = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (capital, tasa_anual, años, aporte_mensual)))
+    tasa_mensual = _tasa_mensual_lote(tasa_anual)
+    meses = np.trunc(años * 12)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crecimiento = np.expm1(meses * np.log1p(tasa_mensual))
+        factor = np.where(tasa_mensual == 0, meses, crecimiento / tasa_mensual)
+        monto = capital * (crecimiento + 1) + aporte_mensual * factor
+        total_invertido = capital + aporte_mensual * meses
+        ganancia = monto - total_invertido
+        rendimiento = ganancia / total_invertido * 100
+    
+    out = np.empty(monto.shape, dtype=INTERES_COMPUESTO_DTYPE)
+    out["monto_final"] = np.round(monto, 2)
+    out["total_invertido"] = np.round(total_invertido, 2)
+    out["ganancia"] = np.round(ganancia, 2)
+    out["rendimiento_porcentaje"] = np.round(rendimiento, 2)
+    return out
+
+
+def calcular_cuota_prestamo_lote(monto, tasa_anual, meses) -> np.ndarray:
+    """
+    calcular_cuota_prestamo (sistema francés) sobre todas las combinaciones.
+    
+    Returns:
+        Array estructurado (CUOTA_PRESTAMO_DTYPE) con la forma del broadcast
+    """
+    monto, tasa_anual, meses = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (monto, tasa_anual, meses)))
+    tasa_mensual = _tasa_mensual_lote(tasa_anual)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        potencia = (1 + tasa_mensual) ** meses
+        cuota = np.where(tasa_mensual == 0, monto / meses,
+                         monto * tasa_mensual * potencia / (potencia - 1))
+        total_pagar = cuota * meses
+    
+    out = np.empty(cuota.shape, dtype=CUOTA_PRESTAMO_DTYPE)
+    out["cuota_mensual"] = np.round(cuota, 2)
+    out["total_a_pagar"] = np.round(total_pagar, 2)
+    out["intereses_totales"] = np.round(total_pagar - monto, 2)
+    return out
+
+
+def tiempo_pagar_deuda_lote(deuda, pago_mensual, tasa_anual=0) -> np.ndarray:
+    """
+    tiempo_pagar_deuda sobre todas las combinaciones.
+    
+    Returns:
+        Array estructurado (TIEMPO_DEUDA_DTYPE) con la forma del broadcast;
+        las combinaciones imposibles quedan con pagable=False
+    """
+    deuda, pago_mensual, tasa_anual = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (deuda, pago_mensual, tasa_anual)))
+    tasa_mensual = _tasa_mensual_lote(tasa_anual)
+    sin_interes = tasa_mensual == 0
+    interes_mes = deuda * tasa_mensual
+    pagable = (pago_mensual > 0) & (sin_interes | (pago_mensual > interes_mes))
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        meses = np.where(
+            sin_interes,
+            np.ceil(deuda / pago_mensual),
+            np.ceil(np.log(pago_mensual / (pago_mensual - interes_mes)) / np.log1p(tasa_mensual)),
+        )
+        meses = np.where(pagable, meses, 0)
+        total = np.where(sin_interes, deuda, pago_mensual * meses)
+    
+    out = np.empty(meses.shape, dtype=TIEMPO_DEUDA_DTYPE)
+    out["meses_necesarios"] = meses
+    out["años"] = np.round(meses / 12, 1)
+    out["total_a_pagar"] = np.where(pagable, np.round(total, 2), np.nan)
+    out["intereses_totales"] = np.where(pagable, np.round(total - deuda, 2), np.nan)
+    out["pagable"] = pagable
+    return out
+
+
+# Cálculos disponibles para grilla_calculo: función y parámetros (con su default)
+CALCULOS_LOTE = {
+    "interes_compuesto": (calcular_interes_compuesto_lote,
+                          {"capital": None, "tasa_anual": None, "años": None, "aporte_mensual": 0}),
+    "cuota_prestamo": (calcular_cuota_prestamo_lote,
+                       {"monto": None, "tasa_anual": None, "meses": None}),
+    "tiempo_pagar_deuda": (tiempo_pagar_deuda_lote,
+                           {"deuda": None, "pago_mensual": None, "tasa_anual": 0}),
+}
+
+
+def grilla_calculo(calculo: str, params: Dict) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Tabla de sensibilidad: cada parámetro con varios valores es un eje de la grilla
+    (en el orden en que aparecen en params); los escalares quedan fijos.
+    
+    Args:
+        calculo: Clave de CALCULOS_LOTE
+        params: Valores por parámetro (escalar o lista)
+    
+    Returns:
+        (ejes, resultado): los valores de cada eje y el array estructurado con
+        forma (len(eje1), len(eje2), ...)
+    
+    Raises:
+        ValueError: cálculo desconocido, parámetros faltantes/extra o valores no numéricos
+    """
+    if calculo not in CALCULOS_LOTE:
+        raise ValueError(f"Cálculo desconocido: {calculo} (opciones: {', '.join(CALCULOS_LOTE)})")
+    fn, firma = CALCULOS_LOTE[calculo]
+    extra = set(params) - set(firma)
+    if extra:
+        raise ValueError(f"Parámetros desconocidos para {calculo}: {', '.join(sorted(extra))}")
+    faltan = [k for k, default in firma.items() if default is None and k not in params]
+    if faltan:
+        raise ValueError(f"Faltan parámetros para {calculo}: {', '.join(faltan)}")
+    
+    valores = {}
+    for nombre, default in firma.items():
+        try:
+            valores[nombre] = np.asarray(params.get(nombre, default), dtype=float)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{nombre}' debe ser un número o una lista de números")
+        if valores[nombre].ndim > 1 or valores[nombre].size == 0:
+            raise ValueError(f"'{nombre}' debe ser un número o una lista no vacía")
+    
+    ejes = {k: v for k, v in valores.items() if v.ndim == 1 and k in params}
+    orden = [k for k in params if k in ejes]
+    for i, nombre in enumerate(orden):
+        forma = [1] * len(orden)
+        forma[i] = -1
+        valores[nombre] = valores[nombre].reshape(forma)
+    return {k: ejes[k] for k in orden}, fn(**valores)
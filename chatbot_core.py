@@ -1,19 +1,33 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, time
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Optional, Tuple
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple, Union
+import copy
 import csv
+import math
+import os
 import random
 import re
+import threading
 import unicodedata
 from difflib import SequenceMatcher
-from calculators import (
+from time import perf_counter
+from amortizacion import resumen_sin_prepagos
+from calc_cache import (
     calcular_interes_compuesto, calcular_cuota_prestamo,
-    plan_ahorro, tiempo_pagar_deuda, presupuesto_50_30_20,
-    comparar_inversiones
+    tiempo_pagar_deuda, comparar_inversiones
 )
-from database import update_user_fields, get_user, get_or_create_user
+from calculators import plan_ahorro, presupuesto_50_30_20
+from database import UserTurn, update_user_fields
+from detect_trace import NULL_TRACE, TRACE_STATS, DetectTrace
+from financial_entities import CONTRIBUTION, MONEY, FinancialEntities, extract_entities
+from intent_matcher import DeletionIndex, LiteralSetMatcher, MultiPatternMatcher
+from interaction_log import LOG_ASYNC, AsyncLogWriter, register_shutdown_flush as register_log_flush
+from log_aggregates import LogAggregates, register_shutdown_checkpoint as register_aggregates_checkpoint
+from log_store import LOG_FIELDS, SegmentedLogStore, read_logs
 
 
 # Ruta de log en el mismo directorio del archivo
@@ -30,6 +44,78 @@ def stamp(dt: Optional[datetime] = None) -> str:
     return f"[{dt.strftime('%H:%M')} {periodo}]"
 
 
+def _normalize_slow(text: str) -> str:
+    """Camino general: descomposición NFD y descarte de diacríticos."""
+    text = unicodedata.normalize('NFD', text)
+    return ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+
+
+def _reorders(char: str) -> bool:
+    """True si NFD podría reordenar marcas de este carácter que no se descartan."""
+    return any(
+        unicodedata.combining(c) and unicodedata.category(c) != 'Mn'
+        for c in unicodedata.normalize('NFD', char)
+    )
+
+
+# Tabla completa (sin huecos, así translate no corta en claves faltantes) para
+# latín, latín extendido y marcas combinantes: á → a, ñ → n, ü → u, _ y - → ' '.
+_LATIN_MAX = '\u036f'
+_LATIN_TABLE: Dict[int, str] = {code: _normalize_slow(chr(code)) for code in range(ord(_LATIN_MAX) + 1)}
+_LATIN_TABLE.update({ord('_'): ' ', ord('-'): ' '})
+
+
+class _AccentTable(dict):
+    """
+    Tabla perezosa para el resto de Unicode (emojis, otros alfabetos): cada
+    carácter se resuelve una sola vez con el camino general.
+    """
+
+    MAX_SIZE = 1 << 16
+
+    def __init__(self):
+        super().__init__(_LATIN_TABLE)
+        self.reordering: Set[str] = set()
+
+    def __missing__(self, code: int) -> str:
+        char = chr(code)
+        if _reorders(char):
+            self.reordering.add(char)
+        value = _normalize_slow(char)
+        if len(self) < self.MAX_SIZE:
+            self[code] = value
+        return value
+
+
+_ACCENT_TABLE = _AccentTable()
+
+
+def _normalize_wide(text: str) -> str:
+    """Texto con caracteres fuera de latín: tabla perezosa, o NFD si hay reordenamiento."""
+    reordering = _ACCENT_TABLE.reordering
+    known = len(reordering)
+    if not (known and not reordering.isdisjoint(text)):
+        stripped = text.translate(_ACCENT_TABLE)
+        if len(reordering) == known:
+            return stripped
+    return _normalize_slow(text.replace('_', ' ').replace('-', ' '))
+
+
+def _normalize(text: str) -> str:
+    text = text.lower()
+    if text.isascii():
+        text = text.replace('_', ' ').replace('-', ' ')
+    elif max(text) <= _LATIN_MAX:
+        text = text.translate(_LATIN_TABLE)
+    else:
+        text = _normalize_wide(text)
+    return ' '.join(text.split())
+
+
+_normalize_cached = lru_cache(maxsize=4096)(_normalize)
+NORMALIZE_CACHE_MAX_LEN = 32  # mensajes cortos que se repiten ("dale", "ok", "si")
+
+
 def normalize_text(text: str) -> str:
     """
     Normaliza el texto para mejorar la detección:
@@ -38,21 +124,13 @@ def normalize_text(text: str) -> str:
     - Convierte _ y - en espacios
     - Normaliza espacios múltiples
     - Preserva números
+
+    El texto ASCII no pasa por Unicode; los acentos comunes se resuelven con
+    una tabla de traducción y las entradas cortas quedan en un caché LRU.
     """
-    # Convertir a minúsculas
-    text = text.lower()
-    
-    # Convertir underscores y guiones en espacios
-    text = text.replace('_', ' ').replace('-', ' ')
-    
-    # Eliminar acentos (NFD normaliza y separamos los diacríticos)
-    text = unicodedata.normalize('NFD', text)
-    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
-    
-    # Normalizar espacios múltiples
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
+    if len(text) <= NORMALIZE_CACHE_MAX_LEN:
+        return _normalize_cached(text)
+    return _normalize(text)
 
 
 def parse_lucas(text: str) -> str:
@@ -79,15 +157,65 @@ def parse_lucas(text: str) -> str:
     return re.sub(pattern, replace_lucas, text, flags=re.IGNORECASE)
 
 
+def normalize_message(raw: str) -> str:
+    """
+    Texto de un mensaje tal como lo ven detect y el modelo de intenciones
+    ('lucas' a miles + normalize_text): igual a MessageContext.normalized.
+    """
+    return normalize_text(parse_lucas(raw))
+
+
+_LOG_LOCK = threading.Lock()
+LOG_HEADER = list(LOG_FIELDS)
+# segments = almacén diario indexado (log_store); csv = un único chat_logs.csv (formato anterior)
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "segments")
+LOG_STORE = SegmentedLogStore()
+
+
+def _logged_rows() -> Iterable[Dict[str, str]]:
+    """Filas ya escritas en el formato activo (para reconstruir los agregados)."""
+    if LOG_FORMAT != "csv":
+        return LOG_STORE.between()
+    return read_logs(LOG_PATH) if LOG_PATH.exists() else []
+
+
+# Conteos para /logs y el dashboard; se actualizan al escribir cada lote
+LOG_AGGREGATES = LogAggregates(source=_logged_rows)
+
+
+def _write_log_rows(rows: List[List[str]]) -> None:
+    if LOG_FORMAT != "csv":
+        LOG_STORE.append(rows)
+    else:
+        # Un lock evita filas entremezcladas (o el encabezado duplicado) con varios hilos
+        with _LOG_LOCK:
+            # Crear encabezado si no existe (se reabre en cada lote: el archivo puede borrarse o rotarse)
+            new_file = not LOG_PATH.exists()
+            with LOG_PATH.open("a", newline='', encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(LOG_HEADER)
+                writer.writerows(rows)
+    LOG_AGGREGATES.observe(rows)
+
+
+INTERACTION_LOG = AsyncLogWriter(_write_log_rows)
+# atexit corre en orden inverso: primero se vacía la cola y después se guardan los agregados
+register_aggregates_checkpoint(LOG_AGGREGATES)
+register_log_flush(INTERACTION_LOG)
 def log_interaction(ts: datetime, scenario: str, user: str, bot: str, 
                     sentiment: str = "neutral", emotion: str = "none") -> None:
-    # Crear encabezado si no existe
-    new_file = not LOG_PATH.exists()
-    with LOG_PATH.open("a", newline='', encoding="utf-8") as f:
-        writer = csv.writer(f)
-        if new_file:
-            writer.writerow(["timestamp", "scenario", "sentiment", "emotion", "user", "bot"])
-        writer.writerow([ts.isoformat(timespec='seconds'), scenario, sentiment, emotion, user, bot])
+    row = [ts.isoformat(timespec='seconds'), scenario, sentiment, emotion, user, bot]
+    if LOG_ASYNC:
+        # Solo encola: la escritura la hace el hilo de interaction_log
+        INTERACTION_LOG.submit(row)
+    else:
+        _write_log_rows([row])
+
+
+def flush_interaction_log(timeout: Optional[float] = None) -> bool:
+    """Espera a que las interacciones encoladas estén escritas (LOG_STORE o LOG_PATH)."""
+    return INTERACTION_LOG.flush(timeout)
 
 
 @dataclass
@@ -97,6 +225,62 @@ class BotResult:
     when: datetime
     sentiment: str = "neutral"  # positivo, negativo, neutral
     emotion: str = "none"  # preocupado, estresado, motivado, confundido, etc.
+    timings: Dict[str, float] = field(default_factory=dict)  # segundos por etapa del turno
+    emotion_scores: Dict[str, int] = field(default_factory=dict)  # puntaje por emoción
+
+
+@dataclass(frozen=True)
+class SentimentScores:
+    """Resultado completo del análisis de sentimiento de un mensaje."""
+    sentiment: str               # positivo, negativo, neutral
+    emotion: str                 # emoción con mayor puntaje, o "none"
+    positive: int                # puntaje positivo (palabras + bonus proactivo)
+    negative: int                # puntaje negativo (palabras + bonus de estrés financiero)
+    emotions: Mapping[str, int]  # puntaje de cada emoción (keywords distintas presentes)
+
+
+@dataclass
+class MessageContext:
+    """
+    Datos derivados de un mensaje, calculados una sola vez por turno y
+    compartidos por analyze_sentiment, detect y los handlers.
+    """
+    raw: str                    # texto tal cual lo envió el usuario
+    text: str                   # con 'lucas' convertidas a miles
+    lower: str                  # text en minúsculas
+    normalized: str             # text normalizado (sin acentos, espacios simples)
+    tokens: List[str]           # palabras de normalized
+    content_tokens: List[str]   # tokens sin stop words ni palabras cortas
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_text(cls, raw: str) -> "MessageContext":
+        text = parse_lucas(raw)
+        normalized = normalize_text(text)
+        tokens = normalized.split()
+        return cls(
+            raw=raw,
+            text=text,
+            lower=text.lower(),
+            normalized=normalized,
+            tokens=tokens,
+            content_tokens=[w for w in tokens if w not in STOP_WORDS and len(w) > 2],
+        )
+
+    @classmethod
+    def of(cls, message: Union[str, "MessageContext"]) -> "MessageContext":
+        """Acepta un texto o un contexto ya construido (compatibilidad con llamadas directas)."""
+        return message if isinstance(message, cls) else cls.from_text(message)
+
+    @cached_property
+    def entities(self) -> FinancialEntities:
+        """Montos, plazos, tasas y aportes del mensaje (un solo escaneo, memorizado)."""
+        return extract_entities(self.raw)
+
+    @property
+    def numbers(self) -> List[float]:
+        """Valores numéricos en orden de aparición, ya interpretados."""
+        return self.entities.values
 
 
 def greeting(dt: datetime, sentiment: str = "neutral", emotion: str = "none") -> str:
@@ -137,73 +321,343 @@ def greeting(dt: datetime, sentiment: str = "neutral", emotion: str = "none") ->
     return base + empathy
 
 
+# ---- Léxicos de detección de intención ----
+# Similitud (SequenceMatcher.ratio) que debe superar una palabra para contar como keyword con typo
+FUZZY_MIN_SIMILARITY = 0.85
+
+# Keywords ya normalizadas (sin acentos, minúsculas)
+# Ahora son más flexibles y naturales
+KEYWORDS = {
+    "presupuesto": [
+        "presupuesto", "gastos", "ingresos", "planificar", "organizar", "dinero",
+        "cuanto gasto", "administrar", "controlar", "distribuir", "plata",
+        "sueldo", "salario", "cobro", "pago", "cuanto tengo", "alcanza",
+        "economia domestica", "finanzas personales", "mis cuentas"
+    ],
+
+    "ahorro": [
+        "ahorrar", "ahorro", "ahorros", "guardar", "meta", "objetivo", "juntar", "reservar",
+        "quiero comprar", "necesito", "voy a comprar", "planeo", "juntando",
+        "guardando", "economizar", "separar", "alcancia"
+    ],
+
+    "inversiones": [
+        "invertir", "inversion", "inversiones", "acciones", "bonos",
+        "plazo fijo", "crypto", "criptomonedas", "fondos", "donde pongo",
+        "rentabilidad", "ganar", "multiplicar", "hacer crecer", "rendimiento",
+        "que me conviene", "mejor opcion", "aguinaldo", "sueldo anual",
+        "bonus", "prima", "cedear", "etf", "fci"
+    ],
+
+    "deudas": [
+        "deuda", "deudas", "prestamo", "credito", "tarjeta",
+        "cuota", "intereses", "debo", "pagar", "prestan", "financiacion",
+        "adeudo", "cancelar", "saldar", "cuotas", "mensualidades", "banco",
+        "me atrase", "no puedo pagar", "refinanciar"
+    ],
+
+    "educacion": [
+        "aprender", "ensenar", "explicar", "que es", "como funciona",
+        "no entiendo", "concepto", "significa", "quiere decir", "ayuda a entender",
+        "me gustaria saber", "quisiera saber", "podrias explicar", "podrías explicar",
+        "curso", "tutorial", "ensenanza"
+    ],
+
+    "calculadora": [
+        "calcular", "calcula", "cuanto", "simular", "simulador",
+        "en cuanto tiempo", "cuota", "plazo", "rendimiento", "comparar",
+        "dame numeros", "hazme cuentas", "sacame la cuenta"
+    ],
+}
+
+# Patrones de intención (frases típicas)
+INTENT_PATTERNS = {
+    "presupuesto": [
+        "cobro", "gano", "tengo de sueldo", "ingreso", "me pagan",
+        "cuanto me alcanza", "llegando a fin de mes", "no me alcanza"
+    ],
+    "ahorro": [
+        "quiero comprar", "voy a comprar", "necesito juntar", "me gustaria tener",
+        "planear para", "meta de", "objetivo de", "en cuanto tiempo"
+    ],
+    "inversiones": [
+        "donde poner", "que hago con", "me conviene", "recomendas",
+        "mejor manera de", "opciones para", "puedo hacer con"
+    ],
+    "deudas": [
+        "me quedan", "estoy pagando", "no puedo pagar", "atrasado con",
+        "cuotas de", "banco me", "tarjeta me cobra"
+    ],
+}
+
+# Educación primero: si el usuario pide definiciones/explicaciones o quiere aprender, priorizar EDUCACION
+EDUCATIONAL_TRIGGERS = [
+    "que es", "qué es", "como funciona", "cómo funciona",
+    "explicar", "explicame", "explícame", "significa", "que significa", "qué significa",
+    "aprender", "aprender sobre", "quiero aprender", "quiero aprender sobre"
+]
+# También capturar conceptos financieros sueltos como "inflacion", "interes", "devaluacion"
+EDUCATIONAL_SINGLE_WORDS = {"inflacion", "devaluacion", "tasa", "tna", "tea", "cer", "uva", "cedear", "fci", "etf"}
+# Conceptos educativos multi-palabra (antes que triggers simples)
+EDUCATIONAL_PHRASES = [
+    "interes simple", "interes compuesto", "simple vs compuesto", "vs compuesto",
+    "diversificacion", "diversificar", "oro como inversion", "ahorro vs inversion"
+]
+# Acrónimos financieros (incluso con ?) → educación
+FINANCIAL_ACRONYMS = ["cer", "uva", "tna", "tea", "cft"]
+INVEST_ACRONYMS = ["fci", "cedear", "cedears", "etf", "etfs"]
+
+# Calculadoras: consultas de cálculo (simular, cuánto ganaría, interés compuesto, comparar opciones)
+CALC_PATTERNS = re.compile("|".join([
+    r"cuanto\s+ganar(ia)?\b", r"si\s+invierto\b", r"interes\s+compuesto",
+    r"simular\s+prestamo", r"cuota\s+de\s+prestamo", r"en\s+cuanto\s+tiempo\s+pago",
+    r"compar(ar|o)\s+opciones\s+de\s+inversion"
+]))
+
+# Palabras que mantienen INVERSIONES si venimos de ese tema
+INVERSION_CONTEXT_KEYWORDS = ["tasa", "%", "aporte", "aporte mensual", "ahorro mensual", "mensual", "simula", "simular", "dale", "ok"]
+TIME_UNIT_WORDS = ["mes", "meses", "anio", "anios", "año", "años"]
+
+# Preguntas de inversión con "dónde rinde", "dónde me conviene", "qué hago" + monto
+INVERSION_QUESTION_KEYWORDS = ["que hago", "que puedo hacer", "donde rinde", "rinde mas", "rinde más",
+                               "me conviene", "que me conviene", "donde me conviene", "donde poner",
+                               "donde meter", "donde invertir", "que hago con"]
+MONEY_WORDS = ["lucas", "pesos", "plata", "dinero", "guita"]
+
+# Ahorro: expresiones típicas de ahorro con 'plata' (dinero) o metas de viaje
+AHORRO_PHRASES = ["necesito juntar plata", "juntar plata", "guardar dinero", "fondo de emergencia", "viajar", "viaje", "vacaciones", "europa"]
+
+# Detectar "quiero viajar a [destino]" como ahorro
+# Patrones: viajar/vacacionar/conocer/ir/visitar + a/en + [destino/lugar]
+TRAVEL_PATTERNS = re.compile("|".join([
+    r"viajar\s+(a|en)",
+    r"vacacionar\s+(a|en)",
+    r"conocer\s+[a-záéíóúñ]+",
+    r"visitar\s+[a-záéíóúñ]+",
+    r"ir\s+a\s+[a-záéíóúñ]+"
+]))
+
+# Planificar/planear compra de bienes (casa/auto/moto/viaje) → es un plan de ahorro, no calculadora
+PLAN_COMPRA_PHRASES = ["planear compra", "planificar compra", "plan de compra"]
+AHORRO_BIENES = ["casa", "vivienda", "departamento", "depto", "auto", "carro", "coche", "vehiculo", "vehículo", "moto", "camioneta", "viaje", "vacaciones"]
+
+# Casos coloquiales con dinero → inversiones
+# "tengo X que hago", "me sobran X", "tengo X tiradas", etc.
+MONEY_QUESTION_PATTERNS = re.compile("|".join([
+    r"(tengo|me sobran?|tengo.*tirad[oa]s?)\s+\$?\s*\d+",
+    r"\d+\s+(que hago|que puedo hacer|donde (poner|meter|invertir)|que me conviene)"
+]))
+
+# MAPEO DIRECTO de keywords prioritarias
+DIRECT_MAP = {
+    "inversiones": ["invertir", "inversion", "inversiones", "aguinaldo", "oro", "gold",
+                    "dolar", "dollar", "usd", "cripto", "crypto", "bitcoin", "btc", "ethereum", "eth",
+                    "acciones", "accion", "stock", "bolsa", "plazo fijo", "cedear", "cedears", "fci",
+                    "bonos", "bono", "etf", "rendimiento", "donde poner", "donde invertir"],
+    "presupuesto": ["presupuesto", "organizar gastos", "distribuir ingresos", "gano", "ingreso"],
+    "ahorro": ["ahorrar", "ahorro"],
+    "deudas": ["deuda", "prestamo", "tarjeta", "credito", "debo", "pagar cuota"],
+    # 'educacion' y 'calculadora' ya priorizados arriba, pero mantenemos por compatibilidad
+    "educacion": ["que es", "como funciona", "explicar", "explicame", "ensenar", "aprender"],
+    "calculadora": ["calculadora", "calcular", "simular"]
+}
+
+# Respuestas cortas de confirmación
+SHORT_CONFIRM = ["si", "sí", "no", "dale", "ok", "bueno", "claro", "genial", "perfecto"]
+
+# Detección de metas de ahorro (una palabra)
+AHORRO_METAS = {"casa", "vivienda", "departamento", "depto", "hogar", "auto", "carro", "coche", "vehiculo", "moto", "camioneta", "viaje", "vacaciones", "vacacionar", "conocer", "emergencia", "emergencias", "fondo", "boda", "casamiento", "matrimonio", "estudios", "universidad", "maestria", "curso"}
+
+# Detección de palabras clave sueltas (1-2 palabras)
+SINGLE_WORD_MAP = {
+    "presupuesto": "presupuesto", "presupuestos": "presupuesto",
+    "ahorro": "ahorro", "ahorrar": "ahorro", "ahorros": "ahorro",
+    "inversion": "inversiones", "inversiones": "inversiones",
+    "deuda": "deudas", "deudas": "deudas",
+    "educacion": "educacion", "aprender": "educacion",
+    "calculadora": "calculadora", "calcular": "calculadora",
+}
+
+# Stop words que se remueven antes del scoring por keywords
+STOP_WORDS = {"el", "la", "los", "las", "un", "una", "de", "del", "al", "para", "por", "con", "en", "a", "y", "o", "pero", "que", "mi", "me", "te", "lo", "su", "sus", "se", "si", "no", "es", "son", "muy", "mas", "como", "cuando", "donde", "quien", "cual"}
+
+# Boost de educación si hay palabras educativas
+EDUCATIONAL_BOOST_TRIGGERS = ["que es", "como funciona", "explicar", "explicame", "ensenar", "aprender", "sobre", "acerca de", "quiero aprender"]
+
+# Detección por contexto semántico (montos grandes sin otra pista)
+DEUDA_CONTEXT_WORDS = ["debo", "deb", "pagar", "cuota"]
+AHORRO_CONTEXT_WORDS = ["quiero", "comprar", "juntar", "necesito"]
+QUESTION_WORDS = ["qué", "que", "cómo", "como", "por qué", "porque", "significa"]
+
+# Escenarios con contexto "fuerte" para respuestas cortas
+PRIORITY_SCENARIOS = ["presupuesto", "ahorro", "deudas", "inversiones"]
+
+
+def _weights(lexicon: Mapping[str, Iterable[str]], normalize: bool = False) -> Mapping[str, Mapping[str, int]]:
+    """Multiplicidad de cada patrón por escenario (el scoring suma con repeticiones)."""
+    weights = {}
+    for scen, patterns in lexicon.items():
+        counts = {}
+        for pattern in patterns:
+            key = normalize_text(pattern) if normalize else pattern
+            counts[key] = counts.get(key, 0) + 1
+        weights[scen] = MappingProxyType(counts)
+    return MappingProxyType(weights)
+
+
+def _build_intent_matcher(keyword_weights: Mapping[str, Mapping[str, int]],
+                          pattern_weights: Mapping[str, Mapping[str, int]]) -> MultiPatternMatcher:
+    """Compila todos los léxicos de `ChatBot.detect` en un único autómata."""
+    lexicons = {
+        "edu_phrase": EDUCATIONAL_PHRASES,
+        "edu_trigger": EDUCATIONAL_TRIGGERS,
+        "edu_boost": EDUCATIONAL_BOOST_TRIGGERS,
+        "que_es": ["que es"],
+        "simular": ["simular", "simula"],
+        "inv_context": INVERSION_CONTEXT_KEYWORDS,
+        "time_unit": TIME_UNIT_WORDS,
+        "inv_question": INVERSION_QUESTION_KEYWORDS,
+        "money": MONEY_WORDS,
+        "ahorro_phrase": AHORRO_PHRASES,
+        "plan_compra": PLAN_COMPRA_PHRASES,
+        "ahorro_bien": AHORRO_BIENES,
+        "short_confirm": SHORT_CONFIRM,
+        "deuda_context": DEUDA_CONTEXT_WORDS,
+        "ahorro_context": AHORRO_CONTEXT_WORDS,
+        "question": QUESTION_WORDS,
+    }
+    for scen, keywords in DIRECT_MAP.items():
+        lexicons["direct:" + scen] = keywords
+    for scen, patterns in pattern_weights.items():
+        lexicons["pattern:" + scen] = patterns
+    for scen, keywords in keyword_weights.items():
+        lexicons["keyword:" + scen] = keywords
+        # Palabras sueltas de keywords multi-palabra (todas deben aparecer)
+        lexicons["keyword_part:" + scen] = [w for kw in keywords for w in kw.split()]
+    return MultiPatternMatcher(lexicons)
+
+
+@dataclass(frozen=True)
+class IntentLexicon:
+    """
+    Léxico de intención inmutable, construido una sola vez al importar y
+    compartido por todos los ChatBot (no se copia por sesión).
+
+    Las keywords se guardan ya pasadas por `normalize_text`, con su
+    multiplicidad, junto con el autómata compilado de `detect` y el índice
+    de búsqueda aproximada (typos) sobre esas keywords.
+    """
+    scenarios: Tuple[str, ...]
+    keywords: Mapping[str, Tuple[str, ...]]
+    intent_patterns: Mapping[str, Tuple[str, ...]]
+    keyword_weights: Mapping[str, Mapping[str, int]]
+    pattern_weights: Mapping[str, Mapping[str, int]]
+    matcher: MultiPatternMatcher
+    fuzzy: DeletionIndex
+
+    @classmethod
+    def build(cls, keywords: Mapping[str, Iterable[str]],
+              intent_patterns: Mapping[str, Iterable[str]]) -> "IntentLexicon":
+        keyword_weights = _weights(keywords, normalize=True)
+        pattern_weights = _weights(intent_patterns)
+        return cls(
+            scenarios=tuple(keywords),
+            keywords=MappingProxyType({
+                scen: tuple(normalize_text(kw) for kw in kws) for scen, kws in keywords.items()
+            }),
+            intent_patterns=MappingProxyType({
+                scen: tuple(pats) for scen, pats in intent_patterns.items()
+            }),
+            keyword_weights=keyword_weights,
+            pattern_weights=pattern_weights,
+            matcher=_build_intent_matcher(keyword_weights, pattern_weights),
+            fuzzy=DeletionIndex({kw for weights in keyword_weights.values() for kw in weights},
+                                min_similarity=FUZZY_MIN_SIMILARITY),
+        )
+
+
+INTENT_LEXICON = IntentLexicon.build(KEYWORDS, INTENT_PATTERNS)
+INTENT_MATCHER = INTENT_LEXICON.matcher
+DIRECT_MAP_GROUPS = ["direct:" + scen for scen in DIRECT_MAP]
+
+
+# Léxicos de sentimiento (se buscan sobre el texto en minúsculas, con acentos;
+# son pocos patrones, así que alcanza con LiteralSetMatcher)
+POSITIVE_WORDS = [
+    "bien", "genial", "excelente", "bueno", "gracias", "perfecto",
+    "feliz", "contento", "alegre", "esperanza", "optimista", "listo",
+    "quiero", "voy a", "puedo", "lograr", "éxito", "mejor", "avanzar"
+]
+NEGATIVE_WORDS = [
+    "mal", "terrible", "horrible", "preocupado", "preocupación", "angustia",
+    "desesperado", "agobiado", "estresado", "triste", "miedo", "pánico",
+    "crisis", "urgente", "no puedo", "imposible", "nunca", "peor"
+]
+EMOTION_KEYWORDS = {
+    "preocupado": ["preocupado", "preocupa", "inquieto", "nervioso", "ansioso", "intranquilo"],
+    "estresado": ["estresado", "estrés", "agobiado", "presión", "sobrecargado", "no aguanto"],
+    "confundido": ["confundido", "no entiendo", "perdido", "no sé", "ayuda", "como hago"],
+    "desesperado": ["desesperado", "urgente", "no puedo más", "crisis", "grave", "crítico"],
+    "motivado": ["motivado", "quiero", "voy a", "listo", "empezar", "comenzar", "dale"],
+    "frustrado": ["frustrado", "harto", "cansado", "siempre", "otra vez", "no funciona"],
+    "esperanzado": ["espero", "ojalá", "deseo", "sueño", "meta", "objetivo", "futuro"]
+}
+# Detectores de estrés financiero y de proactividad (+2 al puntaje si aparece alguno)
+FINANCIAL_STRESS_PHRASES = [
+    "no me alcanza", "no llego", "no puedo pagar", "me quedé sin",
+    "problemas de plata", "no tengo", "me falta", "atrasado"
+]
+PROACTIVE_PHRASES = [
+    "quiero aprender", "mejorar", "planear", "organizar",
+    "hacer un plan", "tomar control", "cambiar"
+]
+PHRASE_BONUS = 2
+
+EMOTION_GROUPS = {emot: "emotion:" + emot for emot in EMOTION_KEYWORDS}
+SENTIMENT_MATCHER = LiteralSetMatcher({
+    "positive": POSITIVE_WORDS,
+    "negative": NEGATIVE_WORDS,
+    "financial_stress": FINANCIAL_STRESS_PHRASES,
+    "proactive": PROACTIVE_PHRASES,
+    **{EMOTION_GROUPS[emot]: kws for emot, kws in EMOTION_KEYWORDS.items()},
+})
+
+
+def load_intent_model():
+    """
+    Modelo lineal de intenciones según la configuración:
+    INTENT_DETECTOR=model activa el modo, INTENT_MODEL_PATH apunta al .npz
+    (por defecto intent_model.npz junto a este archivo). Devuelve None si el
+    modo está desactivado o el modelo no se puede cargar.
+    """
+    if os.getenv("INTENT_DETECTOR", "rules").strip().lower() != "model":
+        return None
+    try:
+        from intent_model import DEFAULT_MODEL_PATH, IntentModel
+        return IntentModel.load(os.getenv("INTENT_MODEL_PATH") or DEFAULT_MODEL_PATH)
+    except (ImportError, OSError, KeyError, ValueError) as e:
+        print(f"⚠️ Modelo de intenciones no disponible, se usan reglas: {e}")
+        return None
+
+
+# Versión del formato de ChatBot.export_state
+STATE_VERSION = 1
+
+
 class ChatBot:
+    # Léxico compartido por todas las instancias (ver IntentLexicon)
+    lexicon: IntentLexicon = INTENT_LEXICON
+    # Modelo lineal opcional (INTENT_DETECTOR=model); por debajo del umbral
+    # de confianza se usa la cascada de reglas
+    intent_model = load_intent_model()
+    intent_model_threshold: float = float(os.getenv("INTENT_MODEL_THRESHOLD", "0.6"))
+    # Trazas por regla de detect (DETECT_TRACE=1); se agregan en TRACE_STATS
+    trace_detect: bool = os.getenv("DETECT_TRACE", "0") == "1"
+    last_trace: Optional[DetectTrace] = None
+    # Unidad de trabajo DB del turno en curso (solo dentro de process)
+    _turn: Optional[UserTurn] = None
+
     def __init__(self):
-        # Keywords ya normalizadas (sin acentos, minúsculas)
-        # Ahora son más flexibles y naturales
-        self.keywords = {
-            "presupuesto": [
-                "presupuesto", "gastos", "ingresos", "planificar", "organizar", "dinero", 
-                "cuanto gasto", "administrar", "controlar", "distribuir", "plata",
-                "sueldo", "salario", "cobro", "pago", "cuanto tengo", "alcanza",
-                "economia domestica", "finanzas personales", "mis cuentas"
-            ],
-            
-            "ahorro": [
-                "ahorrar", "ahorro", "ahorros", "guardar", "meta", "objetivo", "juntar", "reservar",
-                "quiero comprar", "necesito", "voy a comprar", "planeo", "juntando",
-                "guardando", "economizar", "separar", "alcancia"
-            ],
-            
-            "inversiones": [
-                "invertir", "inversion", "inversiones", "acciones", "bonos", 
-                "plazo fijo", "crypto", "criptomonedas", "fondos", "donde pongo", 
-                "rentabilidad", "ganar", "multiplicar", "hacer crecer", "rendimiento", 
-                "que me conviene", "mejor opcion", "aguinaldo", "sueldo anual", 
-                "bonus", "prima", "cedear", "etf", "fci"
-            ],
-            
-            "deudas": [
-                "deuda", "deudas", "prestamo", "credito", "tarjeta", 
-                "cuota", "intereses", "debo", "pagar", "prestan", "financiacion",
-                "adeudo", "cancelar", "saldar", "cuotas", "mensualidades", "banco",
-                "me atrase", "no puedo pagar", "refinanciar"
-            ],
-            
-            "educacion": [
-                "aprender", "ensenar", "explicar", "que es", "como funciona", 
-                "no entiendo", "concepto", "significa", "quiere decir", "ayuda a entender",
-                "me gustaria saber", "quisiera saber", "podrias explicar", "podrías explicar",
-                "curso", "tutorial", "ensenanza"
-            ],
-            
-            "calculadora": [
-                "calcular", "calcula", "cuanto", "simular", "simulador",
-                "en cuanto tiempo", "cuota", "plazo", "rendimiento", "comparar",
-                "dame numeros", "hazme cuentas", "sacame la cuenta"
-            ],
-        }
-        
-        # Patrones de intención (frases típicas)
-        self.intent_patterns = {
-            "presupuesto": [
-                "cobro", "gano", "tengo de sueldo", "ingreso", "me pagan",
-                "cuanto me alcanza", "llegando a fin de mes", "no me alcanza"
-            ],
-            "ahorro": [
-                "quiero comprar", "voy a comprar", "necesito juntar", "me gustaria tener",
-                "planear para", "meta de", "objetivo de", "en cuanto tiempo"
-            ],
-            "inversiones": [
-                "donde poner", "que hago con", "me conviene", "recomendas", 
-                "mejor manera de", "opciones para", "puedo hacer con"
-            ],
-            "deudas": [
-                "me quedan", "estoy pagando", "no puedo pagar", "atrasado con",
-                "cuotas de", "banco me", "tarjeta me cobra"
-            ],
-        }
-        
         # Contexto de conversación con memoria extendida
         self.last_scenario = None
         self.last_user_message = None
@@ -215,63 +669,84 @@ class ChatBot:
         }
         self.user_data = {}
         self.user_phone = "web_user"  # Default para web, se sobrescribe en WhatsApp
+
+    def export_state(self) -> Dict[str, Any]:
+        """
+        Estado conversacional como dict compacto y serializable a JSON.
+        Solo incluye los campos con valor; import_state/from_state lo invierten.
+        """
+        conv = self.conversation_state
+        state: Dict[str, Any] = {"v": STATE_VERSION, "turns": conv.get('turn_count', 0)}
+        for key, value in (
+            ("scenario", self.last_scenario),
+            ("last", self.last_user_message),
+            ("waiting", conv.get('waiting_for')),
+            ("topic", conv.get('last_topic')),
+            ("partial", conv.get('partial_data')),
+            ("data", self.user_data),
+        ):
+            if value:
+                state[key] = value
+        return state
+
+    def import_state(self, state: Mapping[str, Any]) -> "ChatBot":
+        """Reemplaza el estado conversacional por el exportado con export_state."""
+        if state.get("v", STATE_VERSION) != STATE_VERSION:
+            raise ValueError(f"Versión de estado no soportada: {state.get('v')}")
+        self.last_scenario = state.get("scenario")
+        self.last_user_message = state.get("last")
+        self.conversation_state = {
+            'waiting_for': state.get("waiting"),
+            'partial_data': copy.deepcopy(state.get("partial") or {}),
+            'last_topic': state.get("topic"),
+            'turn_count': int(state.get("turns", 0)),
+        }
+        self.user_data = copy.deepcopy(state.get("data") or {})
+        return self
+
+    @classmethod
+    def from_state(cls, state: Mapping[str, Any], user_phone: Optional[str] = None) -> "ChatBot":
+        bot = cls().import_state(state)
+        if user_phone:
+            bot.user_phone = user_phone
+        return bot
+
+    @property
+    def keywords(self) -> Mapping[str, Tuple[str, ...]]:
+        """Keywords normalizadas por escenario (vista de solo lectura del léxico compartido)."""
+        return self.lexicon.keywords
+
+    @property
+    def intent_patterns(self) -> Mapping[str, Tuple[str, ...]]:
+        """Patrones de intención por escenario (vista de solo lectura del léxico compartido)."""
+        return self.lexicon.intent_patterns
     
     def similarity(self, text1: str, text2: str) -> float:
         """Calcula similitud entre dos textos (0.0 a 1.0)"""
         return SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
     
-    def analyze_sentiment(self, text: str) -> Tuple[str, str]:
+    def analyze_sentiment(self, message: Union[str, MessageContext]) -> Tuple[str, str]:
         """
         Analiza el sentimiento y emoción del mensaje del usuario.
         Retorna: (sentimiento, emoción)
         """
-        t = text.lower()
-        
-        # Palabras positivas
-        positive_words = [
-            "bien", "genial", "excelente", "bueno", "gracias", "perfecto", 
-            "feliz", "contento", "alegre", "esperanza", "optimista", "listo",
-            "quiero", "voy a", "puedo", "lograr", "éxito", "mejor", "avanzar"
-        ]
-        
-        # Palabras negativas
-        negative_words = [
-            "mal", "terrible", "horrible", "preocupado", "preocupación", "angustia",
-            "desesperado", "agobiado", "estresado", "triste", "miedo", "pánico",
-            "crisis", "urgente", "no puedo", "imposible", "nunca", "peor"
-        ]
-        
-        # Emociones específicas con keywords
-        emotions = {
-            "preocupado": ["preocupado", "preocupa", "inquieto", "nervioso", "ansioso", "intranquilo"],
-            "estresado": ["estresado", "estrés", "agobiado", "presión", "sobrecargado", "no aguanto"],
-            "confundido": ["confundido", "no entiendo", "perdido", "no sé", "ayuda", "como hago"],
-            "desesperado": ["desesperado", "urgente", "no puedo más", "crisis", "grave", "crítico"],
-            "motivado": ["motivado", "quiero", "voy a", "listo", "empezar", "comenzar", "dale"],
-            "frustrado": ["frustrado", "harto", "cansado", "siempre", "otra vez", "no funciona"],
-            "esperanzado": ["espero", "ojalá", "deseo", "sueño", "meta", "objetivo", "futuro"]
-        }
-        
-        # Contar palabras positivas y negativas
-        pos_count = sum(1 for word in positive_words if word in t)
-        neg_count = sum(1 for word in negative_words if word in t)
-        
-        # Detectores de estrés financiero
-        financial_stress = [
-            "no me alcanza", "no llego", "no puedo pagar", "me quedé sin",
-            "problemas de plata", "no tengo", "me falta", "atrasado"
-        ]
-        if any(phrase in t for phrase in financial_stress):
-            neg_count += 2
-        
-        # Detectores de proactividad
-        proactive = [
-            "quiero aprender", "mejorar", "planear", "organizar",
-            "hacer un plan", "tomar control", "cambiar"
-        ]
-        if any(phrase in t for phrase in proactive):
-            pos_count += 2
-        
+        scores = self.score_sentiment(message)
+        return scores.sentiment, scores.emotion
+
+    def score_sentiment(self, message: Union[str, MessageContext]) -> SentimentScores:
+        """
+        Puntajes de sentimiento y de cada emoción con una sola búsqueda por
+        keyword distinta. Cada keyword presente suma 1 a cada grupo al que pertenece.
+        """
+        counts = SENTIMENT_MATCHER.count(MessageContext.of(message).lower)
+
+        pos_count = counts.get("positive", 0)
+        neg_count = counts.get("negative", 0)
+        if "financial_stress" in counts:
+            neg_count += PHRASE_BONUS
+        if "proactive" in counts:
+            pos_count += PHRASE_BONUS
+
         # Determinar sentimiento general
         if neg_count > pos_count:
             sentiment = "negativo"
@@ -279,270 +754,277 @@ class ChatBot:
             sentiment = "positivo"
         else:
             sentiment = "neutral"
-        
-        # Detectar emoción específica
+
+        # Emoción específica: la de mayor puntaje (la primera en caso de empate)
+        emotion_scores = {emot: counts.get(group, 0) for emot, group in EMOTION_GROUPS.items()}
         emotion = "none"
         emotion_score = 0
-        for emot, keywords in emotions.items():
-            score = sum(1 for kw in keywords if kw in t)
+        for emot, score in emotion_scores.items():
             if score > emotion_score:
                 emotion_score = score
                 emotion = emot
-        
-        return sentiment, emotion
 
-    def detect(self, text: str) -> str:
-        # Primero convertir "lucas" a miles antes de normalizar
-        text_with_lucas = parse_lucas(text)
-        t = normalize_text(text_with_lucas)
+        return SentimentScores(
+            sentiment=sentiment,
+            emotion=emotion,
+            positive=pos_count,
+            negative=neg_count,
+            emotions=MappingProxyType(emotion_scores),
+        )
+
+    # Textos distintos memorizados por detect_batch antes de reiniciar el caché
+    BATCH_CACHE_SIZE = 100_000
+
+    @classmethod
+    def detect_batch(cls, messages: Iterable[str]) -> List[str]:
+        """
+        Clasifica mensajes sueltos sin efectos secundarios: cada uno se evalúa
+        como primer mensaje de una conversación nueva (sin estado previo), sin
+        tocar la base de datos ni chat_logs.csv. Comparte un único bot y los
+        textos repetidos se clasifican una sola vez.
+        """
+        bot = cls()
+        seen: Dict[str, str] = {}
+        scenarios: List[str] = []
+        for message in messages:
+            scenario = seen.get(message)
+            if scenario is None:
+                if len(seen) >= cls.BATCH_CACHE_SIZE:
+                    seen.clear()
+                scenario = seen[message] = bot.detect(message)
+            scenarios.append(scenario)
+        return scenarios
+
+    def detect(self, message: Union[str, MessageContext]) -> str:
+        ctx = MessageContext.of(message)
+        if not self.trace_detect:
+            return self._detect(ctx, NULL_TRACE)
+        trace = DetectTrace(ctx.raw)
+        scenario = self._detect(ctx, trace)
+        TRACE_STATS.record(trace)
+        self.last_trace = trace
+        return scenario
+
+    def _detect(self, ctx: MessageContext, trace) -> str:
+        # Modo modelo: solo para mensajes sin un dato pendiente de la conversación
+        # (las respuestas a preguntas del bot dependen del estado, no del texto)
+        if self.intent_model is not None and not self.conversation_state.get('waiting_for'):
+            trace.begin("model")
+            scenario, confidence = self.intent_model.predict(ctx.normalized)
+            if confidence >= self.intent_model_threshold:
+                return trace.fire("model", scenario)
+        return self.detect_rules(ctx, trace)
+
+    def detect_rules(self, message: Union[str, MessageContext], trace=NULL_TRACE) -> str:
+        """
+        Cascada de reglas de detección de escenario. Cada return nombra la
+        regla que decidió (ver detect_trace); con NULL_TRACE no se registra nada.
+        """
+        # El contexto ya trae "lucas" convertidas a miles y el texto normalizado
+        ctx = MessageContext.of(message)
+        trace.begin("scan")
+        text = ctx.raw
+        t = ctx.normalized
         last = self.last_scenario
         waiting = self.conversation_state.get('waiting_for')
 
+        # Una sola pasada del autómata sobre el texto normalizado
+        lexicon = self.lexicon
+        hits = lexicon.matcher.scan(t)
+        tokens = ctx.tokens
+        has_digits = re.search(r"\d+", t) is not None
+        trace.begin("priority_rules")
+
         # 0) INTENCIONES PRIORITARIAS ANTES DEL MAPEO DIRECTO
-        # Educación primero: si el usuario pide definiciones/explicaciones o quiere aprender, priorizar EDUCACION
-        educational_triggers = [
-            "que es", "qué es", "como funciona", "cómo funciona",
-            "explicar", "explicame", "explícame", "significa", "que significa", "qué significa",
-            "aprender", "aprender sobre", "quiero aprender", "quiero aprender sobre"
-        ]
-        # También capturar conceptos financieros sueltos como "inflacion", "interes", "devaluacion"
-        educational_single_words = ["inflacion", "devaluacion", "tasa", "tna", "tea", "cer", "uva", "cedear", "fci", "etf"]
-        
-        # Conceptos educativos multi-palabra (antes que triggers simples)
-        educational_phrases = [
-            "interes simple", "interes compuesto", "simple vs compuesto", "vs compuesto",
-            "diversificacion", "diversificar", "oro como inversion", "ahorro vs inversion"
-        ]
-        if any(phrase in t for phrase in educational_phrases):
-            return "educacion"
-            
-        if any(trig in t for trig in educational_triggers):
-            return "educacion"
+        if hits.has("edu_phrase"):
+            return trace.fire("edu_phrase", "educacion")
+
+        if hits.has("edu_trigger"):
+            return trace.fire("edu_trigger", "educacion")
         # Si es una sola palabra de concepto financiero, ir a educación
-        if len(t.split()) == 1 and t in educational_single_words:
-            return "educacion"
-        
+        if len(tokens) == 1 and t in EDUCATIONAL_SINGLE_WORDS:
+            return trace.fire("edu_single_word", "educacion")
+
         # MEJORA 2: Acrónimos financieros (incluso con ?) → educación
         # Casos: "cer?", "que es cer", "uva", etc.
-        financial_acronyms = ["cer", "uva", "tna", "tea", "cft"]
         # Limpiar signos de puntuación para detectar "cer?" como "cer"
         t_clean = t.replace("?", "").replace("!", "").replace(".", "").replace(",", "").strip()
+        clean_tokens = t_clean.split()
         # Solo si es muy corto (1-2 palabras) o tiene ? → educación
-        if len(t_clean.split()) <= 2 or "?" in text:
-            for acr in financial_acronyms:
-                if acr in t_clean.split():
-                    return "educacion"
+        if len(clean_tokens) <= 2 or "?" in text:
+            for acr in FINANCIAL_ACRONYMS:
+                if acr in clean_tokens:
+                    return trace.fire("financial_acronym", "educacion")
         # FCI, CEDEAR, ETF solos con ? o "que es" → educación (prioridad sobre inversiones)
-        invest_acronyms = ["fci", "cedear", "cedears", "etf", "etfs"]
-        if "?" in text or "que es" in t:
-            for acr in invest_acronyms:
-                if acr in t_clean.split():
-                    return "educacion"
-
-        # Calculadoras: consultas de cálculo (simular, cuánto ganaría, interés compuesto, comparar opciones)
-        # PERO si venimos de inversiones y hay "simular" + números, mantener inversiones
-        calc_patterns = [
-            r"cuanto\s+ganar(ia)?\b", r"si\s+invierto\b", r"interes\s+compuesto", 
-            r"simular\s+prestamo", r"cuota\s+de\s+prestamo", r"en\s+cuanto\s+tiempo\s+pago",
-            r"compar(ar|o)\s+opciones\s+de\s+inversion"
-        ]
-        
-        # Si venimos de inversiones y el usuario dice "simular" con números, mantener inversiones
-        if last == "inversiones" and ("simular" in t or "simula" in t) and re.search(r"\d+", t):
-            return "inversiones"
-        
-        if any(re.search(pat, t) for pat in calc_patterns):
-            return "calculadora"
+        if "?" in text or hits.has("que_es"):
+            for acr in INVEST_ACRONYMS:
+                if acr in clean_tokens:
+                    return trace.fire("invest_acronym_question", "educacion")
+
+        # Calculadoras: si venimos de inversiones y el usuario dice "simular" con números, mantener inversiones
+        if last == "inversiones" and hits.has("simular") and has_digits:
+            return trace.fire("inversiones_simular_context", "inversiones")
+
+        if CALC_PATTERNS.search(t):
+            return trace.fire("calc_pattern", "calculadora")
 
         # CONTEXTO: Si venimos hablando de INVERSIONES y el usuario menciona 'tasa', '%' o 'aporte/ahorro mensual',
         # o meses/años con números, mantener INVERSIONES para evitar desvíos por la palabra 'ahorro'.
         if last == "inversiones":
-            if any(kw in t for kw in ["tasa", "%", "aporte", "aporte mensual", "ahorro mensual", "mensual", "simula", "simular", "dale", "ok"]):
-                return "inversiones"
+            if hits.has("inv_context"):
+                return trace.fire("inversiones_context_keyword", "inversiones")
             # Meses/años + número → sigue siendo inversiones
-            if (re.search(r"\d+", t) and any(kw in t for kw in ["mes", "meses", "anio", "anios", "año", "años"])):
-                return "inversiones"
+            if has_digits and hits.has("time_unit"):
+                return trace.fire("inversiones_context_time", "inversiones")
 
         # PRIORIDAD: Preguntas de inversión con "dónde rinde", "dónde me conviene", "qué hago" + monto
         # Esto debe ir ANTES de ahorro para capturar "donde rinde mas" correctamente
-        inversion_question_keywords = ["que hago", "que puedo hacer", "donde rinde", "rinde mas", "rinde más", 
-                                        "me conviene", "que me conviene", "donde me conviene", "donde poner", 
-                                        "donde meter", "donde invertir", "que hago con"]
-        if any(kw in t for kw in inversion_question_keywords):
+        if hits.has("inv_question"):
             # Verificar que haya mención de dinero/monto
-            if re.search(r"\d+", t) or any(money_kw in t for money_kw in ["lucas", "pesos", "plata", "dinero", "guita"]):
-                return "inversiones"
+            if has_digits or hits.has("money"):
+                return trace.fire("inversion_question", "inversiones")
 
         # Ahorro: expresiones típicas de ahorro con 'plata' (dinero) o metas de viaje
-        if any(kw in t for kw in ["necesito juntar plata", "juntar plata", "guardar dinero", "fondo de emergencia", "viajar", "viaje", "vacaciones", "europa"]):
-            return "ahorro"
+        if hits.has("ahorro_phrase"):
+            return trace.fire("ahorro_phrase", "ahorro")
 
         # MEJORA 1: Detectar "quiero viajar a [destino]" como ahorro
-        # Patrones: viajar/vacacionar/conocer/ir/visitar + a/en + [destino/lugar]
-        travel_patterns = [
-            r"viajar\s+(a|en)",
-            r"vacacionar\s+(a|en)",
-            r"conocer\s+[a-záéíóúñ]+",
-            r"visitar\s+[a-záéíóúñ]+",
-            r"ir\s+a\s+[a-záéíóúñ]+"
-        ]
-        if any(re.search(pat, t) for pat in travel_patterns):
-            return "ahorro"
+        if TRAVEL_PATTERNS.search(t):
+            return trace.fire("travel_pattern", "ahorro")
 
-        # Ahorro: planificar/planear compra de bienes (casa/auto/moto/viaje) → es un plan de ahorro, no calculadora
-        ahorro_bienes = ["casa", "vivienda", "departamento", "depto", "auto", "carro", "coche", "vehiculo", "vehículo", "moto", "camioneta", "viaje", "vacaciones"]
-        if ("planear compra" in t or "planificar compra" in t or "plan de compra" in t) and any(b in t for b in ahorro_bienes):
-            return "ahorro"
+        # Ahorro: planificar/planear compra de bienes → es un plan de ahorro, no calculadora
+        if hits.has("plan_compra") and hits.has("ahorro_bien"):
+            return trace.fire("plan_compra", "ahorro")
 
         # Casos coloquiales con dinero → inversiones
-        # "tengo X que hago", "me sobran X", "tengo X tiradas", etc.
-        money_question_patterns = [
-            r"(tengo|me sobran?|tengo.*tirad[oa]s?)\s+\$?\s*\d+",
-            r"\d+\s+(que hago|que puedo hacer|donde (poner|meter|invertir)|que me conviene)"
-        ]
-        
-        if any(re.search(pat, t) for pat in money_question_patterns):
-            return "inversiones"
-
-        # MAPEO DIRECTO de keywords prioritarias
-        direct_map = {
-            "inversiones": ["invertir", "inversion", "inversiones", "aguinaldo", "oro", "gold",
-                          "dolar", "dollar", "usd", "cripto", "crypto", "bitcoin", "btc", "ethereum", "eth",
-                          "acciones", "accion", "stock", "bolsa", "plazo fijo", "cedear", "cedears", "fci",
-                          "bonos", "bono", "etf", "rendimiento", "donde poner", "donde invertir"],
-            "presupuesto": ["presupuesto", "organizar gastos", "distribuir ingresos", "gano", "ingreso"],
-            "ahorro": ["ahorrar", "ahorro"],
-            "deudas": ["deuda", "prestamo", "tarjeta", "credito", "debo", "pagar cuota"],
-            # 'educacion' y 'calculadora' ya priorizados arriba, pero mantenemos por compatibilidad
-            "educacion": ["que es", "como funciona", "explicar", "explicame", "ensenar", "aprender"],
-            "calculadora": ["calculadora", "calcular", "simular"]
-        }
-        for scenario, keywords in direct_map.items():
-            for keyword in keywords:
-                if keyword in t:
-                    return scenario
+        if MONEY_QUESTION_PATTERNS.search(t):
+            return trace.fire("money_question", "inversiones")
 
-        partial = self.conversation_state.get('partial_data', {})
+        # MAPEO DIRECTO de keywords prioritarias (primer escenario en orden con alguna keyword)
+        direct = hits.first_group(DIRECT_MAP_GROUPS)
+        if direct:
+            return trace.fire("direct_map", direct.split(":", 1)[1])
 
         # MEJORA 3: Manejo robusto de respuestas cortas y contexto
-        short_confirm = ["si", "sí", "no", "dale", "ok", "bueno", "claro", "genial", "perfecto"]
-        
         # Si hay un waiting_for activo, SIEMPRE mantener el escenario (prioridad máxima)
         if waiting:
-            return last or "ayuda"
-        
+            return trace.fire("waiting_for", last or "ayuda")
+
         # Si la respuesta es muy corta y hay contexto fuerte, mantener escenario anterior
-        if len(t.split()) <= 3:
-            if last in ["presupuesto", "ahorro", "deudas", "inversiones"]:
+        if len(tokens) <= 3:
+            if last in PRIORITY_SCENARIOS:
                 # Respuestas de confirmación
-                if any(word in t for word in short_confirm):
-                    return last
+                if hits.has("short_confirm"):
+                    return trace.fire("short_confirm", last)
                 # Números con posible contexto temporal (meses, años)
                 if re.search(r'\d+\s*(mes|meses|año|años|anio|anios)', t):
-                    return last
+                    return trace.fire("short_time_number", last)
                 # Números solos si hay contexto fuerte
                 if re.match(r'^\d+[\d\s.,]*$', t):
-                    return last
+                    return trace.fire("short_number", last)
 
         # Si es solo un número y hay contexto previo
         if re.match(r'^\d+[\d\s.,]*$', t):
-            if last in ["presupuesto", "ahorro", "deudas", "inversiones"]:
-                return last or "ayuda"
+            if last in PRIORITY_SCENARIOS:
+                return trace.fire("number_only", last or "ayuda")
 
         # Detección de metas de ahorro (una palabra)
-        ahorro_metas = {"casa", "vivienda", "departamento", "depto", "hogar", "auto", "carro", "coche", "vehiculo", "moto", "camioneta", "viaje", "vacaciones", "vacacionar", "conocer", "emergencia", "emergencias", "fondo", "boda", "casamiento", "matrimonio", "estudios", "universidad", "maestria", "curso"}
-        if len(t.split()) == 1 and t in ahorro_metas:
+        if len(tokens) == 1 and t in AHORRO_METAS:
             if last in ["ahorro", "presupuesto", "deudas", "inversiones"] or waiting == "meta_ahorro":
-                return "ahorro"
+                return trace.fire("ahorro_meta", "ahorro")
 
         # Detección de palabras clave sueltas (1-2 palabras)
-        if len(t.split()) <= 2:
-            single_word_map = {
-                "presupuesto": "presupuesto", "presupuestos": "presupuesto",
-                "ahorro": "ahorro", "ahorrar": "ahorro", "ahorros": "ahorro",
-                "inversion": "inversiones", "inversiones": "inversiones",
-                "deuda": "deudas", "deudas": "deudas",
-                "educacion": "educacion", "aprender": "educacion",
-                "calculadora": "calculadora", "calcular": "calculadora",
-            }
-            for word in t.split():
-                if word in single_word_map:
-                    return single_word_map[word]
+        if len(tokens) <= 2:
+            for word in tokens:
+                if word in SINGLE_WORD_MAP:
+                    return trace.fire("single_word", SINGLE_WORD_MAP[word])
 
         # Remover stop words para mejor detección
-        stop_words = {"el", "la", "los", "las", "un", "una", "de", "del", "al", "para", "por", "con", "en", "a", "y", "o", "pero", "que", "mi", "me", "te", "lo", "su", "sus", "se", "si", "no", "es", "son", "muy", "mas", "como", "cuando", "donde", "quien", "cual"}
-        words = [w for w in t.split() if w not in stop_words and len(w) > 2]
+        trace.begin("scoring")
+        words = ctx.content_tokens
         normalized = " ".join(words)
+        hits_filtered = lexicon.matcher.scan(normalized) if normalized != t else hits
 
         # Detección por patrones de intención
-        pattern_scores = {scen: 0 for scen in self.keywords.keys()}
-        for scen, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                if pattern in t:
-                    pattern_scores[scen] += 3
+        pattern_scores = {scen: 0 for scen in lexicon.scenarios}
+        for scen, weights in lexicon.pattern_weights.items():
+            for pattern in hits.matched("pattern:" + scen):
+                pattern_scores[scen] += 3 * weights[pattern]
 
         # Detección por keywords
-        keyword_scores = {scen: 0 for scen in self.keywords.keys()}
-        for scen, keys in self.keywords.items():
-            for keyword in keys:
-                keyword_norm = normalize_text(keyword)
-                if keyword_norm in t or keyword_norm in normalized:
-                    keyword_scores[scen] += 2
+        keyword_scores = {scen: 0 for scen in lexicon.scenarios}
+        exact: Dict[str, Set[str]] = {}
+        for scen, weights in lexicon.keyword_weights.items():
+            found = hits.matched("keyword:" + scen) | hits_filtered.matched("keyword:" + scen)
+            parts = hits.matched("keyword_part:" + scen)
+            matched = exact[scen] = set()
+            for keyword_norm, count in weights.items():
+                if keyword_norm in found or (" " in keyword_norm and all(kw in parts for kw in keyword_norm.split())):
+                    keyword_scores[scen] += 2 * count
+                    matched.add(keyword_norm)
+
+        trace.begin("fuzzy")
+        # Coincidencias aproximadas (typos): el índice devuelve todos los
+        # candidatos que pueden superar el umbral y se confirman con ratio().
+        # ratio = 2·M/(a+b) <= 2·k/(n+k): una palabra de más de (2-t)/t ≈ 1.35×
+        # la keyword más larga nunca lo supera
+        umbral = FUZZY_MIN_SIMILARITY
+        max_len = math.ceil(lexicon.fuzzy.max_term_len * (2 - umbral) / umbral)
+        for word in words:
+            if len(word) <= 3 or len(word) > max_len:
+                continue
+            for keyword_norm in lexicon.fuzzy.lookup(word):
+                if self.similarity(word, keyword_norm) <= umbral:
                     continue
-                keyword_words = keyword_norm.split()
-                if len(keyword_words) > 1:
-                    if all(kw in t for kw in keyword_words):
-                        keyword_scores[scen] += 2
-                        continue
-                for word in words:
-                    if len(word) > 3 and self.similarity(word, keyword_norm) > 0.85:
-                        keyword_scores[scen] += 1
+                for scen, weights in lexicon.keyword_weights.items():
+                    if keyword_norm in weights and keyword_norm not in exact[scen]:
+                        keyword_scores[scen] += weights[keyword_norm]
 
         # Combinar puntuaciones
         total_scores = {}
-        for scen in self.keywords.keys():
+        for scen in lexicon.scenarios:
             total_scores[scen] = pattern_scores[scen] + keyword_scores[scen]
 
         # Boost de educación si hay palabras educativas
-        educational_triggers = ["que es", "como funciona", "explicar", "explicame", "ensenar", "aprender", "sobre", "acerca de", "quiero aprender"]
-        if any(trigger in t for trigger in educational_triggers):
+        if hits.has("edu_boost"):
             if total_scores.get('educacion', 0) > 0:
                 max_other = max([score for scen, score in total_scores.items() if scen != 'educacion'], default=0)
                 if max_other < 2:
                     total_scores['educacion'] += 1
 
+        trace.scores(pattern_scores, keyword_scores, total_scores)
+        trace.begin("fallback")
+
         # Retornar el mejor match
         best = max(total_scores.items(), key=lambda x: x[1])
         if best[1] > 0:
-            return best[0]
+            return trace.fire("best_score", best[0])
 
         # Detección por contexto semántico
         if re.search(r'\d{5,}', t):
-            if any(w in t for w in ["debo", "deb", "pagar", "cuota"]):
-                return "deudas"
-            elif any(w in t for w in ["quiero", "comprar", "juntar", "necesito"]):
-                return "ahorro"
+            if hits.has("deuda_context"):
+                return trace.fire("semantic_deudas", "deudas")
+            elif hits.has("ahorro_context"):
+                return trace.fire("semantic_ahorro", "ahorro")
             else:
-                return "presupuesto"
+                return trace.fire("semantic_presupuesto", "presupuesto")
 
         # Si hace preguntas → educación
-        if any(w in t for w in ["qué", "que", "cómo", "como", "por qué", "porque", "significa"]):
-            return "educacion"
+        if hits.has("question"):
+            return trace.fire("question", "educacion")
 
-        return "ayuda"
+        return trace.fire("default", "ayuda")
 
-    def handle_presupuesto(self, text: str, dt: datetime) -> str:
-        # Convertir "lucas" primero
-        text = parse_lucas(text)
-        m = re.search(r"\$?\s*(\d+(?:[.,]\d{3})*(?:[.,]\d{2})?)", text)
+    def handle_presupuesto(self, message: Union[str, MessageContext], dt: datetime) -> str:
+        ctx = MessageContext.of(message)
+        montos = ctx.entities.amounts
         
-        if m:
-            monto_str = m.group(1).replace(",", "")
-            monto = float(monto_str.replace(".", ""))
+        if montos:
+            monto = montos[0].value
             self.user_data['ingreso'] = monto
             # Persistir ingreso mensual del usuario
             try:
-                update_user_fields(getattr(self, 'user_phone', 'web_user'), monthly_income=monto)
+                self._update_profile(monthly_income=monto)
             except Exception:
                 pass
             self.conversation_state['waiting_for'] = None
@@ -573,10 +1055,9 @@ class ChatBot:
             )
 
 
-    def handle_ahorro(self, text: str, dt: datetime) -> str:
-        # Convertir "lucas" primero
-        text = parse_lucas(text)
-        t = text.lower()
+    def handle_ahorro(self, message: Union[str, MessageContext], dt: datetime) -> str:
+        ctx = MessageContext.of(message)
+        t = ctx.lower
         
         # Detectar metas específicas (mejorado con más keywords)
         metas_map = {
@@ -594,22 +1075,10 @@ class ChatBot:
                 metas_detectadas.append(meta)
                 break  # Solo tomar la primera meta detectada
         
-        # Extraer monto objetivo si existe
-        # CRÍTICO: Detectar primero si hay palabras temporales para evitar confusión
-        tiene_temporal = any(k in t for k in ["mes", "meses", "año", "años", "anio", "anios", "a.", "m."])
-        
-        # Extraer números
-        nums_raw = re.findall(r"\d+(?:[.,]\d+)?", text)
-        nums = [float(n.replace('.', '').replace(',', '')) for n in nums_raw] if nums_raw else []
-        
-        # Si hay palabra temporal, filtrar números pequeños (probablemente sean plazo, no monto)
-        monto_candidatos = []
-        if tiene_temporal:
-            # Solo considerar números >= 100 como monto (evita confundir "3 meses" con $3)
-            monto_candidatos = [x for x in nums if x >= 100]
-        else:
-            # Sin temporal, cualquier número puede ser monto
-            monto_candidatos = nums
+        # Extraer monto objetivo si existe: los plazos ("3 meses") y tasas ya
+        # vienen tipados, así que no se confunden con montos
+        ents = ctx.entities
+        monto_candidatos = [e.value for e in ents.amounts]
         
         # Determinar si tenemos monto
         tiene_monto = False
@@ -633,9 +1102,8 @@ class ChatBot:
                 
                 # Persistir meta de ahorro
                 try:
-                    update_user_fields(getattr(self, 'user_phone', 'web_user'), 
-                                     savings_goal=objetivo, 
-                                     savings_purpose=meta_str)
+                    self._update_profile(savings_goal=objetivo,
+                                         savings_purpose=meta_str)
                 except Exception:
                     pass
                 
@@ -669,9 +1137,8 @@ class ChatBot:
             
             # Persistir
             try:
-                update_user_fields(getattr(self, 'user_phone', 'web_user'), 
-                                 savings_goal=objetivo,
-                                 savings_purpose=meta_str)
+                self._update_profile(savings_goal=objetivo,
+                                     savings_purpose=meta_str)
             except Exception:
                 pass
             
@@ -694,23 +1161,11 @@ class ChatBot:
         
         # CASO 3: Tenemos PLAZO (después de tener meta + monto)
         if self.conversation_state.get('waiting_for') == 'ahorro_plazo':
-            # Extraer meses del texto
-            meses = None
-            if "mes" in t:
-                m_meses = re.search(r"(\d+)\s*mes", t)
-                if m_meses:
-                    meses = int(m_meses.group(1))
-            elif "año" in t or "anio" in t:
-                m_años = re.search(r"(\d+)\s*a[ñn]o", t)
-                if m_años:
-                    meses = int(m_años.group(1)) * 12
-            elif nums:
-                # Evitar confundir 'aporte/ahorro mensual' o 'tasa %' con plazo
-                if any(kw in t for kw in ["tasa", "%", "mensual", "aporte"]):
-                    meses = None
-                else:
-                    # Solo un número, en ausencia de otras pistas, asumimos meses
-                    meses = int(max(nums))
+            # Plazo del mensaje (meses/años ya convertidos a meses)
+            meses = ents.duration_months
+            if meses is None and ents.money and not (ents.rates or ents.contributions):
+                # Solo un número, en ausencia de otras pistas, asumimos meses
+                meses = int(max(e.value for e in ents.money))
             
             if meses:
                 objetivo = self.conversation_state['partial_data'].get('monto', 0)
@@ -758,11 +1213,10 @@ class ChatBot:
             f"¿Para qué quieres ahorrar? Escribe tu meta y el monto."
         )
 
-    def handle_inversiones(self, text: str, dt: datetime) -> str:
-        # Convertir "lucas" primero
-        text = parse_lucas(text)
-        t = text.lower()
-        t_norm = normalize_text(text)
+    def handle_inversiones(self, message: Union[str, MessageContext], dt: datetime) -> str:
+        ctx = MessageContext.of(message)
+        t = ctx.lower
+        t_norm = ctx.normalized
 
         # Si estamos esperando explicar "cómo comprar bonos en dólares" o el usuario lo pide explícitamente
         explain_bonos_patterns = [
@@ -975,40 +1429,19 @@ class ChatBot:
         conservador = any(w in t for w in ["seguro", "sin riesgo", "conservador", "tranquilo", "no arriesgar"])
         agresivo = any(w in t for w in ["agresivo", "riesgo alto", "cripto", "acciones", "rápido"])
 
-        # Extraer números y desambiguar horizonte vs monto
-        nums_raw = re.findall(r"\d+(?:[.,]\d+)?", text)
-        nums = [float(n.replace('.', '').replace(',', '')) for n in nums_raw]
+        # Horizonte y monto desde las entidades del turno (plazos ya en meses)
+        ents = ctx.entities
         monto: Optional[float] = None
-        horizonte_meses: Optional[int] = None
+        horizonte_meses: Optional[int] = ents.duration_months
+        montos = [e.value for e in ents.amounts]
 
-        # CRÍTICO: Detectar primero si hay palabras temporales
-        tiene_mes = any(k in t for k in ["mes", "meses", "m."])
-        tiene_ano = any(k in t for k in ["año", "años", "anio", "anios", "a."])
-        
-        # Heurísticas de horizonte: si hay palabra temporal, el PRIMER número pequeño es horizonte
-        if tiene_mes:
-            candidatos = [int(x) for x in nums if x <= 120]  # hasta 120 meses (10 años)
-            if candidatos:
-                horizonte_meses = candidatos[0]
-                # Remover de nums para no confundir con monto
-                nums = [x for x in nums if x != candidatos[0]]
-        elif tiene_ano:
-            candidatos = [int(x) for x in nums if x <= 50]  # hasta 50 años
-            if candidatos:
-                horizonte_meses = candidatos[0] * 12
-                # Remover de nums para no confundir con monto
-                nums = [x for x in nums if x != candidatos[0]]
-
-        # Heurísticas de monto: si queda algún número grande, es el monto
-        if nums:
-            # Si hay un número > 100, probablemente sea monto
-            grandes = [x for x in nums if x >= 100]
-            if grandes:
-                monto = max(grandes)
-            elif nums:
-                # Si solo hay números chicos y NO había palabra temporal, asumir que es monto
-                if not tiene_mes and not tiene_ano:
-                    monto = max(nums)
+        # Heurísticas de monto: si hay un número >= 100, probablemente sea monto
+        grandes = [x for x in montos if x >= 100]
+        if grandes:
+            monto = max(grandes)
+        elif montos and horizonte_meses is None:
+            # Si solo hay números chicos y NO había plazo, asumir que es monto
+            monto = max(montos)
 
         # Recuperar contexto previo de inversiones si existe
         inv_ctx = self.conversation_state['partial_data'].get('inversion', {})
@@ -1056,8 +1489,17 @@ class ChatBot:
         # Ahora sí recuperar valores del contexto normalmente
         if monto is None and 'monto' in inv_ctx:
             monto = inv_ctx['monto']
-        if horizonte_meses is None and 'horizonte_meses' in inv_ctx:
+        # El contexto puede guardar el horizonte como None (monto sin plazo)
+        if horizonte_meses is None and inv_ctx.get('horizonte_meses') is not None:
             horizonte_meses = inv_ctx['horizonte_meses']
+            if monto is None:
+                # Solo llegó una tasa u otro dato sin monto: conservar el plazo y pedir el monto
+                self.conversation_state['partial_data']['inversion'] = {'monto': None, 'horizonte_meses': horizonte_meses}
+                self.conversation_state['waiting_for'] = 'inversion_datos'
+                return (
+                    f"🕒 Plazo: {horizonte_meses} meses ({horizonte_meses / 12:.1f} años)\n\n"
+                    "¿Con qué monto querés empezar a invertir? (ej: $150000)"
+                )
             años = horizonte_meses / 12
             respuesta_horizonte = (
                 f"✅ Perfecto! Entonces tenemos:\n\n"
@@ -1123,9 +1565,9 @@ class ChatBot:
         # Persistir perfil de riesgo sugerido si el usuario lo expresa
         try:
             if conservador:
-                update_user_fields(getattr(self, 'user_phone', 'web_user'), risk_profile='conservador')
+                self._update_profile(risk_profile='conservador')
             elif agresivo:
-                update_user_fields(getattr(self, 'user_phone', 'web_user'), risk_profile='agresivo')
+                self._update_profile(risk_profile='agresivo')
         except Exception:
             pass
         
@@ -1158,11 +1600,11 @@ class ChatBot:
         if wants_simulation and self.conversation_state.get('waiting_for') == 'simular_bonos_usd':
             self.conversation_state['waiting_for'] = None
             # Si hay números en el mensaje, usarlos para simular bonos USD
-            if nums:
-                monto_bonos = max([x for x in nums if x >= 1000], default=100000)  # min 1000 USD
+            if ents.entities:
+                monto_bonos = max([x for x in montos if x >= 1000], default=100000)  # min 1000 USD
                 años_bonos = 2  # default
-                if tiene_ano and nums:
-                    años_bonos = max([int(x) for x in nums if 0.1 <= x <= 30], default=2)
+                if horizonte_meses:
+                    años_bonos = max(1, round(horizonte_meses / 12))
                 
                 # Tasa típica de bonos Treasury USA (4-5%)
                 tasa_bonos = 4.5
@@ -1196,25 +1638,9 @@ class ChatBot:
                 capital = float(inv['monto'])
                 años = max(0.1, inv['horizonte_meses'] / 12)
 
-                # Intentar extraer tasa y aporte del mensaje actual
-                tasa = None
-                aporte = None
-                # Busca patrones simples tipo "12%" o "tasa 12"
-                m_tasa_pct = re.search(r"(\d+[.,]?\d*)\s*%", t)
-                if m_tasa_pct:
-                    tasa = float(m_tasa_pct.group(1).replace(',', '.'))
-                else:
-                    m_tasa_kw = re.search(r"tasa\s*(\d+[.,]?\d*)", t)
-                    if m_tasa_kw:
-                        tasa = float(m_tasa_kw.group(1).replace(',', '.'))
-
-                # Busca "aporte" o "mensual" seguido de número
-                m_aporte = re.search(r"(aporte|mensual)\D*(\d+[.,]?\d*)", t)
-                if m_aporte:
-                    aporte = float(m_aporte.group(2).replace(',', '.'))
-
-                tasa = tasa if tasa is not None else 12.0
-                aporte = aporte if aporte is not None else 0.0
+                # Tasa ("12%", "tasa 12") y aporte ("aporte 5000", "5000 por mes") del mensaje actual
+                tasa = ents.rate if ents.rate is not None else 12.0
+                aporte = ents.contribution if ents.contribution is not None else 0.0
 
                 resultado = calcular_interes_compuesto(capital, tasa, años, aporte)
                 sim = (
@@ -1258,11 +1684,9 @@ class ChatBot:
             "¿Querés que simulemos el rendimiento con interés compuesto? Podés decir 'dale' o indicar 'tasa 12% y ahorro mensual 5000'."
         )
 
-    def handle_deudas(self, text: str, dt: datetime) -> str:
-        # Convertir "lucas" primero
-        text = parse_lucas(text)
-        m = re.search(r"\$?\s*(\d+(?:[.,]\d{3})*(?:[.,]\d{2})?)", text)
-        t = text.lower()
+    def handle_deudas(self, message: Union[str, MessageContext], dt: datetime) -> str:
+        ctx = MessageContext.of(message)
+        t = ctx.lower
         
         # Detectar tipo de deuda
         tarjeta = any(w in t for w in ["tarjeta", "crédito", "visa", "mastercard"])
@@ -1271,16 +1695,12 @@ class ChatBot:
         
         respuesta = ""
         
-        # Extraer todos los números presentes
-        nums_raw = re.findall(r"\$?\s*(\d+(?:[.,]\d{3})*(?:[.,]\d{2})?)", text)
-        nums = []
-        for nr in nums_raw:
-            v = float(nr.replace(",", "").replace(".", ""))
-            nums.append(v)
-
-        if m:
-            monto_str = m.group(1).replace(",", "")
-            deuda = float(monto_str.replace(".", ""))
+        # Montos presentes (el primero es la deuda mencionada)
+        nums = [e.value for e in ctx.entities.amounts]
+        has_amount = bool(nums)
+
+        if has_amount:
+            deuda = nums[0]
             
             # Si estábamos esperando el pago mensual, guardar ambos datos
             if self.conversation_state['waiting_for'] == 'deuda_pago':
@@ -1324,7 +1744,7 @@ class ChatBot:
             # Primera vez: registrar la deuda total (solo 1 monto presente)
             self.user_data['deuda'] = deuda
             try:
-                update_user_fields(getattr(self, 'user_phone', 'web_user'), total_debt=deuda)
+                self._update_profile(total_debt=deuda)
             except Exception:
                 pass
             
@@ -1363,7 +1783,7 @@ class ChatBot:
         else:
             respuesta = "Entiendo que tienes deudas. No te preocupes, hay solución. 💪\n\n"
         
-        if multiple or not m:
+        if multiple or not has_amount:
             respuesta += (
                 f"🎯 Método Bola de Nieve (muy efectivo):\n"
                 f"1. Lista TODAS tus deudas de menor a mayor\n"
@@ -1384,21 +1804,35 @@ class ChatBot:
         
         return respuesta
 
-    def handle_calculadora(self, text: str, dt: datetime) -> str:
+    def handle_calculadora(self, message: Union[str, MessageContext], dt: datetime) -> str:
         """Maneja consultas que requieren cálculos financieros"""
-        t = text.lower()
-        
-        # Extraer todos los números del texto
-        numeros = re.findall(r'\d+(?:[.,]\d+)?', text)
-        nums = [float(n.replace(',', '')) for n in numeros]
+        ctx = MessageContext.of(message)
+        t = ctx.lower
+        
+        # Entidades tipadas del turno; si falta alguna, se usa la posición del número
+        ents = ctx.entities
+        nums = ents.values
+        montos = [e.value for e in ents.amounts]
+        años_plazo = ents.duration_months / 12 if ents.duration_months is not None else None
+
+        def pick(typed: Optional[float], index: int, default: float) -> float:
+            if typed is not None:
+                return typed
+            # Por posición solo si ese número no quedó tipado como plazo o tasa
+            if len(ents.entities) > index and ents.entities[index].kind in (MONEY, CONTRIBUTION):
+                return ents.entities[index].value
+            return default
         
         # Detectar tipo de cálculo
+        # Sin un monto (solo tasa/plazo) interés compuesto y cuota van a la ayuda
+        hay_monto = bool(montos) and montos[0] > 0
+
         if any(w in t for w in ["interes compuesto", "invertir", "rendimiento", "cuanto ganaria"]):
-            if len(nums) >= 2:
-                capital = nums[0]
-                años = nums[1] if len(nums) > 1 else 5
-                tasa = nums[2] if len(nums) > 2 else 12.0
-                aporte = nums[3] if len(nums) > 3 else 0
+            if len(nums) >= 2 and hay_monto:
+                capital = pick(montos[0] if montos else None, 0, 0)
+                años = pick(años_plazo, 1, 5)
+                tasa = pick(ents.rate, 2, 12.0)
+                aporte = pick(ents.contribution, 3, 0)
                 
                 resultado = calcular_interes_compuesto(capital, tasa, años, aporte)
                 
@@ -1417,10 +1851,30 @@ class ChatBot:
                 )
         
         elif any(w in t for w in ["cuota", "prestamo", "préstamo", "financiar"]):
-            if len(nums) >= 2:
-                monto = nums[0]
-                meses = int(nums[1]) if len(nums) > 1 else 12
-                tasa = nums[2] if len(nums) > 2 else 50.0
+            if len(nums) >= 2 and hay_monto:
+                monto = pick(montos[0] if montos else None, 0, 0)
+                meses = int(pick(ents.duration_months, 1, 12))
+                tasa = pick(ents.rate, 2, 50.0)
+                
+                sistema = ("aleman" if "aleman" in ctx.normalized
+                           else "americano" if "americano" in ctx.normalized else "frances")
+                if sistema != "frances" and monto > 0 and meses >= 1 and tasa >= 0:
+                    # Forma cerrada: O(1) aunque el plazo sea absurdo (el turno tiene el lock de la sesión)
+                    plan = resumen_sin_prepagos(monto, tasa, meses, sistema=sistema)
+                    return (
+                        f"📊 Simulación de Préstamo (sistema {'alemán' if sistema == 'aleman' else sistema}):\n\n"
+                        f"💰 Monto solicitado: ${monto:,.0f}\n"
+                        f"📅 Plazo: {meses} meses ({meses/12:.1f} años)\n"
+                        f"📈 Tasa: {tasa}% anual\n\n"
+                        f"🎯 RESULTADO:\n"
+                        f"• Primera cuota: ${plan['primera_cuota']:,.0f}\n"
+                        f"• Última cuota: ${plan['ultima_cuota']:,.0f}\n"
+                        f"• Total a pagar: ${plan['total_a_pagar']:,.0f}\n"
+                        f"• Intereses: ${plan['intereses_totales']:,.0f}\n\n"
+                        + ("💡 En el alemán la cuota baja mes a mes: pagás menos intereses que en el francés."
+                           if sistema == "aleman" else
+                           "💡 En el americano solo pagás intereses y el capital entero vence en la última cuota.")
+                    )
                 
                 resultado = calcular_cuota_prestamo(monto, tasa, meses)
                 
@@ -1439,9 +1893,9 @@ class ChatBot:
         
         elif any(w in t for w in ["pagar deuda", "cuanto tiempo", "salir de deuda"]):
             if len(nums) >= 2:
-                deuda = nums[0]
-                pago = nums[1]
-                tasa = nums[2] if len(nums) > 2 else 0
+                deuda = pick(ents.money[0].value if ents.money else None, 0, 0)
+                pago = pick(ents.contribution, 1, 0)
+                tasa = pick(ents.rate, 2, 0)
                 
                 resultado = tiempo_pagar_deuda(deuda, pago, tasa)
                 
@@ -1461,11 +1915,13 @@ class ChatBot:
                 )
         
         elif any(w in t for w in ["comparar", "opciones", "mejor inversion"]):
-            if len(nums) >= 1:
-                monto = nums[0]
-                años = nums[1] if len(nums) > 1 else 5
+            # Sin monto (p. ej. "comparar la 12 meses": el 12 es un plazo) va a la ayuda
+            monto = pick(montos[0] if montos else None, 0, 0)
+            if monto > 0:
+                años = pick(años_plazo, 1, 5)
                 
-                opciones = comparar_inversiones(monto, int(años))
+                # Plazos en meses ("por 6 meses") quedan en fracción de año, sin truncar a 0
+                opciones = comparar_inversiones(monto, años)
                 
                 respuesta = f"📊 Comparación de Inversiones:\n\n"
                 respuesta += f"💰 Monto: ${monto:,.0f} por {años} años\n\n"
@@ -1495,9 +1951,9 @@ class ChatBot:
             "Escribe tu consulta con números específicos."
         )
 
-    def handle_educacion(self, text: str, dt: datetime) -> str:
-        # Normalizar para mejor detección
-        t = normalize_text(text)
+    def handle_educacion(self, message: Union[str, MessageContext], dt: datetime) -> str:
+        # Texto ya normalizado en el contexto del turno
+        t = MessageContext.of(message).normalized
         
         # Detectar conceptos específicos (ya normalizados)
         
@@ -1634,7 +2090,7 @@ class ChatBot:
             "Por ejemplo: 'Qué es la inflación' o 'Sobre ahorro'"
         )
 
-    def handle_help(self, text: str, dt: datetime) -> str:
+    def handle_help(self, message: Union[str, MessageContext], dt: datetime) -> str:
         return (
             "¡Hola! Soy tu asistente de educación financiera personal 💰\n\n"
             "¿En qué puedo ayudarte?\n\n"
@@ -1653,41 +2109,81 @@ class ChatBot:
             "Escribe tu consulta naturalmente ✨"
         )
 
+    def _update_profile(self, **fields) -> None:
+        """Cambios de perfil: se acumulan en el UserTurn del turno o se escriben directo fuera de process."""
+        if self._turn is not None:
+            self._turn.update(**fields)
+        else:
+            update_user_fields(getattr(self, 'user_phone', 'web_user'), **fields)
+
+    def _open_turn(self) -> Optional[UserTurn]:
+        """Carga/crea el perfil DB una vez por turno y pre-carga datos útiles al estado."""
+        if not getattr(self, 'user_phone', None):
+            return None
+        try:
+            turn = UserTurn(self.user_phone).open()
+        except Exception:
+            return None
+        if turn.user.monthly_income and 'ingreso' not in self.user_data:
+            self.user_data['ingreso'] = turn.user.monthly_income
+        return turn
+
     def process(self, user_text: str, when: Optional[datetime] = None) -> BotResult:
+        """Un turno completo; los cambios de perfil se escriben en un solo commit al final."""
+        self._turn = self._open_turn()
+        completed = False
+        try:
+            result = self._process_turn(user_text, when)
+            completed = True
+            return result
+        finally:
+            turn, self._turn = self._turn, None
+            if turn is not None:
+                try:
+                    # Un turno que falló no guarda cambios de perfil a medio aplicar
+                    turn.close(commit=completed)
+                except Exception as e:
+                    print(f"⚠️ No se pudieron guardar los cambios de perfil del turno: {e}")
+
+    def _process_turn(self, user_text: str, when: Optional[datetime]) -> BotResult:
         when = when or datetime.now()
         
         # Incrementar el contador de turnos
         self.conversation_state['turn_count'] += 1
-        # Cargar/crear perfil DB y pre-cargar datos útiles al estado (si existen)
-        if getattr(self, 'user_phone', None):
-            try:
-                db_user = get_or_create_user(self.user_phone)
-                if db_user.monthly_income and 'ingreso' not in self.user_data:
-                    self.user_data['ingreso'] = db_user.monthly_income
-            except Exception:
-                pass
-        
+
+        # Derivar una sola vez todo lo que usan las etapas del turno
+        start = perf_counter()
+        ctx = MessageContext.from_text(user_text)
+        ctx.timings['context'] = perf_counter() - start
+
         # Analizar sentimiento y emoción
-        sentiment, emotion = self.analyze_sentiment(user_text)
+        start = perf_counter()
+        sentiment_scores = self.score_sentiment(ctx)
+        sentiment, emotion = sentiment_scores.sentiment, sentiment_scores.emotion
+        ctx.timings['sentiment'] = perf_counter() - start
         
         # Detectar escenario
-        scenario = self.detect(user_text)
+        start = perf_counter()
+        scenario = self.detect(ctx)
+        ctx.timings['detect'] = perf_counter() - start
         
         # Generar respuesta según escenario
+        start = perf_counter()
         if scenario == "presupuesto":
-            main = self.handle_presupuesto(user_text, when)
+            main = self.handle_presupuesto(ctx, when)
         elif scenario == "ahorro":
-            main = self.handle_ahorro(user_text, when)
+            main = self.handle_ahorro(ctx, when)
         elif scenario == "inversiones":
-            main = self.handle_inversiones(user_text, when)
+            main = self.handle_inversiones(ctx, when)
         elif scenario == "deudas":
-            main = self.handle_deudas(user_text, when)
+            main = self.handle_deudas(ctx, when)
         elif scenario == "calculadora":
-            main = self.handle_calculadora(user_text, when)
+            main = self.handle_calculadora(ctx, when)
         elif scenario == "educacion":
-            main = self.handle_educacion(user_text, when)
+            main = self.handle_educacion(ctx, when)
         else:
-            main = self.handle_help(user_text, when)
+            main = self.handle_help(ctx, when)
+        ctx.timings['handler'] = perf_counter() - start
 
         # Añadir mensaje de apoyo emocional si es necesario
         emotional_support = ""
@@ -1721,5 +2217,7 @@ class ChatBot:
             reply=reply, 
             when=when,
             sentiment=sentiment,
-            emotion=emotion
+            emotion=emotion,
+            timings=ctx.timings,
+            emotion_scores=dict(sentiment_scores.emotions)
         )
@@ -1,19 +1,39 @@
 """
 Base de datos SQLite para preservar estructura existente
 """
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, DateTime, Text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
+import dataclasses
+import os
 import secrets
 
+from profile_cache import ProfileCache, UserProfile, register_shutdown_flush
+
+# last_interaction no se reescribe si la última escritura es más reciente que esto
+LAST_INTERACTION_RESOLUTION = timedelta(seconds=int(os.environ.get("LAST_INTERACTION_RESOLUTION", "60")))
+
 # Base de datos SQLite en el mismo directorio
 DB_PATH = Path(__file__).parent / "chatbot_finance.db"
 engine = create_engine(f'sqlite:///{DB_PATH}', echo=False)
+
+
+@event.listens_for(engine, "connect")
+def _sqlite_pragmas(dbapi_connection, _record):
+    """WAL: lectores no bloquean al escritor (varios workers/threads sobre el mismo archivo)."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
 Base = declarative_base()
-SessionLocal = scoped_session(sessionmaker(bind=engine))
+SessionFactory = sessionmaker(bind=engine)
+SessionLocal = scoped_session(SessionFactory)
 
 
 class User(Base):
@@ -70,52 +90,131 @@ def get_session():
     return SessionLocal()
 
 
-def get_or_create_user(phone: str, name: Optional[str] = None) -> User:
-    """Busca o crea un usuario por phone/id. Actualiza last_interaction."""
-    if not phone:
-        phone = "web_user"
+def _load_profile(phone: str) -> Optional[UserProfile]:
     session = get_session()
-    user = session.query(User).filter_by(phone=phone).first()
-    if not user:
-        user = User(phone=phone, name=name or None)
-        session.add(user)
-    user.last_interaction = datetime.now()
-    session.commit()
-    # Expulsar para evitar problemas de sesión cruzada fuera
-    session.expunge(user)
-    session.close()
-    return user
+    try:
+        user = session.query(User).filter_by(phone=phone).first()
+        return UserProfile.from_row(user) if user else None
+    finally:
+        session.close()
+
+
+def _write_profiles(batch) -> None:
+    """Escribe un lote de perfiles sucios: un upsert por fila y un solo commit."""
+    session = SessionFactory()
+    try:
+        for profile, columns in batch:
+            stmt = sqlite_insert(User).values(**profile.row_values())
+            changed = {c: getattr(profile, c) for c in columns if c != 'phone'}
+            if changed:
+                stmt = stmt.on_conflict_do_update(index_elements=['phone'], set_=changed)
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=['phone'])
+            session.execute(stmt)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+# Caché write-behind de perfiles (ver profile_cache): las lecturas cacheadas no
+# tocan la DB y las escrituras se agrupan en flushes periódicos
+PROFILE_CACHE = ProfileCache(_load_profile, _write_profiles)
+register_shutdown_flush(PROFILE_CACHE)
+
+
+def flush_profiles() -> int:
+    """Escribe ya los perfiles pendientes (shutdown, tests, antes de leer la tabla directo)."""
+    return PROFILE_CACHE.flush()
+
+
+def invalidate_user(phone: Optional[str] = None) -> None:
+    """Descarta el perfil cacheado (o todos) tras modificar la tabla users por fuera."""
+    PROFILE_CACHE.invalidate(phone)
+
+
+def get_or_create_user(phone: str, name: Optional[str] = None) -> UserProfile:
+    """Busca o crea un usuario por phone/id. Actualiza last_interaction."""
+    with UserTurn(phone) as turn:
+        if turn.is_new and name:
+            turn.update(name=name)
+    return turn.user
+
+
+# Campos de perfil que se pueden actualizar desde el bot o la web
+PROFILE_FIELDS = frozenset({
+    'name', 'monthly_income', 'total_debt', 'savings_goal', 'current_savings', 'risk_profile', 'notes'
+})
 
 
 def update_user_fields(phone: str, **fields) -> None:
     """Actualiza campos del usuario. Ignora None y claves desconocidas."""
     if not phone:
         return
-    allowed = {
-        'name', 'monthly_income', 'total_debt', 'savings_goal', 'current_savings', 'risk_profile', 'notes'
-    }
-    clean = {k: v for k, v in fields.items() if k in allowed and v is not None}
+    clean = {k: v for k, v in fields.items() if k in PROFILE_FIELDS and v is not None}
     if not clean:
         return
-    session = get_session()
-    user = session.query(User).filter_by(phone=phone).first()
-    if not user:
-        user = User(phone=phone)
-        session.add(user)
-    for k, v in clean.items():
-        setattr(user, k, v)
-    user.last_interaction = datetime.now()
-    session.commit()
-    session.close()
+    PROFILE_CACHE.update(phone, last_interaction=datetime.now(), **clean)
 
 
-def get_user(phone: str) -> Optional[User]:
-    session = get_session()
-    user = session.query(User).filter_by(phone=phone).first()
-    if user:
-        session.expunge(user)
-    session.close()
-    return user
+class UserTurn:
+    """
+    Unidad de trabajo de un turno de chat: el perfil se lee una vez (del caché
+    de perfiles), los cambios se acumulan y se aplican juntos al cerrar.
+    last_interaction se actualiza a lo sumo una vez y solo si cambió el perfil,
+    el usuario es nuevo o pasó LAST_INTERACTION_RESOLUTION desde la última
+    escritura; un turno sin cambios no genera escrituras. La escritura a disco
+    la hace el flush en lote de PROFILE_CACHE.
+
+        with UserTurn(phone) as turn:
+            turn.user.monthly_income
+            turn.update(total_debt=30000)
+    """
+
+    def __init__(self, phone: str):
+        self.phone = phone or "web_user"
+        self.user: Optional[UserProfile] = None
+        self.is_new = False
+        self.changes: dict = {}
+        self.committed = False
+
+    def open(self) -> "UserTurn":
+        cached = PROFILE_CACHE.get(self.phone)
+        self.is_new = cached is None
+        # Copia de trabajo: el caché solo cambia al cerrar el turno
+        self.user = UserProfile(phone=self.phone) if cached is None else dataclasses.replace(cached, dirty=set())
+        return self
+
+    def update(self, **fields) -> None:
+        """Acumula cambios de perfil (mismas reglas que update_user_fields)."""
+        clean = {k: v for k, v in fields.items() if k in PROFILE_FIELDS and v is not None}
+        self.changes.update(clean)
+        for k, v in clean.items():
+            setattr(self.user, k, v)
+
+    def close(self, commit: bool = True) -> None:
+        """Aplica los cambios (si hay) al caché de perfiles en un solo paso."""
+        if not commit:
+            return
+        now = datetime.now()
+        last = self.user.last_interaction
+        stale = last is None or now - last >= LAST_INTERACTION_RESOLUTION
+        if self.changes or stale or self.is_new:
+            self.user.last_interaction = now
+            PROFILE_CACHE.update(self.phone, last_interaction=now, **self.changes)
+            self.committed = True
+
+    def __enter__(self) -> "UserTurn":
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(commit=exc_type is None)
+
+
+def get_user(phone: str) -> Optional[UserProfile]:
+    return PROFILE_CACHE.get(phone)
 
 
 # --- Vinculación por token (WhatsApp → Web) ---
@@ -135,14 +234,10 @@ Base.metadata.create_all(engine)
 
 def create_link_token(user_phone: str, ttl_minutes: int = 10) -> str:
     """Crea un token de vinculación que expira en ttl_minutes."""
-    session = get_session()
-    # Garantizar que el usuario exista
-    user = session.query(User).filter_by(phone=user_phone).first()
-    if not user:
-        user = User(phone=user_phone)
-        session.add(user)
-        session.flush()
+    # Garantizar que el usuario exista (vía caché de perfiles)
+    get_or_create_user(user_phone)
 
+    session = get_session()
     token = secrets.token_urlsafe(24)
     lt = LinkToken(
         token=token,
@@ -171,3 +266,50 @@ def claim_link_token(token: str) -> Optional[str]:
     phone = lt.user_phone
     session.close()
     return phone
+
+
+# --- Estado conversacional compartido entre procesos (ver session_backend) ---
+class SessionState(Base):
+    __tablename__ = 'session_states'
+    uid = Column(String(100), primary_key=True)
+    state = Column(Text, nullable=False)  # JSON de ChatBot.export_state
+    updated_at = Column(DateTime, default=datetime.now, index=True)
+
+
+Base.metadata.create_all(engine)
+
+
+def load_session_state(uid: str) -> Optional[str]:
+    """JSON del estado guardado para uid, o None."""
+    session = get_session()
+    row = session.get(SessionState, uid)
+    payload = row.state if row else None
+    session.close()
+    return payload
+
+
+def save_session_state(uid: str, payload: str) -> None:
+    """Inserta o actualiza en una sola sentencia (seguro entre procesos)."""
+    now = datetime.now()
+    stmt = sqlite_insert(SessionState).values(uid=uid, state=payload, updated_at=now)
+    stmt = stmt.on_conflict_do_update(index_elements=['uid'], set_={'state': payload, 'updated_at': now})
+    session = get_session()
+    session.execute(stmt)
+    session.commit()
+    session.close()
+
+
+def delete_session_state(uid: str) -> None:
+    session = get_session()
+    session.query(SessionState).filter_by(uid=uid).delete()
+    session.commit()
+    session.close()
+
+
+def purge_session_states(older_than: datetime) -> int:
+    """Borra estados sin actualizar desde older_than; devuelve cuántos."""
+    session = get_session()
+    count = session.query(SessionState).filter(SessionState.updated_at < older_than).delete()
+    session.commit()
+    session.close()
+    return count
@@ -0,0 +1,154 @@
+"""
+Trazas opcionales de ChatBot.detect: qué regla decidió, puntajes de la etapa
+de keywords/patrones y tiempo por etapa, agregados en contadores e
+histogramas dentro del proceso (exportables como JSON).
+
+Con las trazas desactivadas detect usa NULL_TRACE, cuyos métodos no hacen
+nada: el costo es una llamada vacía por etapa.
+"""
+import json
+import threading
+from bisect import bisect_left
+from collections import Counter, deque
+from time import perf_counter
+from typing import Dict, List, Optional
+
+# Límites superiores (µs) de los buckets de los histogramas de latencia
+LATENCY_BUCKETS_US = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class _NullTrace:
+    """Traza inactiva: mismos métodos que DetectTrace, sin trabajo."""
+
+    __slots__ = ()
+
+    def begin(self, stage: str) -> None:
+        pass
+
+    def scores(self, pattern: Dict[str, int], keyword: Dict[str, int], total: Dict[str, int]) -> None:
+        pass
+
+    def fire(self, rule: str, scenario: str) -> str:
+        return scenario
+
+
+NULL_TRACE = _NullTrace()
+
+
+class DetectTrace:
+    """Registro de una llamada a detect."""
+
+    __slots__ = ("text", "rule", "scenario", "stages", "scores_by_stage", "_stage", "_mark", "_start")
+
+    def __init__(self, text: str = ""):
+        self.text = text
+        self.rule: Optional[str] = None
+        self.scenario: Optional[str] = None
+        self.stages: Dict[str, float] = {}  # segundos por etapa
+        self.scores_by_stage: Dict[str, Dict[str, int]] = {}
+        self._stage: Optional[str] = None
+        self._start = self._mark = perf_counter()
+
+    def begin(self, stage: str) -> None:
+        """Cierra la etapa en curso y empieza `stage`."""
+        now = perf_counter()
+        if self._stage is not None:
+            self.stages[self._stage] = self.stages.get(self._stage, 0.0) + now - self._mark
+        self._stage, self._mark = stage, now
+
+    def scores(self, pattern: Dict[str, int], keyword: Dict[str, int], total: Dict[str, int]) -> None:
+        self.scores_by_stage = {"pattern": dict(pattern), "keyword": dict(keyword), "total": dict(total)}
+
+    def fire(self, rule: str, scenario: str) -> str:
+        """Registra la regla que decidió y devuelve el escenario (para usar en el return)."""
+        self.begin("")
+        self._stage = None
+        self.rule, self.scenario = rule, scenario
+        return scenario
+
+    @property
+    def elapsed(self) -> float:
+        return self._mark - self._start
+
+    def to_dict(self) -> dict:
+        return {
+            "text": self.text,
+            "rule": self.rule,
+            "scenario": self.scenario,
+            "elapsed_us": round(self.elapsed * 1e6, 1),
+            "stages_us": {k: round(v * 1e6, 1) for k, v in self.stages.items()},
+            "scores": self.scores_by_stage,
+        }
+
+
+class LatencyHistogram:
+    """Histograma de latencias con buckets fijos (µs) y suma para el promedio."""
+
+    __slots__ = ("counts", "total", "n")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_US) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, seconds: float) -> None:
+        us = seconds * 1e6
+        self.counts[bisect_left(LATENCY_BUCKETS_US, us)] += 1
+        self.total += us
+        self.n += 1
+
+    def to_dict(self) -> dict:
+        labels = [f"<={b}" for b in LATENCY_BUCKETS_US] + [f">{LATENCY_BUCKETS_US[-1]}"]
+        return {
+            "count": self.n,
+            "mean_us": round(self.total / self.n, 1) if self.n else 0.0,
+            "buckets_us": dict(zip(labels, self.counts)),
+        }
+
+
+class TraceStats:
+    """Agregado en proceso de las trazas: reglas, escenarios y latencias por etapa."""
+
+    def __init__(self, keep_recent: int = 200):
+        self._lock = threading.Lock()
+        self._keep_recent = keep_recent
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.rules: Counter = Counter()
+            self.scenarios: Counter = Counter()
+            self.stages: Dict[str, LatencyHistogram] = {}
+            self.total = LatencyHistogram()
+            self.recent: deque = deque(maxlen=self._keep_recent)
+
+    def record(self, trace: DetectTrace) -> None:
+        with self._lock:
+            self.rules[trace.rule] += 1
+            self.scenarios[trace.scenario] += 1
+            self.total.observe(trace.elapsed)
+            for stage, seconds in trace.stages.items():
+                self.stages.setdefault(stage, LatencyHistogram()).observe(seconds)
+            self.recent.append(trace)
+
+    def snapshot(self, recent: int = 20) -> dict:
+        with self._lock:
+            last: List[DetectTrace] = list(self.recent)[-recent:] if recent else []
+            return {
+                "messages": self.total.n,
+                "rules": dict(self.rules.most_common()),
+                "scenarios": dict(self.scenarios.most_common()),
+                "latency": self.total.to_dict(),
+                "stages": {name: h.to_dict() for name, h in self.stages.items()},
+                "recent": [t.to_dict() for t in last],
+            }
+
+    def to_json(self, recent: int = 20, **kwargs) -> str:
+        return json.dumps(self.snapshot(recent), ensure_ascii=False, **kwargs)
+
+    def dump(self, path, recent: int = 20) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json(recent, indent=2))
+
+
+TRACE_STATS = TraceStats()
@@ -0,0 +1,199 @@
+"""
+Extractor unificado de entidades financieras.
+
+Recorre el mensaje una sola vez con una expresión compilada y devuelve
+entidades tipadas, para que todos los handlers interpreten los números de un
+mensaje de la misma forma:
+
+- money: monto con moneda (ARS/USD), con 'lucas'/'k'/'mil'/'palos' expandidos
+- duration: plazo expresado en meses (meses, años, semanas, días); un rango
+  ("3-12 meses") es un solo plazo con `upper`
+- rate: tasa porcentual ("12%", "12 por ciento", "tasa 12")
+- contribution: monto mensual ("5000 por mes", "aporte de 5000", "5000 mensuales")
+"""
+import re
+from dataclasses import dataclass
+from typing import List, NamedTuple, Optional, Tuple
+
+MONEY = "money"
+DURATION = "duration"
+RATE = "rate"
+CONTRIBUTION = "contribution"
+
+_UNIT = r"mes(?:es)?\b|a[ñn]os?\b|anios?\b|semanas?\b|d[ií]as?\b"
+
+# Miles solo en grupos de exactamente 3 dígitos con un mismo separador
+# ("1.500.000", "1,500.50"); un número pegado a otros grupos de dígitos
+# ("192.168.1.1", "1.5.2024") no es una entidad
+_ENTITY_PATTERN = re.compile(
+    r"""
+    (?P<pre_usd>(?:u\$s|us\$|usd)\s*)?
+    (?P<pre_ars>\$\s*)?
+    (?<!\d)(?<!\d[.,])
+    (?P<num>
+        \d{1,3}(?P<sep>[.,])\d{3}(?:(?P=sep)\d{3})*(?:(?!(?P=sep))[.,]\d+)?
+      | \d+(?:[.,]\d+)?
+    )
+    (?![.,]?\d)
+    # Rango de plazo: "3-12 meses" (con "a" se confundiría con "50000 a 12 meses")
+    (?:\s*[-–]\s*(?P<num_hi>\d+(?:[.,]\d+)?)(?![.,]?\d)(?=\s*(?:""" + _UNIT + r""")))?
+    (?:\s*(?P<mult>lucas?\b|luquitas?\b|k\b|mil\b|millon(?:es)?\b|palos?\b))?
+    (?:\s*(?P<pct>%|por\s*ciento\b))?
+    (?:\s*(?P<unit>""" + _UNIT + r"""))?
+    (?:\s*(?P<post_cur>usd\b|u\$s|d[oó]lares\b|dolar\b|pesos\b|ars\b))?
+    (?:\s*(?P<per_month>por\s+mes\b|al\s+mes\b|x\s*mes\b|/\s*mes\b|mensual(?:es)?\b))?
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# Pistas en el texto previo al número (desde el número anterior)
+_RATE_CUE = re.compile(r"\btasa(?:\s+del?)?\s*$", re.IGNORECASE)
+_CONTRIBUTION_CUE = re.compile(r"aport|mensual", re.IGNORECASE)
+
+
+class Entity(NamedTuple):
+    """Una entidad tipada dentro del mensaje."""
+    kind: str       # money, duration, rate o contribution
+    value: float    # monto, meses o porcentaje según kind
+    start: int
+    end: int
+    currency: str = ""  # ARS/USD para money y contribution
+    upper: Optional[float] = None  # fin del rango en duration ("3-12 meses": 3 a 12)
+
+
+def parse_number(raw: str) -> float:
+    """
+    Interpreta separadores al estilo argentino, aceptando también el inglés.
+
+    - '1.500.000' → 1500000, '1.500,50' → 1500.5, '1,500.50' → 1500.5
+    - '50.000' / '50,000' → 50000 (tres dígitos tras un único separador)
+    - '7,5' / '12.5' → decimales
+
+    Raises:
+        ValueError: separadores repetidos con grupos que no son de 3 dígitos ('192.168.1.1')
+    """
+    dots, commas = raw.count('.'), raw.count(',')
+    if not dots and not commas:
+        return float(raw)
+    if dots and commas:
+        decimal = '.' if raw.rfind('.') > raw.rfind(',') else ','
+        thousands = ',' if decimal == '.' else '.'
+        integer, _, fraction = raw.rpartition(decimal)
+        _check_thousands(raw, integer.split(thousands))
+        if thousands in fraction:
+            raise ValueError(f"Número mal formado: {raw!r}")
+        return float(integer.replace(thousands, '') + '.' + fraction)
+    sep = '.' if dots else ','
+    head, _, tail = raw.rpartition(sep)
+    if dots + commas > 1:
+        _check_thousands(raw, raw.split(sep))
+        return float(raw.replace(sep, ''))
+    if len(tail) == 3 and head != '0':
+        return float(raw.replace(sep, ''))
+    return float(f"{head}.{tail}")
+
+
+def _check_thousands(raw: str, groups: List[str]) -> None:
+    if not 1 <= len(groups[0]) <= 3 or any(len(g) != 3 for g in groups[1:]):
+        raise ValueError(f"Número mal formado: {raw!r}")
+
+
+def _multiplier(word: str) -> float:
+    """'lucas', 'k', 'mil' → miles; 'millones', 'palos' → millones."""
+    word = word.lower()
+    return 1e6 if word.startswith(('millon', 'palo')) else 1e3
+
+
+def _unit_months(unit: str) -> float:
+    """Meses por unidad de plazo."""
+    unit = unit.lower()
+    if unit.startswith('mes'):
+        return 1.0
+    if unit.startswith('semana'):
+        return 12 / 52
+    if unit.startswith('d'):
+        return 1 / 30
+    return 12.0  # años
+
+
+@dataclass(frozen=True)
+class FinancialEntities:
+    """Entidades de un mensaje, en orden de aparición."""
+    entities: Tuple[Entity, ...]
+
+    def of_kind(self, kind: str) -> List[Entity]:
+        return [e for e in self.entities if e.kind == kind]
+
+    @property
+    def values(self) -> List[float]:
+        """Todos los valores numéricos en orden (montos ya expandidos)."""
+        return [e.value for e in self.entities]
+
+    @property
+    def amounts(self) -> List[Entity]:
+        """Montos de dinero, únicos o mensuales, en orden de aparición."""
+        return [e for e in self.entities if e.kind in (MONEY, CONTRIBUTION)]
+
+    @property
+    def money(self) -> List[Entity]:
+        return self.of_kind(MONEY)
+
+    @property
+    def durations(self) -> List[Entity]:
+        return self.of_kind(DURATION)
+
+    @property
+    def rates(self) -> List[Entity]:
+        return self.of_kind(RATE)
+
+    @property
+    def contributions(self) -> List[Entity]:
+        return self.of_kind(CONTRIBUTION)
+
+    @property
+    def duration_months(self) -> Optional[int]:
+        """Primer plazo mencionado, en meses."""
+        durations = self.durations
+        return int(round(durations[0].value)) if durations else None
+
+    @property
+    def rate(self) -> Optional[float]:
+        rates = self.rates
+        return rates[0].value if rates else None
+
+    @property
+    def contribution(self) -> Optional[float]:
+        contributions = self.contributions
+        return contributions[0].value if contributions else None
+
+
+def extract_entities(text: str) -> FinancialEntities:
+    """Escanea el texto una vez y clasifica cada número en una entidad tipada."""
+    entities: List[Entity] = []
+    prev_end = 0
+    for m in _ENTITY_PATTERN.finditer(text):
+        gap = text[prev_end:m.start()]
+        prev_end = m.end()
+        value = parse_number(m.group('num'))
+        mult = m.group('mult')
+        if mult:
+            value *= _multiplier(mult)
+
+        if m.group('pct') or _RATE_CUE.search(gap):
+            entities.append(Entity(RATE, value, m.start(), m.end()))
+            continue
+        if m.group('unit') and not mult:
+            months = _unit_months(m.group('unit'))
+            upper = m.group('num_hi')
+            entities.append(Entity(DURATION, value * months, m.start(), m.end(),
+                                   upper=parse_number(upper) * months if upper else None))
+            continue
+
+        post = (m.group('post_cur') or '').lower()
+        usd = bool(m.group('pre_usd')) or post in ('usd', 'u$s', 'dolares', 'dólares', 'dolar')
+        currency = "USD" if usd else "ARS"
+        if m.group('per_month') or _CONTRIBUTION_CUE.search(gap):
+            entities.append(Entity(CONTRIBUTION, value, m.start(), m.end(), currency))
+        else:
+            entities.append(Entity(MONEY, value, m.start(), m.end(), currency))
+    return FinancialEntities(tuple(entities))
@@ -5,42 +5,39 @@ Dashboard HTML estático para análisis de logs
 Genera un archivo HTML que puedes abrir localmente sin servidor
 """
 
-import csv
 from pathlib import Path
-from collections import Counter, defaultdict
+from collections import Counter
 from datetime import datetime
 import json
 
+from log_aggregates import LOG_AGGREGATES_PATH, LogAggregates
+from log_store import default_log_source, read_logs
+
 def generate_dashboard():
     """Genera un dashboard HTML con estadísticas de los logs"""
     
-    log_path = Path(__file__).parent / "chat_logs.csv"
+    log_path = default_log_source()
     
     if not log_path.exists():
-        print("❌ No se encontró chat_logs.csv")
+        print("❌ No se encontraron logs (chat_logs/ ni chat_logs.csv)")
         print("   Ejecuta sync_logs_from_nas.bat primero")
         return
     
     # Leer logs
-    with open(log_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        logs = list(reader)
+    logs = list(read_logs(log_path))
     
     print(f"📊 Analizando {len(logs)} interacciones...")
     
-    # Análisis
-    scenarios = Counter(log['scenario'] for log in logs)
-    sentiments = Counter(log['sentiment'] for log in logs)
-    emotions = Counter(log['emotion'] for log in logs if log['emotion'] != 'none')
+    # Conteos: los agregados que mantiene el bot si coinciden con estos logs; si no, una pasada sobre las filas
+    totals = LogAggregates().snapshot() if LOG_AGGREGATES_PATH.exists() else None
+    if totals is None or totals['rows'] != len(logs):
+        totals = LogAggregates.from_records(logs)
+    scenarios = Counter(totals['scenarios'])
+    sentiments = Counter(totals['sentiments'])
+    emotions = Counter({k: v for k, v in totals['emotions'].items() if k != 'none'})
     
     # Actividad por hora
-    hours = defaultdict(int)
-    for log in logs:
-        try:
-            dt = datetime.fromisoformat(log['timestamp'])
-            hours[dt.hour] += 1
-        except:
-            pass
+    hours = {int(h): n for h, n in totals['hours'].items()}
     
     # Detectar pérdida de contexto
     perdidas = []
@@ -0,0 +1,241 @@
+"""
+Matcher multi-patrón (Aho-Corasick) para la detección de intenciones.
+
+Se construye una sola vez a partir de todos los léxicos y recorre el texto
+normalizado en una única pasada, devolviendo cada aparición con su posición
+y los grupos (léxico/escenario) a los que pertenece el patrón.
+"""
+import math
+from collections import deque
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+
+class Hit(NamedTuple):
+    """Una aparición de un patrón dentro del texto."""
+    start: int
+    end: int
+    pattern: str
+    groups: FrozenSet[str]
+
+
+class MatchSet:
+    """Resultado de un escaneo: todas las apariciones indexadas por patrón y grupo."""
+
+    __slots__ = ("hits", "patterns", "_by_group")
+
+    def __init__(self, hits: List[Hit]):
+        self.hits = hits
+        self.patterns: Set[str] = set()
+        self._by_group: Dict[str, Set[str]] = {}
+        for hit in hits:
+            if hit.pattern in self.patterns:
+                continue
+            self.patterns.add(hit.pattern)
+            for group in hit.groups:
+                self._by_group.setdefault(group, set()).add(hit.pattern)
+
+    def has(self, group: str) -> bool:
+        """True si algún patrón del grupo aparece en el texto."""
+        return group in self._by_group
+
+    def matched(self, group: str) -> Set[str]:
+        """Patrones distintos del grupo que aparecen en el texto."""
+        return self._by_group.get(group, set())
+
+    def first_group(self, groups: Iterable[str]) -> str:
+        """Primer grupo (en el orden dado) con al menos una aparición, o ''."""
+        for group in groups:
+            if group in self._by_group:
+                return group
+        return ""
+
+
+def _pattern_groups(lexicons: Mapping[str, Iterable[str]]) -> Dict[str, FrozenSet[str]]:
+    """Invierte grupo → patrones en patrón → grupos (sin patrones vacíos)."""
+    owners: Dict[str, Set[str]] = {}
+    for group, patterns in lexicons.items():
+        for pattern in patterns:
+            if pattern:
+                owners.setdefault(pattern, set()).add(group)
+    return {p: frozenset(g) for p, g in owners.items()}
+
+
+class MultiPatternMatcher:
+    """
+    Autómata Aho-Corasick sobre un conjunto de léxicos.
+
+    Args:
+        lexicons: Mapeo grupo → patrones. Un mismo patrón puede pertenecer a
+            varios grupos (ej: "cuota" en deudas y calculadora).
+    """
+
+    def __init__(self, lexicons: Mapping[str, Iterable[str]]):
+        self.groups: Dict[str, FrozenSet[str]] = _pattern_groups(lexicons)
+
+        # Trie: goto[estado] = {caracter: estado}
+        goto: List[Dict[str, int]] = [{}]
+        out: List[Tuple[str, ...]] = [()]
+        for pattern in self.groups:
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] = out[state] + (pattern,)
+
+        # Enlaces de falla por BFS. Se materializa el autómata determinista:
+        # delta[estado] guarda solo las transiciones que no coinciden con las
+        # de la raíz, así el escaneo nunca recorre la cadena de fallas.
+        root = goto[0]
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [{} for _ in goto]
+        queue = deque(root.values())
+        while queue:
+            state = queue.popleft()
+            inherited = delta[fail[state]]
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                target = inherited.get(ch)
+                fail[nxt] = target if target is not None else root.get(ch, 0)
+            delta[state] = {**inherited, **goto[state]}
+            if out[fail[state]]:
+                out[state] = out[state] + out[fail[state]]
+
+        self._root = root
+        self._delta = delta
+        self._out = out
+
+    def scan(self, text: str) -> MatchSet:
+        """Recorre el texto una vez y devuelve todas las apariciones."""
+        root, delta, out, groups = self._root, self._delta, self._out, self.groups
+        hits: List[Hit] = []
+        state = 0
+        for i, ch in enumerate(text):
+            nxt = delta[state].get(ch)
+            state = nxt if nxt is not None else root.get(ch, 0)
+            if out[state]:
+                for pattern in out[state]:
+                    hits.append(Hit(i + 1 - len(pattern), i + 1, pattern, groups[pattern]))
+        return MatchSet(hits)
+
+
+class LiteralSetMatcher:
+    """
+    Mismo contrato que MultiPatternMatcher para léxicos chicos (decenas de
+    patrones): cada patrón distinto se busca una sola vez con la búsqueda de
+    subcadenas de str, implementada en C. Con pocos patrones eso es más rápido
+    que recorrer el autómata carácter a carácter en Python.
+    """
+
+    def __init__(self, lexicons: Mapping[str, Iterable[str]]):
+        self.groups: Dict[str, FrozenSet[str]] = _pattern_groups(lexicons)
+        self._patterns: Tuple[str, ...] = tuple(self.groups)
+
+    def scan(self, text: str) -> MatchSet:
+        """Primera aparición de cada patrón presente en el texto."""
+        groups = self.groups
+        hits: List[Hit] = []
+        for pattern in [p for p in self._patterns if p in text]:
+            start = text.find(pattern)
+            hits.append(Hit(start, start + len(pattern), pattern, groups[pattern]))
+        return MatchSet(hits)
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Cantidad de patrones distintos presentes por grupo (solo grupos con alguno)."""
+        groups = self.groups
+        counts: Dict[str, int] = {}
+        for pattern in [p for p in self._patterns if p in text]:
+            for group in groups[pattern]:
+                counts[group] = counts.get(group, 0) + 1
+        return counts
+
+
+def _deletes(term: str, max_deletes: int) -> Set[str]:
+    """Todas las variantes de `term` con hasta `max_deletes` caracteres borrados."""
+    variants = {term}
+    frontier = {term}
+    for _ in range(max_deletes):
+        nxt = set()
+        for v in frontier:
+            if len(v) <= 1:
+                continue
+            for i in range(len(v)):
+                nxt.add(v[:i] + v[i + 1:])
+        nxt -= variants
+        variants |= nxt
+        frontier = nxt
+    return variants
+
+
+class DeletionIndex:
+    """
+    Índice tolerante a errores de tipeo (estilo SymSpell).
+
+    Precalcula las variantes por borrado de cada término; una consulta genera
+    las variantes de la palabra y las busca en el diccionario, devolviendo los
+    términos a distancia de borrado acotada sin recorrer todo el léxico.
+
+    Con `min_similarity` los borrados por lado crecen con el largo para no
+    perder ningún par con SequenceMatcher.ratio() > min_similarity: como
+    ratio = 2·M/(a+b) y M <= LCS, a cada lado le faltan menos de
+    L·(2-2t)/(2-t) caracteres (~0.26·L con t = 0.85). Si una palabra larga
+    tendría más de `max_variants` variantes se devuelven los términos de largo
+    compatible (el llamador confirma con ratio()).
+
+    Args:
+        terms: Términos a indexar (ya normalizados).
+        max_deletes: Borrados máximos por lado (palabra y término); con
+            min_similarity es el mínimo.
+        cache_size: Consultas recientes memorizadas (las palabras se repiten mucho).
+        min_similarity: Umbral de ratio() que no debe perder candidatos (opcional).
+        max_variants: Desde cuántas variantes conviene revisar por largo.
+    """
+
+    def __init__(self, terms: Iterable[str], max_deletes: int = 2, cache_size: int = 4096,
+                 min_similarity: Optional[float] = None, max_variants: int = 2000):
+        self.max_deletes = max_deletes
+        self.min_similarity = min_similarity
+        self.max_variants = max_variants
+        self.max_term_len = 0
+        index: Dict[str, Set[str]] = {}
+        for term in terms:
+            self.max_term_len = max(self.max_term_len, len(term))
+            for variant in _deletes(term, self.deletes_for(len(term))):
+                index.setdefault(variant, set()).add(term)
+        self._index: Dict[str, FrozenSet[str]] = {v: frozenset(t) for v, t in index.items()}
+        self._terms: Tuple[str, ...] = tuple(sorted({t for ts in index.values() for t in ts}))
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def deletes_for(self, length: int) -> int:
+        """Borrados que se exploran para una palabra o término de ese largo."""
+        if self.min_similarity is None:
+            return self.max_deletes
+        t = self.min_similarity
+        return max(self.max_deletes, math.ceil(length * (2 - 2 * t) / (2 - t)) - 1)
+
+    def _lookup(self, word: str) -> FrozenSet[str]:
+        """Términos que comparten alguna variante por borrado con `word`."""
+        depth = self.deletes_for(len(word))
+        # Más larga que cualquier término aun con todos los borrados: no puede
+        # coincidir, y las variantes crecen combinatoriamente con el largo (un
+        # "token" de 2000 caracteres serían millones de strings)
+        if len(word) - depth > self.max_term_len:
+            return frozenset()
+        if sum(math.comb(len(word), i) for i in range(depth + 1)) > self.max_variants:
+            # Palabra larga: más barato filtrar por largo que generar las variantes
+            return frozenset(
+                term for term in self._terms
+                if len(word) - depth <= len(term) and len(term) - self.deletes_for(len(term)) <= len(word)
+            )
+        found: Set[str] = set()
+        index = self._index
+        for variant in _deletes(word, depth):
+            terms = index.get(variant)
+            if terms:
+                found |= terms
+        return frozenset(found)
@@ -0,0 +1,247 @@
+"""
+Modelo lineal liviano de intenciones (modo detector alternativo).
+
+Features: n-gramas de caracteres del texto normalizado, proyectados con
+hashing (polinomial sobre code points, estable entre procesos) a un espacio fijo de N_FEATURES.
+Modelo: regresión logística multinomial (matriz de pesos NumPy + softmax).
+La inferencia cuesta O(largo del mensaje), sin importar el tamaño del léxico.
+
+Entrenamiento offline desde filas etiquetadas de los logs (chat_logs/ o un CSV):
+
+    python intent_model.py train chat_logs/ --out intent_model.npz
+    python intent_model.py predict intent_model.npz "quiero invertir 100 lucas"
+
+Se activa en ChatBot con INTENT_DETECTOR=model (ver chatbot_core).
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from log_store import default_log_source, read_logs
+
+N_FEATURES = 1 << 14
+NGRAM_RANGE = (2, 4)
+DEFAULT_MODEL_PATH = Path(__file__).with_name("intent_model.npz")
+
+
+_HASH_BASE = np.uint64(1_000_003)
+_HASH_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _ngram_ids(text: str, n_features: int, ngram_range: Tuple[int, int]) -> np.ndarray:
+    """
+    Ids hasheados de todos los n-gramas de caracteres, calculados en bloque con
+    un hash polinomial rodante sobre los code points (estable entre procesos).
+    """
+    codes = np.frombuffer(f" {text} ".encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    lo, hi = ngram_range
+    parts = []
+    rolling = codes
+    for n in range(2, hi + 1):
+        rolling = rolling[:-1] * _HASH_BASE + codes[n - 1:]
+        if n >= lo:
+            mixed = (rolling + np.uint64(n)) * _HASH_MIX
+            parts.append(mixed >> np.uint64(33))
+    if lo == 1:
+        parts.append((codes * _HASH_MIX) >> np.uint64(33))
+    return (np.concatenate(parts) % np.uint64(n_features)).astype(np.int64)
+
+
+def featurize(text: str, n_features: int = N_FEATURES,
+              ngram_range: Tuple[int, int] = NGRAM_RANGE) -> Tuple[np.ndarray, np.ndarray]:
+    """Vector disperso (índices, valores) con conteos de n-gramas normalizados L2."""
+    ids, counts = np.unique(_ngram_ids(text, n_features, ngram_range), return_counts=True)
+    values = counts.astype(np.float32)
+    values /= np.sqrt((values * values).sum()) or 1.0
+    return ids, values
+
+
+def _csr(texts: Sequence[str], n_features: int,
+         ngram_range: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Matriz dispersa por filas (indptr, índices, valores) de una lista de textos."""
+    indptr = [0]
+    indices: List[np.ndarray] = []
+    values: List[np.ndarray] = []
+    for text in texts:
+        ids, vals = featurize(text, n_features, ngram_range)
+        indices.append(ids)
+        values.append(vals)
+        indptr.append(indptr[-1] + len(ids))
+    return np.asarray(indptr), np.concatenate(indices), np.concatenate(values)
+
+
+class IntentModel:
+    """Pesos (n_features × clases) + sesgo; predice escenario y confianza."""
+
+    def __init__(self, labels: Sequence[str], weights: np.ndarray, bias: np.ndarray,
+                 ngram_range: Tuple[int, int] = NGRAM_RANGE):
+        self.labels = tuple(labels)
+        self.weights = weights
+        self.bias = bias
+        self.ngram_range = ngram_range
+
+    @property
+    def n_features(self) -> int:
+        return self.weights.shape[0]
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        """Probabilidad de cada escenario (en el orden de self.labels)."""
+        ids, values = featurize(text, self.n_features, self.ngram_range)
+        logits = values @ self.weights[ids] + self.bias
+        logits -= logits.max()
+        exp = np.exp(logits)
+        return exp / exp.sum()
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Escenario más probable y su probabilidad."""
+        proba = self.predict_proba(text)
+        best = int(proba.argmax())
+        return self.labels[best], float(proba[best])
+
+    def save(self, path) -> None:
+        np.savez(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            labels=np.asarray(self.labels),
+            ngram_range=np.asarray(self.ngram_range),
+        )
+
+    @classmethod
+    def load(cls, path) -> "IntentModel":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                labels=[str(label) for label in data["labels"]],
+                weights=data["weights"],
+                bias=data["bias"],
+                ngram_range=tuple(int(n) for n in data["ngram_range"]),
+            )
+
+
+def train(texts: Sequence[str], labels: Sequence[str], epochs: int = 30, lr: float = 20.0,
+          l2: float = 1e-6, batch_size: int = 256, n_features: int = N_FEATURES,
+          ngram_range: Tuple[int, int] = NGRAM_RANGE, seed: int = 0) -> IntentModel:
+    """
+    Entrena por descenso de gradiente en mini-lotes. Los pares (texto, etiqueta)
+    repetidos se agrupan y pesan por su frecuencia (los logs son muy repetitivos).
+    """
+    pairs = Counter(zip(texts, labels))
+    samples = list(pairs)
+    sample_weight = np.asarray([pairs[s] for s in samples], dtype=np.float32)
+    classes = sorted({label for _, label in samples})
+    class_index = {label: i for i, label in enumerate(classes)}
+    y = np.asarray([class_index[label] for _, label in samples])
+    indptr, indices, values = _csr([text for text, _ in samples], n_features, ngram_range)
+
+    n_classes = len(classes)
+    weights = np.zeros((n_features, n_classes), dtype=np.float32)
+    bias = np.zeros(n_classes, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    total_weight = sample_weight.sum()
+
+    for _ in range(epochs):
+        order = rng.permutation(len(samples))
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            row_ptr = np.concatenate(([0], np.cumsum(indptr[rows + 1] - indptr[rows])))
+            nz = np.concatenate([np.arange(indptr[r], indptr[r + 1]) for r in rows])
+            ids, vals = indices[nz], values[nz]
+
+            contrib = weights[ids] * vals[:, None]
+            logits = np.add.reduceat(contrib, row_ptr[:-1], axis=0) + bias
+            logits -= logits.max(axis=1, keepdims=True)
+            proba = np.exp(logits)
+            proba /= proba.sum(axis=1, keepdims=True)
+            proba[np.arange(len(rows)), y[rows]] -= 1.0
+            grad = proba * (sample_weight[rows] * len(samples) / total_weight)[:, None] / len(rows)
+
+            row_of_nz = np.repeat(np.arange(len(rows)), np.diff(row_ptr))
+            grad_w = np.zeros_like(weights)
+            np.add.at(grad_w, ids, vals[:, None] * grad[row_of_nz])
+            weights -= lr * (grad_w + l2 * weights)
+            bias -= lr * grad.sum(axis=0)
+
+    return IntentModel(classes, weights, bias, ngram_range)
+
+
+def load_labeled_rows(csv_path, exclude: Iterable[str] = ()) -> Tuple[List[str], List[str]]:
+    """
+    Textos y escenarios de un chat_logs.csv o directorio de segmentos. Los
+    textos pasan por normalize_message, igual que en la inferencia del ChatBot.
+    """
+    from chatbot_core import normalize_message
+
+    excluded = set(exclude)
+    texts, labels = [], []
+    for row in read_logs(csv_path):
+        scenario = (row.get("scenario") or "").strip()
+        user = (row.get("user") or "").strip()
+        if scenario and user and scenario not in excluded:
+            texts.append(normalize_message(user))
+            labels.append(scenario)
+    return texts, labels
+
+
+def _cmd_train(args) -> None:
+    texts, labels = load_labeled_rows(args.csv_path, args.exclude)
+    if not texts:
+        raise SystemExit(f"❌ No hay filas etiquetadas en {args.csv_path}")
+
+    rows = list(zip(texts, labels))
+    random.Random(args.seed).shuffle(rows)
+    n_holdout = int(len(rows) * args.holdout)
+    holdout, train_rows = rows[:n_holdout], rows[n_holdout:]
+
+    start = time.perf_counter()
+    model = train([t for t, _ in train_rows], [l for _, l in train_rows],
+                  epochs=args.epochs, lr=args.lr, seed=args.seed)
+    print(f"✅ Entrenado con {len(train_rows)} filas ({len(model.labels)} escenarios) "
+          f"en {time.perf_counter() - start:.1f}s")
+    if holdout:
+        hits = sum(model.predict(t)[0] == l for t, l in holdout)
+        print(f"🎯 Exactitud en validación: {hits / len(holdout):.1%} ({len(holdout)} filas)")
+    model.save(args.out)
+    print(f"💾 Modelo guardado en {args.out}")
+
+
+def _cmd_predict(args) -> None:
+    from chatbot_core import normalize_message
+
+    start = time.perf_counter()
+    model = IntentModel.load(args.model)
+    print(f"Modelo cargado en {(time.perf_counter() - start) * 1e3:.1f} ms")
+    for text in args.texts:
+        scenario, confidence = model.predict(normalize_message(text))
+        print(f"{scenario:12s} {confidence:.2f}  {text}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Modelo lineal de intenciones")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_train = sub.add_parser("train", help="Entrenar desde los logs etiquetados (chat_logs/ o un CSV)")
+    p_train.add_argument("csv_path", nargs="?", default=str(default_log_source()))
+    p_train.add_argument("--out", default=str(DEFAULT_MODEL_PATH))
+    p_train.add_argument("--epochs", type=int, default=30)
+    p_train.add_argument("--lr", type=float, default=20.0)
+    p_train.add_argument("--holdout", type=float, default=0.1, help="Fracción para validación")
+    p_train.add_argument("--exclude", nargs="*", default=[], help="Escenarios a ignorar (ej: ayuda)")
+    p_train.add_argument("--seed", type=int, default=0)
+    p_train.set_defaults(func=_cmd_train)
+
+    p_predict = sub.add_parser("predict", help="Clasificar textos con un modelo guardado")
+    p_predict.add_argument("model")
+    p_predict.add_argument("texts", nargs="+")
+    p_predict.set_defaults(func=_cmd_predict)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Registro asíncrono de interacciones (chat_logs.csv) fuera del camino del request.
+
+log_interaction encola la fila en una cola acotada y un hilo escritor la
+escribe en lotes: cuando junta `batch_size` filas o pasan `flush_interval`
+segundos desde la primera fila pendiente. Si la cola está llena se aplica la
+política de desborde (LOG_OVERFLOW):
+
+- block: el turno espera lugar en la cola (no se pierde nada)
+- drop: la fila se descarta y se cuenta
+- sample: se conserva 1 de cada LOG_SAMPLE_EVERY filas (esperando lugar) y el
+  resto se descarta
+
+Un lote que falla se reintenta hasta LOG_WRITE_ATTEMPTS veces (esperando
+LOG_RETRY_DELAY, el doble en cada intento); recién entonces se descarta,
+contado en "lost" y avisado por consola.
+
+Al terminar el proceso (atexit / worker_exit de gunicorn) se escribe todo lo
+encolado. LOG_ASYNC=0 vuelve a la escritura sincrónica.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from detect_trace import LatencyHistogram
+
+LOG_ASYNC = os.environ.get("LOG_ASYNC", "1") == "1"
+LOG_QUEUE_MAX = int(os.environ.get("LOG_QUEUE_MAX", "10000"))
+LOG_BATCH_SIZE = int(os.environ.get("LOG_BATCH_SIZE", "256"))
+LOG_FLUSH_INTERVAL = float(os.environ.get("LOG_FLUSH_INTERVAL", "0.5"))
+LOG_OVERFLOW = os.environ.get("LOG_OVERFLOW", "block")
+LOG_SAMPLE_EVERY = int(os.environ.get("LOG_SAMPLE_EVERY", "10"))
+LOG_WRITE_ATTEMPTS = int(os.environ.get("LOG_WRITE_ATTEMPTS", "3"))
+LOG_RETRY_DELAY = float(os.environ.get("LOG_RETRY_DELAY", "0.1"))
+
+OVERFLOW_POLICIES = ("block", "drop", "sample")
+
+
+class AsyncLogWriter:
+    """
+    Cola acotada + hilo escritor por lotes.
+
+    `sink(rows)` escribe un lote de filas (lo llama un solo hilo a la vez,
+    salvo flush() desde un proceso que nunca encoló).
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[List[Sequence]], None],
+        max_queue: int = LOG_QUEUE_MAX,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        overflow: str = LOG_OVERFLOW,
+        sample_every: int = LOG_SAMPLE_EVERY,
+        write_attempts: int = LOG_WRITE_ATTEMPTS,
+        retry_delay: float = LOG_RETRY_DELAY,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de desborde desconocida: {overflow!r} (usar {', '.join(OVERFLOW_POLICIES)})")
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.sample_every = max(1, sample_every)
+        self.write_attempts = max(1, write_attempts)
+        self.retry_delay = retry_delay
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_queue))
+        self._lock = threading.Lock()
+        self._writer_pid: Optional[int] = None
+        self._overflowed = 0
+        self.write_latency = LatencyHistogram()
+        self.counters: Dict[str, int] = dict.fromkeys((
+            "enqueued", "written", "dropped", "batches", "write_errors", "retries", "lost", "max_depth",
+        ), 0)
+
+    def submit(self, row: Sequence) -> bool:
+        """Encola una fila; devuelve False si la política de desborde la descartó."""
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            if not self._admit_overflow():
+                with self._lock:
+                    self.counters["dropped"] += 1
+                return False
+            self._queue.put(row)
+        with self._lock:
+            self.counters["enqueued"] += 1
+            depth = self._queue.qsize()
+            if depth > self.counters["max_depth"]:
+                self.counters["max_depth"] = depth
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que todo lo encolado esté escrito; False si venció el timeout
+        (que incluye esperar lugar en la cola para la marca de flush).
+        """
+        if self._writer_pid != os.getpid():
+            # Sin hilo escritor en este proceso: escribir acá mismo
+            self._drain()
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "depth": self._queue.qsize(),
+                "capacity": self._queue.maxsize,
+                "overflow": self.overflow,
+                "write_latency": self.write_latency.to_dict(),
+                **self.counters,
+            }
+
+    # --- interno ---
+
+    def _admit_overflow(self) -> bool:
+        if self.overflow == "block":
+            return True
+        if self.overflow == "drop":
+            return False
+        with self._lock:
+            self._overflowed += 1
+            return self._overflowed % self.sample_every == 0
+
+    def _ensure_writer(self) -> None:
+        # Un hilo por proceso (tras un fork de gunicorn el hilo del padre no existe)
+        pid = os.getpid()
+        if self._writer_pid == pid:
+            return
+        with self._lock:
+            if self._writer_pid == pid:
+                return
+            self._writer_pid = pid
+            threading.Thread(target=self._run, name="interaction-log", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch: List[Sequence] = []
+            waiters: List[threading.Event] = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break  # flush pedido: escribir ya lo juntado
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _drain(self) -> None:
+        batch: List[Sequence] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+            else:
+                batch.append(item)
+        self._write(batch)
+
+    def _write(self, batch: List[Sequence]) -> None:
+        if not batch:
+            return
+        for attempt in range(1, self.write_attempts + 1):
+            start = time.perf_counter()
+            try:
+                self.sink(batch)
+                break
+            except Exception as e:
+                with self._lock:
+                    self.counters["write_errors"] += 1
+                if attempt == self.write_attempts:
+                    with self._lock:
+                        self.counters["lost"] += len(batch)
+                    print(f"⚠️ Se descartan {len(batch)} filas de log tras {attempt} intentos: {e}")
+                    return
+                with self._lock:
+                    self.counters["retries"] += 1
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+        with self._lock:
+            self.write_latency.observe(time.perf_counter() - start)
+            self.counters["batches"] += 1
+            self.counters["written"] += len(batch)
+
+
+def register_shutdown_flush(writer: AsyncLogWriter, timeout: float = 10.0) -> None:
+    """Escribe las filas encoladas al terminar el proceso."""
+    atexit.register(writer.flush, timeout)
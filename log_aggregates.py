@@ -0,0 +1,281 @@
+"""
+Agregados incrementales del log de interacciones (tarjetas de /logs y gráficos
+del dashboard) sin recontar filas en cada consulta.
+
+El escritor del log llama a `observe(filas)` después de escribir cada lote:
+se suman conteos por escenario, sentimiento, emoción y hora del día. Los
+totales viven en memoria y cada `checkpoint_interval` segundos (y al cerrar
+el proceso) se guardan en disco (chat_logs/aggregates.json, junto a los segmentos).
+
+Con varios workers cada proceso acumula sus cambios desde el último
+checkpoint y los suma al archivo bajo un lock (fcntl, donde existe); las
+lecturas combinan el archivo con los cambios propios, así que los de otros
+workers aparecen con a lo sumo `checkpoint_interval` segundos de atraso.
+
+Si el archivo no existe (primera vez) o quedó desfasado de los logs crudos:
+
+    python log_aggregates.py rebuild [chat_logs/ | chat_logs.csv]
+    python log_aggregates.py show
+"""
+import argparse
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Union
+
+from log_store import LOG_FIELDS, LOG_STORE_DIR, default_log_source, read_logs
+
+try:
+    import fcntl
+except ImportError:  # Windows: waitress corre un solo proceso
+    fcntl = None
+
+LOG_AGGREGATES_PATH = Path(os.environ.get("LOG_AGGREGATES_PATH") or LOG_STORE_DIR / "aggregates.json")
+LOG_AGGREGATES_CHECKPOINT = float(os.environ.get("LOG_AGGREGATES_CHECKPOINT", "30"))
+
+DIMENSIONS = ("scenarios", "sentiments", "emotions", "hours")
+
+Record = Dict[str, str]
+
+
+def _empty() -> Dict[str, Counter]:
+    return {dim: Counter() for dim in DIMENSIONS}
+
+
+def _add(totals: Dict[str, Counter], record: Record) -> None:
+    totals["scenarios"][record.get("scenario") or ""] += 1
+    totals["sentiments"][record.get("sentiment") or ""] += 1
+    totals["emotions"][record.get("emotion") or "none"] += 1
+    hour = (record.get("timestamp") or "")[11:13]
+    if hour.isdigit():
+        totals["hours"][hour] += 1
+
+
+def _render(totals: Dict[str, Counter], rows: int) -> dict:
+    out = {"rows": rows, **{dim: dict(sorted(totals[dim].items())) for dim in DIMENSIONS}}
+    # Tarjeta "Sin clasificar" de /logs
+    out["unclassified"] = out["scenarios"].get("ayuda", 0)
+    return out
+
+
+class LogAggregates:
+    """Conteos por escenario/sentimiento/emoción/hora, con checkpoint en disco."""
+
+    def __init__(
+        self,
+        path: Union[str, Path] = LOG_AGGREGATES_PATH,
+        checkpoint_interval: float = LOG_AGGREGATES_CHECKPOINT,
+        source: Optional[Callable[[], Iterable[Record]]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.path = Path(path)
+        self.checkpoint_interval = checkpoint_interval
+        # Filas crudas para reconstruir si todavía no hay checkpoint
+        self.source = source
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._base = _empty()       # último estado leído/escrito del archivo
+        self._base_rows = 0
+        self._pending = _empty()    # cambios de este proceso aún no guardados
+        self._pending_rows = 0
+        self._generation: Optional[str] = None
+        self._mtime: Optional[float] = None
+        self._loaded = False
+        self._last_checkpoint = clock()
+        self.counters: Dict[str, int] = dict.fromkeys(("observed", "checkpoints", "reloads", "rebuilds"), 0)
+
+    # --- escritura ---
+
+    def observe(self, rows: Iterable[Union[Record, list]]) -> None:
+        """Suma filas recién escritas (dicts o listas en orden LOG_FIELDS)."""
+        with self._lock:
+            n = 0
+            for row in rows:
+                _add(self._pending, row if isinstance(row, dict) else dict(zip(LOG_FIELDS, row)))
+                n += 1
+            self._pending_rows += n
+            self.counters["observed"] += n
+            due = self.checkpoint_interval >= 0 and self.clock() - self._last_checkpoint >= self.checkpoint_interval
+        if due:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Suma los cambios pendientes al archivo (bajo lock) y relee el total."""
+        with self._lock:
+            self._ensure_loaded()
+            self._last_checkpoint = self.clock()
+            if not self._pending_rows:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._locked_file():
+                data = self._read_file()
+                if data is not None and self._generation is not None and data.get("generation") != self._generation:
+                    # Se reconstruyó por fuera: lo pendiente ya está contado en el archivo
+                    self._apply_file(data)
+                else:
+                    totals, rows = (self._base, self._base_rows) if data is None else self._parse(data)
+                    for dim in DIMENSIONS:
+                        totals[dim].update(self._pending[dim])
+                    generation = (data or {}).get("generation") or self._generation or uuid.uuid4().hex
+                    self._write_file(totals, rows + self._pending_rows, generation)
+            self._pending, self._pending_rows = _empty(), 0
+            self.counters["checkpoints"] += 1
+
+    def rebuild(self, records: Iterable[Record]) -> int:
+        """Recalcula todo desde las filas crudas y lo guarda; devuelve cuántas filas."""
+        totals, rows = _empty(), 0
+        for record in records:
+            _add(totals, record)
+            rows += 1
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._locked_file():
+                self._write_file(totals, rows, uuid.uuid4().hex)
+            self._pending, self._pending_rows = _empty(), 0
+            self._loaded = True
+            self.counters["rebuilds"] += 1
+        return rows
+
+    # --- lectura ---
+
+    def snapshot(self) -> dict:
+        """Totales actuales: archivo (releído solo si cambió) + cambios propios pendientes."""
+        with self._lock:
+            self._ensure_loaded()
+            self._refresh()
+            merged = {dim: self._base[dim] + self._pending[dim] for dim in DIMENSIONS}
+            return _render(merged, self._base_rows + self._pending_rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "pending_rows": self._pending_rows,
+                "checkpoint_interval": self.checkpoint_interval,
+                **self.counters,
+            }
+
+    @classmethod
+    def from_records(cls, records: Iterable[Record]) -> dict:
+        """Agregados en memoria de un conjunto de filas (sin archivo)."""
+        totals, rows = _empty(), 0
+        for record in records:
+            _add(totals, record)
+            rows += 1
+        return _render(totals, rows)
+
+    # --- interno ---
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        data = self._read_file()
+        if data is not None:
+            self._apply_file(data)
+        elif self.source is not None:
+            # Primera vez con logs anteriores: una sola pasada completa
+            rows = self.rebuild(self.source())
+            if rows:
+                print(f"📊 Agregados de logs reconstruidos ({rows} filas) en {self.path}")
+
+    def _refresh(self) -> None:
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            data = self._read_file()
+            if data is not None:
+                self._apply_file(data)
+                self.counters["reloads"] += 1
+
+    def _apply_file(self, data: dict) -> None:
+        totals, rows = self._parse(data)
+        if self._generation is not None and data.get("generation") != self._generation:
+            # Reconstrucción externa: lo pendiente de este proceso ya está en el archivo
+            self._pending, self._pending_rows = _empty(), 0
+        self._base, self._base_rows = totals, rows
+        self._generation = data.get("generation")
+        try:
+            self._mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            self._mtime = None
+
+    @staticmethod
+    def _parse(data: dict):
+        return {dim: Counter(data.get(dim) or {}) for dim in DIMENSIONS}, int(data.get("rows", 0))
+
+    def _read_file(self) -> Optional[dict]:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _write_file(self, totals: Dict[str, Counter], rows: int, generation: str) -> None:
+        data = {"rows": rows, "generation": generation, **{dim: dict(totals[dim]) for dim in DIMENSIONS}}
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._base, self._base_rows, self._generation = totals, rows, generation
+        self._mtime = self.path.stat().st_mtime
+
+    def _locked_file(self):
+        return _FileLock(self.path.with_name(self.path.name + ".lock"))
+
+
+class _FileLock:
+    """Lock exclusivo entre procesos sobre un archivo auxiliar (no-op sin fcntl)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._f = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._f = self.path.open("a")
+            fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._f is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+            self._f.close()
+            self._f = None
+
+
+def register_shutdown_checkpoint(aggregates: LogAggregates) -> None:
+    """Guarda los conteos pendientes al terminar el proceso."""
+    def checkpoint_quietly():
+        try:
+            aggregates.checkpoint()
+        except Exception as e:
+            print(f"⚠️ No se pudieron guardar los agregados de logs: {e}")
+    atexit.register(checkpoint_quietly)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Agregados del log de interacciones")
+    parser.add_argument("--path", default=str(LOG_AGGREGATES_PATH), help="archivo de checkpoint")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_rebuild = sub.add_parser("rebuild", help="recalcular desde los logs crudos")
+    p_rebuild.add_argument("source", nargs="?", default=str(default_log_source()))
+    sub.add_parser("show", help="mostrar los totales guardados")
+    args = parser.parse_args()
+
+    aggregates = LogAggregates(args.path)
+    if args.command == "rebuild":
+        start = time.perf_counter()
+        rows = aggregates.rebuild(read_logs(args.source))
+        print(f"✅ {rows} filas agregadas en {time.perf_counter() - start:.2f}s → {args.path}")
+    else:
+        print(json.dumps(aggregates.snapshot(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
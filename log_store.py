@@ -0,0 +1,454 @@
+"""
+Almacén segmentado del log de interacciones (reemplaza al chat_logs.csv único).
+
+Las filas se guardan en un segmento JSONL por día (chat_logs/AAAA-MM-DD.jsonl)
+con un índice al lado (AAAA-MM-DD.idx.json):
+
+- bloques de `index_every` filas: offset en bytes, cantidad de filas, rango de
+  timestamps (min/max) y escenarios presentes;
+- conteos del segmento por escenario y sentimiento.
+
+Con el índice, las consultas leen solo los bloques necesarios:
+
+    store.tail(50)                                   # últimas 50, más nuevas primero
+    store.tail(20, scenario="ayuda")                 # salta bloques sin "ayuda"
+    store.between("2024-05-01", "2024-05-07T12:00")  # en orden cronológico
+    store.counts()                                   # totales sin leer filas
+
+Varios procesos pueden escribir el mismo segmento: la escritura toma un lock
+sobre el archivo (fcntl, donde existe) y cada índice se pone al día leyendo
+solo los bytes que otro proceso agregó después de la última indexación.
+
+Migración y mantenimiento:
+
+    python log_store.py import chat_logs.csv
+    python log_store.py reindex
+    python log_store.py tail 20 --scenario ayuda
+    python log_store.py stats
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: waitress corre un solo proceso
+    fcntl = None
+
+LOG_FIELDS = ("timestamp", "scenario", "sentiment", "emotion", "user", "bot")
+LOG_STORE_DIR = Path(os.environ.get("LOG_STORE_DIR") or Path(__file__).with_name("chat_logs"))
+LOG_INDEX_EVERY = int(os.environ.get("LOG_INDEX_EVERY", "64"))
+INDEX_VERSION = 1
+
+Record = Dict[str, str]
+TimeBound = Union[None, str, datetime]
+
+
+def _bound(value: TimeBound) -> Optional[str]:
+    """Límite de tiempo como texto ISO comparable con los timestamps guardados."""
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat(timespec="seconds")
+
+
+class SegmentIndex:
+    """Índice de un segmento diario: bloques de filas y conteos."""
+
+    def __init__(self, size: int = 0, rows: int = 0, blocks: Optional[List[dict]] = None,
+                 scenarios: Optional[Dict[str, int]] = None, sentiments: Optional[Dict[str, int]] = None):
+        self.size = size  # bytes del segmento ya indexados
+        self.rows = rows
+        self.blocks = blocks if blocks is not None else []
+        self.scenarios = Counter(scenarios or {})
+        self.sentiments = Counter(sentiments or {})
+
+    def add(self, record: Record, offset: int, length: int, every: int) -> None:
+        ts = record.get("timestamp", "")
+        scenario = record.get("scenario", "")
+        block = self.blocks[-1] if self.blocks else None
+        if block is None or block["rows"] >= every:
+            block = {"offset": offset, "rows": 0, "lo": ts, "hi": ts, "scenarios": []}
+            self.blocks.append(block)
+        block["rows"] += 1
+        block["lo"] = min(block["lo"], ts)
+        block["hi"] = max(block["hi"], ts)
+        if scenario not in block["scenarios"]:
+            block["scenarios"].append(scenario)
+        self.rows += 1
+        self.size = offset + length
+        self.scenarios[scenario] += 1
+        self.sentiments[record.get("sentiment", "")] += 1
+
+    def block_end(self, i: int) -> int:
+        return self.blocks[i + 1]["offset"] if i + 1 < len(self.blocks) else self.size
+
+    def to_json(self) -> dict:
+        return {
+            "v": INDEX_VERSION, "size": self.size, "rows": self.rows, "blocks": self.blocks,
+            "scenarios": dict(self.scenarios), "sentiments": dict(self.sentiments),
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "SegmentIndex":
+        if data.get("v") != INDEX_VERSION:
+            raise ValueError(f"Versión de índice no soportada: {data.get('v')!r}")
+        return cls(data["size"], data["rows"], data["blocks"], data["scenarios"], data["sentiments"])
+
+
+class SegmentedLogStore:
+    """Segmentos JSONL diarios con índice lateral; thread-safe y multi-proceso al escribir."""
+
+    def __init__(self, root: Union[str, Path] = LOG_STORE_DIR, index_every: int = LOG_INDEX_EVERY):
+        self.root = Path(root)
+        self.index_every = max(1, index_every)
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, SegmentIndex] = {}
+
+    # --- escritura ---
+
+    def append(self, rows: Iterable[Union[Sequence[str], Record]]) -> int:
+        """Agrega filas (listas en orden LOG_FIELDS o dicts); devuelve cuántas."""
+        by_day: Dict[str, List[Record]] = {}
+        for row in rows:
+            record = dict(row) if isinstance(row, dict) else dict(zip(LOG_FIELDS, row))
+            by_day.setdefault(record["timestamp"][:10], []).append(record)
+        if not by_day:
+            return 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            for day, records in by_day.items():
+                self._append_segment(day, records)
+        return sum(len(records) for records in by_day.values())
+
+    def _append_segment(self, day: str, records: List[Record]) -> None:
+        lines = [(json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8") for r in records]
+        with self._segment_path(day).open("ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                offset = f.seek(0, os.SEEK_END)
+                index = self._catch_up(day, offset)
+                f.write(b"".join(lines))
+                f.flush()
+                for record, line in zip(records, lines):
+                    index.add(record, offset, len(line), self.index_every)
+                    offset += len(line)
+                self._save_index(day, index)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def reindex(self) -> int:
+        """Reconstruye todos los índices desde los segmentos; devuelve cuántas filas."""
+        total = 0
+        with self._lock:
+            for day in self.days():
+                index = self._scan(day, SegmentIndex(), self._segment_path(day).stat().st_size)
+                self._save_index(day, index)
+                total += index.rows
+        return total
+
+    # --- lectura ---
+
+    def days(self) -> List[str]:
+        if not self.root.is_dir():
+            return []
+        return sorted(p.name[:-len(".jsonl")] for p in self.root.glob("*.jsonl"))
+
+    def newest(self, scenario: Optional[str] = None, sentiment: Optional[str] = None,
+               where: Optional[Callable[[Record], bool]] = None) -> Iterator[Record]:
+        """Filas que cumplen los filtros, de la más nueva a la más vieja (lee bloque por bloque)."""
+        for day in reversed(self.days()):
+            index = self._index(day)
+            if not self._segment_may_match(index, scenario, sentiment):
+                continue
+            for i in reversed(range(len(index.blocks))):
+                if scenario is not None and scenario not in index.blocks[i]["scenarios"]:
+                    continue
+                for record in reversed(self._read_block(day, index, i)):
+                    if _matches(record, scenario, sentiment, where):
+                        yield record
+
+    def tail(self, n: int = 50, scenario: Optional[str] = None, sentiment: Optional[str] = None,
+             where: Optional[Callable[[Record], bool]] = None) -> List[Record]:
+        """Las últimas `n` filas que cumplen los filtros, de la más nueva a la más vieja."""
+        return list(islice(self.newest(scenario, sentiment, where), max(n, 0)))
+
+    def between(self, start: TimeBound = None, end: TimeBound = None, scenario: Optional[str] = None,
+                sentiment: Optional[str] = None,
+                where: Optional[Callable[[Record], bool]] = None) -> Iterator[Record]:
+        """Filas con start <= timestamp <= end (límites opcionales), en orden de escritura."""
+        lo, hi = _bound(start), _bound(end)
+        for day in self.days():
+            if (lo is not None and day < lo[:10]) or (hi is not None and day > hi[:10]):
+                continue
+            index = self._index(day)
+            if not self._segment_may_match(index, scenario, sentiment):
+                continue
+            for i, block in enumerate(index.blocks):
+                if (lo is not None and block["hi"] < lo) or (hi is not None and block["lo"] > hi):
+                    continue
+                if scenario is not None and scenario not in block["scenarios"]:
+                    continue
+                for record in self._read_block(day, index, i):
+                    ts = record.get("timestamp", "")
+                    if (lo is not None and ts < lo) or (hi is not None and ts > hi):
+                        continue
+                    if _matches(record, scenario, sentiment, where):
+                        yield record
+
+    def counts(self) -> dict:
+        """Totales por escenario y sentimiento, sumando los índices (sin leer filas)."""
+        scenarios: Counter = Counter()
+        sentiments: Counter = Counter()
+        rows = 0
+        for day in self.days():
+            index = self._index(day)
+            rows += index.rows
+            scenarios.update(index.scenarios)
+            sentiments.update(index.sentiments)
+        return {"rows": rows, "segments": len(self.days()),
+                "scenarios": dict(scenarios), "sentiments": dict(sentiments)}
+
+    def __len__(self) -> int:
+        return sum(self._index(day).rows for day in self.days())
+
+    # --- interno ---
+
+    def _segment_path(self, day: str) -> Path:
+        return self.root / f"{day}.jsonl"
+
+    def _index_path(self, day: str) -> Path:
+        return self.root / f"{day}.idx.json"
+
+    def _index(self, day: str) -> SegmentIndex:
+        """Índice vigente del segmento (leyendo lo que otro proceso haya agregado)."""
+        with self._lock:
+            try:
+                size = self._segment_path(day).stat().st_size
+            except FileNotFoundError:
+                size = 0
+            return self._catch_up(day, size)
+
+    def _catch_up(self, day: str, size: int) -> SegmentIndex:
+        index = self._indexes.get(day)
+        if index is None or index.size != size:
+            index = self._load_index(day) or SegmentIndex()
+        if index.size > size:
+            # Segmento truncado o reemplazado: reindexar desde cero
+            index = SegmentIndex()
+        if index.size < size:
+            index = self._scan(day, index, size)
+        self._indexes[day] = index
+        return index
+
+    def _scan(self, day: str, index: SegmentIndex, size: int) -> SegmentIndex:
+        """Indexa las líneas completas entre index.size y size."""
+        with self._segment_path(day).open("rb") as f:
+            f.seek(index.size)
+            data = f.read(size - index.size)
+        offset = index.size
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break  # línea a medio escribir por otro proceso
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = {}  # línea corrupta: se saltea al leer pero ocupa su lugar
+            index.add(record, offset, len(line), self.index_every)
+            offset += len(line)
+        return index
+
+    def _load_index(self, day: str) -> Optional[SegmentIndex]:
+        try:
+            return SegmentIndex.from_json(json.loads(self._index_path(day).read_text(encoding="utf-8")))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_index(self, day: str, index: SegmentIndex) -> None:
+        self._indexes[day] = index
+        path = self._index_path(day)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(index.to_json(), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _read_block(self, day: str, index: SegmentIndex, i: int) -> List[Record]:
+        start, end = index.blocks[i]["offset"], index.block_end(i)
+        with self._segment_path(day).open("rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        records = []
+        for line in data.splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records
+
+    @staticmethod
+    def _segment_may_match(index: SegmentIndex, scenario: Optional[str], sentiment: Optional[str]) -> bool:
+        if scenario is not None and not index.scenarios.get(scenario):
+            return False
+        if sentiment is not None and not index.sentiments.get(sentiment):
+            return False
+        return True
+
+
+def _matches(record: Record, scenario: Optional[str], sentiment: Optional[str],
+             where: Optional[Callable[[Record], bool]]) -> bool:
+    if scenario is not None and record.get("scenario") != scenario:
+        return False
+    if sentiment is not None and record.get("sentiment") != sentiment:
+        return False
+    return where is None or where(record)
+
+
+def default_log_source() -> Path:
+    """Directorio de segmentos si existe; si no, el chat_logs.csv anterior."""
+    legacy = Path(__file__).with_name("chat_logs.csv")
+    has_segments = LOG_STORE_DIR.is_dir() and any(LOG_STORE_DIR.glob("*.jsonl"))
+    return LOG_STORE_DIR if has_segments or not legacy.exists() else legacy
+
+
+def read_logs(path: Union[None, str, Path] = None) -> Iterator[Record]:
+    """
+    Todas las interacciones en orden cronológico, desde un directorio de
+    segmentos o desde un CSV (formato anterior). Sin `path`: el almacén por
+    defecto, o chat_logs.csv si todavía no se migró.
+    """
+    path = Path(path) if path is not None else default_log_source()
+    if path.is_dir():
+        yield from SegmentedLogStore(path).between()
+        return
+    with path.open(newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def reverse_csv_records(path: Union[str, Path], chunk_size: int = 1 << 16) -> Iterator[Record]:
+    """
+    Filas de un chat_logs.csv de la última a la primera, leyendo bloques desde
+    el final del archivo (el costo depende de cuántas filas se consumen, no
+    del tamaño del archivo).
+
+    Las respuestas del bot tienen saltos de línea entre comillas: un salto de
+    línea es fin de fila solo si entre él y el final ya procesado hay una
+    cantidad par de comillas (las comillas escapadas vienen de a pares).
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        fieldnames = next(csv.reader([header.decode("utf-8-sig")]), None)
+        if not fieldnames:
+            return
+        data_start = f.tell()
+        pos = f.seek(0, os.SEEK_END)
+        buf = b""
+        while True:
+            # buf siempre termina en un límite de fila
+            end = search_end = len(buf)
+            quotes = 0
+            while True:
+                j = buf.rfind(b"\n", 0, search_end)
+                if j < 0:
+                    break
+                quotes += buf.count(b'"', j + 1, search_end)
+                search_end = j
+                if quotes % 2 == 0:
+                    record = _parse_csv_row(buf[j + 1:end], fieldnames)
+                    if record is not None:
+                        yield record
+                    end, quotes = j, 0
+            buf = buf[:end]
+            if pos <= data_start:
+                record = _parse_csv_row(buf, fieldnames)
+                if record is not None:
+                    yield record
+                return
+            size = min(chunk_size, pos - data_start)
+            pos -= size
+            f.seek(pos)
+            buf = f.read(size) + buf
+
+
+def _parse_csv_row(raw: bytes, fieldnames: List[str]) -> Optional[Record]:
+    if not raw.strip():
+        return None
+    values = next(csv.reader(io.StringIO(raw.decode("utf-8", errors="replace"), newline="")), [])
+    return dict(zip(fieldnames, values))
+
+
+def _text_filter(q: Optional[str]) -> Optional[Callable[[Record], bool]]:
+    """Búsqueda sin distinguir mayúsculas en mensaje, respuesta, escenario y emoción."""
+    if not q:
+        return None
+    needle = q.lower()
+    return lambda r: any(needle in (r.get(k) or "").lower() for k in ("user", "bot", "scenario", "emotion"))
+
+
+def newest_page(source: Union[SegmentedLogStore, str, Path], page: int = 1, per_page: int = 50,
+                scenario: Optional[str] = None, sentiment: Optional[str] = None,
+                q: Optional[str] = None) -> dict:
+    """
+    Página `page` (desde 1) de las interacciones más nuevas que cumplen los
+    filtros, desde el almacén segmentado o un CSV. Solo se leen las filas
+    hasta el final de la página pedida.
+    """
+    page, per_page = max(1, page), max(1, per_page)
+    where = _text_filter(q)
+    if isinstance(source, SegmentedLogStore):
+        rows = source.newest(scenario, sentiment, where)
+    else:
+        rows = (r for r in reverse_csv_records(source) if _matches(r, scenario, sentiment, where))
+    start = (page - 1) * per_page
+    window = list(islice(rows, start, start + per_page + 1))
+    return {
+        "page": page,
+        "per_page": per_page,
+        "rows": window[:per_page],
+        "has_more": len(window) > per_page,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Almacén segmentado de logs de interacciones")
+    parser.add_argument("--dir", default=str(LOG_STORE_DIR), help="directorio de segmentos")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser("import", help="importar un chat_logs.csv")
+    p_import.add_argument("csv_path")
+    sub.add_parser("reindex", help="reconstruir los índices")
+    p_tail = sub.add_parser("tail", help="últimas filas")
+    p_tail.add_argument("n", type=int, nargs="?", default=20)
+    p_tail.add_argument("--scenario")
+    p_tail.add_argument("--sentiment")
+    sub.add_parser("stats", help="totales por escenario y sentimiento")
+    args = parser.parse_args()
+
+    store = SegmentedLogStore(args.dir)
+    if args.command == "import":
+        batch, total = [], 0
+        with open(args.csv_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                batch.append({field: row.get(field) or "" for field in LOG_FIELDS})
+                if len(batch) >= 5000:
+                    total += store.append(batch)
+                    batch = []
+        total += store.append(batch)
+        print(f"✅ {total} filas importadas en {len(store.days())} segmentos ({store.root})")
+    elif args.command == "reindex":
+        print(f"✅ {store.reindex()} filas reindexadas")
+    elif args.command == "tail":
+        for record in store.tail(args.n, scenario=args.scenario, sentiment=args.sentiment):
+            print(f"{record['timestamp']}  {record['scenario']:12s} {record['sentiment']:9s} {record['user'][:80]}")
+    else:
+        print(json.dumps(store.counts(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
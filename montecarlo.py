@@ -0,0 +1,236 @@
+"""
+Simulación Monte Carlo de inversiones y jubilación: en vez de una tasa fija
+(calcular_interes_compuesto, jubilacion_estimada) se sortean rendimientos e
+inflación mes a mes para miles de caminos y se reportan bandas de percentiles
+(p10/p50/p90) y la probabilidad de llegar a un objetivo.
+
+- Rendimientos mensuales lognormales con media `rendimiento_anual` / 12 (la
+  convención de calculators.py: con volatilidad 0 el resultado coincide con
+  calcular_interes_compuesto) y dispersión `volatilidad_anual`.
+- Inflación mensual normal alrededor de `inflacion_anual`; los valores
+  "reales" están en pesos de hoy.
+- Reproducible: con la misma `semilla` el resultado es idéntico, se corra en
+  serie o en el pool (cada bloque de caminos tiene su propia semilla derivada).
+- Corridas grandes (caminos × meses >= MONTECARLO_POOL_MIN) se reparten en un
+  pool de procesos; cada pedido tiene un presupuesto de tiempo
+  (MONTECARLO_PRESUPUESTO_S): si se agota se devuelve lo simulado hasta ahí
+  con "truncado": True.
+"""
+import atexit
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Caminos por bloque (unidad de trabajo y de semilla)
+MONTECARLO_BLOQUE = int(os.environ.get("MONTECARLO_BLOQUE", "2500"))
+# Desde cuántas celdas (caminos × meses) conviene el pool de procesos
+MONTECARLO_POOL_MIN = int(os.environ.get("MONTECARLO_POOL_MIN", "2000000"))
+# Procesos del pool (0 o 1 = siempre en serie)
+MONTECARLO_PROCESOS = int(os.environ.get("MONTECARLO_PROCESOS", str(os.cpu_count() or 1)))
+MONTECARLO_PRESUPUESTO_S = float(os.environ.get("MONTECARLO_PRESUPUESTO_S", "2.0"))
+# Puntos de las bandas (meses muestreados); el último mes siempre está
+MONTECARLO_PUNTOS_BANDA = int(os.environ.get("MONTECARLO_PUNTOS_BANDA", "120"))
+
+PERCENTILES = (10, 50, 90)
+
+# Cada cuántos meses un bloque mira el reloj
+_CHEQUEO_RELOJ = 32
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_procesos = 0
+_pool_lock = threading.Lock()
+
+
+def _meses_banda(meses: int, puntos: int) -> np.ndarray:
+    """Meses donde se guardan saldos para las bandas (1..meses, a lo sumo `puntos`)."""
+    paso = max(1, -(-meses // puntos))
+    return np.unique(np.append(np.arange(paso, meses + 1, paso), meses))
+
+
+def _simular_bloque(semilla: np.random.SeedSequence, caminos: int, capital: float, aporte: float,
+                    meses: int, deriva: float, sigma: float, inflacion_media: float,
+                    inflacion_sigma: float, banda: np.ndarray, limite: float):
+    """
+    Simula un bloque de caminos. Devuelve (saldos, reales) en los meses de `banda`
+    (matrices caminos × len(banda)), o None si se pasó del `limite` (time.monotonic).
+    """
+    rng = np.random.default_rng(semilla)
+    saldo = np.full(caminos, float(capital))
+    deflactor = np.ones(caminos)
+    nominal = np.empty((caminos, len(banda)))
+    real = np.empty_like(nominal)
+    z = np.empty(caminos)
+    j = 0
+    for mes in range(1, meses + 1):
+        # Factor de crecimiento lognormal, en el lugar para no alocar por mes
+        rng.standard_normal(out=z)
+        z *= sigma
+        z += deriva
+        np.exp(z, out=z)
+        saldo *= z
+        saldo += aporte
+        if inflacion_sigma:
+            rng.standard_normal(out=z)
+            z *= inflacion_sigma
+            z += 1 + inflacion_media
+            deflactor *= z
+        else:
+            deflactor *= 1 + inflacion_media
+        if mes == banda[j]:
+            nominal[:, j] = saldo
+            real[:, j] = saldo / deflactor
+            j = min(j + 1, len(banda) - 1)
+        if mes % _CHEQUEO_RELOJ == 0 and time.monotonic() > limite:
+            return None
+    return nominal, real
+
+
+def _get_pool(procesos: int) -> ProcessPoolExecutor:
+    """Pool de procesos perezoso y por pid (tras un fork el del padre no sirve)."""
+    global _pool, _pool_pid, _pool_procesos
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid() or _pool_procesos != procesos:
+            if _pool is not None and _pool_pid == os.getpid():
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=procesos)
+            _pool_pid, _pool_procesos = os.getpid(), procesos
+        return _pool
+
+
+def _cerrar_pool() -> None:
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(_cerrar_pool)
+
+
+def _correr_bloques(args: List[tuple], procesos: int, limite: float) -> List[Optional[tuple]]:
+    """Corre los bloques en serie o en el pool, sin pasarse del límite; None = no terminó."""
+    if procesos <= 1 or len(args) == 1:
+        resultados = []
+        for a in args:
+            resultados.append(None if time.monotonic() > limite else _simular_bloque(*a))
+        return resultados
+
+    pool = _get_pool(procesos)
+    futuros = [pool.submit(_simular_bloque, *a) for a in args]
+    pendientes = set(futuros)
+    while pendientes:
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            break
+        _, pendientes = wait(pendientes, timeout=restante, return_when=FIRST_COMPLETED)
+    for f in pendientes:
+        f.cancel()
+    return [f.result() if f.done() and not f.cancelled() else None for f in futuros]
+
+
+def _percentiles(matriz: np.ndarray) -> Dict[str, np.ndarray]:
+    valores = np.percentile(matriz, PERCENTILES, axis=0)
+    return {f"p{p}": v for p, v in zip(PERCENTILES, valores)}
+
+
+def simular_montecarlo(capital: float, aporte_mensual: float, meses: int,
+                       rendimiento_anual: float = 12.0, volatilidad_anual: float = 15.0,
+                       inflacion_anual: float = 0.0, volatilidad_inflacion: float = 0.0,
+                       caminos: int = 10_000, objetivo: Optional[float] = None,
+                       semilla: Optional[int] = None, presupuesto_s: Optional[float] = None,
+                       procesos: Optional[int] = None) -> Dict:
+    """
+    Simula `caminos` trayectorias de una inversión con aporte mensual.
+
+    Args:
+        capital: Capital inicial
+        aporte_mensual: Cuánto se suma cada mes (al final del mes)
+        meses: Plazo en meses
+        rendimiento_anual: Rendimiento anual esperado (ej: 12 para 12%)
+        volatilidad_anual: Desvío anual del rendimiento (ej: 15 para 15%)
+        inflacion_anual: Inflación anual esperada (para valores reales)
+        volatilidad_inflacion: Desvío anual de la inflación
+        caminos: Cantidad de trayectorias
+        objetivo: Monto a alcanzar al final (opcional)
+        semilla: Semilla para reproducir la corrida (None = aleatoria, se informa)
+        presupuesto_s: Tiempo máximo en segundos (default MONTECARLO_PRESUPUESTO_S)
+        procesos: Procesos del pool (default MONTECARLO_PROCESOS; se usa solo
+            si caminos × meses >= MONTECARLO_POOL_MIN)
+
+    Returns:
+        Dict con "bandas" y "bandas_reales" ({"mes", "p10", "p50", "p90"} como
+        arrays), "final" y "final_real" (percentiles y media del último mes),
+        "prob_objetivo"/"prob_objetivo_real" (None sin objetivo), "caminos"
+        efectivamente simulados, "semilla", "truncado" y "segundos"
+
+    Raises:
+        ValueError: plazo, caminos o volatilidades inválidos
+        TimeoutError: no llegó a terminar ningún bloque dentro del presupuesto
+    """
+    if meses < 1 or caminos < 1:
+        raise ValueError("El plazo y la cantidad de caminos deben ser positivos")
+    if volatilidad_anual < 0 or volatilidad_inflacion < 0 or rendimiento_anual <= -1200:
+        raise ValueError("Volatilidades no negativas y rendimiento mensual mayor a -100%")
+
+    inicio = time.monotonic()
+    limite = inicio + (MONTECARLO_PRESUPUESTO_S if presupuesto_s is None else presupuesto_s)
+    procesos = MONTECARLO_PROCESOS if procesos is None else procesos
+    if caminos * meses < MONTECARLO_POOL_MIN:
+        procesos = 1
+
+    # Tasa mensual = anual / 12, como en calculators.py (E[crecimiento mensual] = 1 + tasa)
+    sigma = (volatilidad_anual / 100) / np.sqrt(12)
+    deriva = np.log1p(rendimiento_anual / 100 / 12) - sigma ** 2 / 2
+    inflacion_media = inflacion_anual / 100 / 12
+    inflacion_sigma = (volatilidad_inflacion / 100) / np.sqrt(12)
+
+    if semilla is None:
+        # 53 bits: se puede devolver en JSON y reusar desde JavaScript sin perder precisión
+        semilla = secrets.randbits(53)
+    raiz = np.random.SeedSequence(semilla)
+    tamaños = [min(MONTECARLO_BLOQUE, caminos - i) for i in range(0, caminos, MONTECARLO_BLOQUE)]
+    banda = _meses_banda(meses, MONTECARLO_PUNTOS_BANDA)
+    args = [(s, n, capital, aporte_mensual, meses, deriva, sigma, inflacion_media, inflacion_sigma, banda, limite)
+            for s, n in zip(raiz.spawn(len(tamaños)), tamaños)]
+
+    terminados = [r for r in _correr_bloques(args, procesos, limite) if r is not None]
+    if not terminados:
+        raise TimeoutError("La simulación no terminó dentro del presupuesto de tiempo")
+    nominal = np.concatenate([r[0] for r in terminados])
+    real = np.concatenate([r[1] for r in terminados])
+
+    def final(matriz: np.ndarray) -> Dict[str, float]:
+        ultimo = matriz[:, -1]
+        valores = np.percentile(ultimo, PERCENTILES)
+        return {**{f"p{p}": float(v) for p, v in zip(PERCENTILES, valores)}, "media": float(ultimo.mean())}
+
+    return {
+        "caminos": len(nominal),
+        "meses": meses,
+        "total_aportado": round(capital + aporte_mensual * meses, 2),
+        "bandas": {"mes": banda, **_percentiles(nominal)},
+        "bandas_reales": {"mes": banda, **_percentiles(real)},
+        "final": final(nominal),
+        "final_real": final(real),
+        "prob_objetivo": None if objetivo is None else float((nominal[:, -1] >= objetivo).mean()),
+        "prob_objetivo_real": None if objetivo is None else float((real[:, -1] >= objetivo).mean()),
+        "semilla": semilla,
+        "truncado": len(nominal) < caminos,
+        "segundos": round(time.monotonic() - inicio, 4),
+    }
+
+
+def jubilacion_montecarlo(edad_actual: int, edad_jubilacion: int, ahorro_mensual: float,
+                          tasa_anual: float = 12.0, **kwargs) -> Dict:
+    """
+    Versión con riesgo de jubilacion_estimada: mismos datos, bandas en vez de un número.
+    kwargs se pasan a simular_montecarlo (volatilidad_anual, inflacion_anual, objetivo, semilla...).
+    """
+    años = edad_jubilacion - edad_actual
+    if años <= 0:
+        return {"error": "Ya pasaste la edad de jubilación o la edad es inválida"}
+    return simular_montecarlo(0, ahorro_mensual, años * 12, rendimiento_anual=tasa_anual, **kwargs)
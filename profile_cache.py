@@ -0,0 +1,272 @@
+"""
+Caché write-behind de perfiles de usuario, delante de database.py.
+
+- Lecturas: si el perfil (o su ausencia) está en caché no se toca la DB.
+- Escrituras: los cambios marcan la entrada como sucia y se escriben en lote
+  (una transacción para todas las filas) cada `flush_interval` segundos, cuando
+  hay `max_dirty` entradas sucias, al expulsar una entrada sucia o al cerrar
+  el proceso (atexit / worker_exit de gunicorn).
+- Con flush_interval=0 el caché es write-through: cada cambio se escribe en
+  el momento (modo seguro para varios workers sin backend compartido).
+- ttl > 0 vuelve a leer de la DB las entradas limpias más viejas que ttl
+  segundos (varios workers: acota cuánto puede durar una lectura desactualizada).
+- invalidate(phone) descarta entradas para que la próxima lectura vaya a la DB
+  (usar tras escribir la tabla users por fuera del caché).
+
+Métricas (hit ratio, filas y latencia de flush) en stats().
+"""
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from detect_trace import LatencyHistogram
+
+PROFILE_CACHE_MAX = int(os.environ.get("PROFILE_CACHE_MAX", "10000"))
+PROFILE_FLUSH_INTERVAL = float(os.environ.get("PROFILE_FLUSH_INTERVAL", "2"))
+PROFILE_MAX_DIRTY = int(os.environ.get("PROFILE_MAX_DIRTY", "200"))
+PROFILE_CACHE_TTL = float(os.environ.get("PROFILE_CACHE_TTL", "0"))  # 0 = sin vencimiento
+
+
+@dataclass
+class UserProfile:
+    """Copia en memoria de una fila de users (mismos atributos que el modelo User)."""
+    phone: str
+    name: Optional[str] = None
+    created_at: Optional[datetime] = None
+    last_interaction: Optional[datetime] = None
+    monthly_income: float = 0.0
+    total_debt: float = 0.0
+    savings_goal: float = 0.0
+    current_savings: float = 0.0
+    risk_profile: Optional[str] = None
+    notes: Optional[str] = None
+    # Campos modificados desde el último flush (vacío = limpio)
+    dirty: set = field(default_factory=set, repr=False, compare=False)
+
+    @classmethod
+    def from_row(cls, row) -> "UserProfile":
+        return cls(**{name: getattr(row, name) for name in PROFILE_COLUMNS})
+
+    def row_values(self) -> Dict[str, object]:
+        return {name: getattr(self, name) for name in PROFILE_COLUMNS}
+
+
+PROFILE_COLUMNS = tuple(f.name for f in fields(UserProfile) if f.name != "dirty")
+
+# Marca de "no existe en la DB" (caché negativo)
+_MISSING = object()
+
+
+class ProfileCache:
+    """Perfiles por phone/uid con LRU, seguimiento de cambios y flush en lote."""
+
+    def __init__(
+        self,
+        load: Callable[[str], Optional[UserProfile]],
+        write: Callable[[List[Tuple[UserProfile, Iterable[str]]]], None],
+        max_entries: int = PROFILE_CACHE_MAX,
+        flush_interval: float = PROFILE_FLUSH_INTERVAL,
+        max_dirty: int = PROFILE_MAX_DIRTY,
+        ttl: float = PROFILE_CACHE_TTL,
+    ):
+        self.load = load
+        self.write = write
+        self.max_entries = max(1, max_entries)
+        self.flush_interval = flush_interval
+        self.max_dirty = max(1, max_dirty)
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._entries: "OrderedDict[str, object]" = OrderedDict()
+        self._loaded_at: Dict[str, float] = {}
+        self._dirty: Dict[str, UserProfile] = {}
+        self._wake = threading.Event()
+        self._flusher_pid: Optional[int] = None
+        self.flush_latency = LatencyHistogram()
+        self.counters: Dict[str, int] = dict.fromkeys((
+            "hits", "misses", "flushes", "rows_flushed", "flush_errors", "evictions", "invalidations",
+        ), 0)
+
+    # --- lectura ---
+
+    def get(self, phone: str) -> Optional[UserProfile]:
+        """Perfil cacheado o leído de la DB; None si el usuario no existe."""
+        with self._lock:
+            cached = self._entries.get(phone)
+            if cached is not None and self._expired(phone, cached):
+                cached = None
+            if cached is not None:
+                self._entries.move_to_end(phone)
+                self.counters["hits"] += 1
+                return None if cached is _MISSING else cached
+            self.counters["misses"] += 1
+            pending = self._dirty.get(phone)
+            if pending is not None:
+                # Expulsado del LRU con cambios sin escribir: la DB está desactualizada
+                self._store(phone, pending)
+                return pending
+
+        profile = self.load(phone)
+        with self._lock:
+            # Otro hilo pudo crearlo o modificarlo mientras tanto
+            cached = self._entries.get(phone)
+            if cached is not None and cached is not _MISSING and phone in self._dirty:
+                return cached
+            self._store(phone, profile if profile is not None else _MISSING)
+            return profile
+
+    # --- escritura ---
+
+    def update(self, phone: str, **values) -> UserProfile:
+        """
+        Aplica cambios al perfil y lo marca sucio. Si el usuario no existe se
+        crea (se inserta en el próximo flush).
+        """
+        profile = self.get(phone)
+        with self._lock:
+            cached = self._entries.get(phone)
+            if cached is not None and cached is not _MISSING:
+                profile = cached
+            elif profile is None:
+                now = datetime.now()
+                profile = UserProfile(phone=phone, created_at=now, last_interaction=now)
+                profile.dirty.update(PROFILE_COLUMNS)
+                self._store(phone, profile)
+            for key, value in values.items():
+                setattr(profile, key, value)
+            profile.dirty.update(values)
+            if not profile.dirty:
+                return profile
+            self._mark_dirty(profile)
+        self._after_write()
+        return profile
+
+    def invalidate(self, phone: Optional[str] = None) -> None:
+        """Descarta una entrada (o todas); los cambios pendientes se escriben antes."""
+        self.flush()
+        with self._lock:
+            if phone is None:
+                self.counters["invalidations"] += len(self._entries)
+                self._entries.clear()
+                self._loaded_at.clear()
+            elif self._entries.pop(phone, None) is not None:
+                self._loaded_at.pop(phone, None)
+                self.counters["invalidations"] += 1
+
+    def flush(self) -> int:
+        """Escribe todas las entradas sucias en una transacción; devuelve cuántas filas."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return 0
+                # Copias tomadas bajo el lock: se escriben fuera de él
+                batch = [(profile, _snapshot(profile), frozenset(profile.dirty))
+                         for profile in self._dirty.values()]
+                for profile, _, _ in batch:
+                    profile.dirty.clear()
+                self._dirty.clear()
+            start = time.perf_counter()
+            try:
+                self.write([(snapshot, columns) for _, snapshot, columns in batch])
+            except Exception:
+                # Reintentar en el próximo flush
+                with self._lock:
+                    self.counters["flush_errors"] += 1
+                    for profile, _, columns in batch:
+                        profile.dirty.update(columns)
+                        self._dirty[profile.phone] = profile
+                raise
+            with self._lock:
+                self.flush_latency.observe(time.perf_counter() - start)
+                self.counters["flushes"] += 1
+                self.counters["rows_flushed"] += len(batch)
+            return len(batch)
+
+    def clear(self) -> None:
+        """Vacía el caché sin escribir (tests)."""
+        with self._lock:
+            self._entries.clear()
+            self._loaded_at.clear()
+            self._dirty.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "dirty": len(self._dirty),
+                "write_behind": self.flush_interval > 0,
+                "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+                "flush_latency": self.flush_latency.to_dict(),
+                **self.counters,
+            }
+
+    # --- interno ---
+
+    def _expired(self, phone: str, cached) -> bool:
+        if not self.ttl or phone in self._dirty:
+            return False
+        return time.monotonic() - self._loaded_at.get(phone, 0.0) > self.ttl
+
+    def _store(self, phone: str, value) -> None:
+        self._entries[phone] = value
+        self._entries.move_to_end(phone)
+        self._loaded_at[phone] = time.monotonic()
+        while len(self._entries) > self.max_entries:
+            old_phone, old = self._entries.popitem(last=False)
+            self._loaded_at.pop(old_phone, None)
+            self.counters["evictions"] += 1
+            if old is not _MISSING and old.dirty:
+                # Sigue en _dirty: el flush la escribe aunque ya no esté cacheada
+                self._wake.set()
+
+    def _mark_dirty(self, profile: UserProfile) -> None:
+        self._dirty[profile.phone] = profile
+
+    def _after_write(self) -> None:
+        if self.flush_interval <= 0:
+            self.flush()
+            return
+        self._ensure_flusher()
+        if len(self._dirty) >= self.max_dirty:
+            self._wake.set()
+
+    def _ensure_flusher(self) -> None:
+        # Un hilo por proceso (tras un fork de gunicorn el hilo del padre no existe)
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+            threading.Thread(target=self._run_flusher, name="profile-flush", daemon=True).start()
+
+    def _run_flusher(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+
+def _snapshot(profile: UserProfile) -> UserProfile:
+    """Copia sin marcas de cambios (para escribir o entregar fuera del caché)."""
+    return UserProfile(**profile.row_values())
+
+
+def register_shutdown_flush(cache: ProfileCache) -> None:
+    """Escribe los cambios pendientes al terminar el proceso."""
+    def flush_quietly():
+        try:
+            cache.flush()
+        except Exception as e:
+            print(f"⚠️ No se pudieron guardar perfiles pendientes: {e}")
+    atexit.register(flush_quietly)
@@ -0,0 +1,46 @@
+"""
+Reclasifica el archivo de logs con el léxico actual (ChatBot.detect_batch),
+sin crear usuarios ni escribir en el log, y resume qué cambió.
+
+Uso: python rescore_logs.py [chat_logs/ | chat_logs.csv] [--out reclasificado.csv]
+"""
+import argparse
+import csv
+import time
+from collections import Counter
+
+from chatbot_core import ChatBot
+from log_store import default_log_source, read_logs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("log_path", nargs="?", default=str(default_log_source()))
+    parser.add_argument("--out", help="CSV de salida con la columna 'rescored' agregada")
+    args = parser.parse_args()
+
+    rows = list(read_logs(args.log_path))
+
+    start = time.perf_counter()
+    rescored = ChatBot.detect_batch([row["user"] for row in rows])
+    elapsed = time.perf_counter() - start
+
+    changes = Counter(
+        (row["scenario"], new) for row, new in zip(rows, rescored) if row["scenario"] != new
+    )
+    print(f"✅ {len(rows)} mensajes reclasificados en {elapsed:.2f}s")
+    print(f"🔀 Cambiaron {sum(changes.values())} clasificaciones")
+    for (old, new), n in changes.most_common(20):
+        print(f"  {old:12s} → {new:12s} {n}")
+
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()) + ["rescored"] if rows else ["rescored"])
+            writer.writeheader()
+            for row, new in zip(rows, rescored):
+                writer.writerow({**row, "rescored": new})
+        print(f"💾 Guardado en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
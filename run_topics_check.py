@@ -24,16 +24,16 @@ MATRIX = {
 def check_detection():
     total = 0
     ok = 0
-    for topic, phrases in MATRIX.items():
-        for p in phrases:
-            bot = ChatBot()
-            res = bot.process(p)
-            total += 1
-            hit = res.scenario == topic
-            if hit:
-                ok += 1
-            mark = '✅' if hit else '❌'
-            print(f"{mark} [{topic}] '{p}' -> {res.scenario}")
+    # Clasificación sin estado ni escrituras en DB/logs
+    cases = [(topic, p) for topic, phrases in MATRIX.items() for p in phrases]
+    scenarios = ChatBot.detect_batch([p for _, p in cases])
+    for (topic, p), scenario in zip(cases, scenarios):
+        total += 1
+        hit = scenario == topic
+        if hit:
+            ok += 1
+        mark = '✅' if hit else '❌'
+        print(f"{mark} [{topic}] '{p}' -> {scenario}")
     print(f"\nDetection: {ok}/{total} correct")
 
 
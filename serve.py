@@ -0,0 +1,109 @@
+"""
+Punto de entrada de producción (reemplaza a `python web_app.py`, que usa el
+servidor de desarrollo de Flask).
+
+- Linux/NAS/Docker: gunicorn con varios workers (procesos) y threads por
+  worker. La app se importa una vez en el proceso maestro (preload) y los
+  workers la heredan al hacer fork, compartiendo léxicos, modelo y templates.
+- Windows: waitress (solo threads, un proceso).
+
+Configuración por entorno:
+
+    WEB_BIND       dirección de escucha            (0.0.0.0:5000)
+    WEB_WORKERS    procesos worker                 (núcleos, máximo 2)
+    WEB_THREADS    threads por worker              (8)
+    WEB_KEEPALIVE  segundos de keep-alive HTTP     (5)
+    WEB_BACKLOG    conexiones pendientes en cola   (2048)
+    WEB_TIMEOUT    segundos antes de reciclar un worker colgado (60)
+    WEB_PRELOAD    1 = importar la app antes del fork (1)
+
+Con más de un worker las sesiones deben vivir en un backend compartido; si
+SESSION_BACKEND no está definido se usa sqlite (ver session_backend), cuyos
+locks por uid serializan entre workers los turnos del mismo usuario, y los
+perfiles cacheados vencen a los 5 s (PROFILE_CACHE_TTL, ver profile_cache).
+
+Uso: python serve.py
+"""
+import os
+import sys
+from importlib.util import find_spec
+from typing import Any, Dict
+
+
+def settings_from_env() -> Dict[str, Any]:
+    return {
+        "bind": os.environ.get("WEB_BIND", "0.0.0.0:5000"),
+        "workers": max(1, int(os.environ.get("WEB_WORKERS") or min(os.cpu_count() or 1, 2))),
+        "threads": max(1, int(os.environ.get("WEB_THREADS", "8"))),
+        "keepalive": int(os.environ.get("WEB_KEEPALIVE", "5")),
+        "backlog": int(os.environ.get("WEB_BACKLOG", "2048")),
+        "timeout": int(os.environ.get("WEB_TIMEOUT", "60")),
+        "preload_app": os.environ.get("WEB_PRELOAD", "1") == "1",
+    }
+
+
+def _post_fork(server, worker) -> None:
+    """Cada worker abre sus propias conexiones SQLite (no se comparten tras el fork)."""
+    from database import engine
+    engine.dispose(close=False)
+
+
+def _worker_exit(server, worker) -> None:
+    """Escribe los perfiles pendientes, el log encolado y sus agregados antes de salir."""
+    from chatbot_core import LOG_AGGREGATES, flush_interaction_log
+    from database import flush_profiles
+    flush_profiles()
+    flush_interaction_log(timeout=10.0)
+    LOG_AGGREGATES.checkpoint()
+
+
+def run_gunicorn(settings: Dict[str, Any]) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class ProductionServer(BaseApplication):
+        def load_config(self):
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("post_fork", _post_fork)
+            self.cfg.set("worker_exit", _worker_exit)
+            self.cfg.set("accesslog", os.environ.get("WEB_ACCESS_LOG") or None)
+
+        def load(self):
+            from web_app import app
+            return app
+
+    ProductionServer().run()
+
+
+def run_waitress(settings: Dict[str, Any]) -> None:
+    from waitress import serve
+    from web_app import app
+
+    if settings["workers"] > 1:
+        print("⚠️ waitress no usa varios procesos; se ignora WEB_WORKERS")
+    serve(
+        app,
+        listen=settings["bind"],
+        threads=settings["threads"],
+        backlog=settings["backlog"],
+        channel_timeout=max(settings["keepalive"], 1),
+    )
+
+
+def main() -> None:
+    settings = settings_from_env()
+    if os.name != "nt" and find_spec("gunicorn"):
+        if settings["workers"] > 1:
+            # Sesiones compartidas y caché de perfiles con lecturas de a lo sumo 5 s de atraso
+            os.environ.setdefault("SESSION_BACKEND", "sqlite")
+            os.environ.setdefault("PROFILE_CACHE_TTL", "5")
+        run_gunicorn(settings)
+    elif find_spec("waitress"):
+        run_waitress(settings)
+    else:
+        sys.exit("❌ Instalá gunicorn (Linux) o waitress (Windows): pip install -r requirements.txt")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Backends de estado de sesión: guardan el dict de ChatBot.export_state por uid.
+
+- MemoryBackend: en el proceso, acotado (LRU). Recibe las sesiones que
+  SessionStore expulsa para poder rehidratarlas; no se comparte entre procesos.
+- SQLiteBackend: tabla session_states de la DB de la app. Compartido entre
+  procesos/workers del mismo host.
+- RedisBackend: cualquier cliente con la API get/set/delete de redis-py.
+  LocalRedis es un sustituto en proceso con la misma API (desarrollo y tests).
+
+Los backends compartidos (`shared = True`) se leen al empezar cada turno y se
+escriben al terminarlo, así cualquier worker puede atender a cualquier uid.
+El lock por uid de SessionStore solo vale dentro de un proceso: entre workers
+el turno completo (leer, procesar, guardar) se hace dentro de `lock(uid)`,
+que en SQLite es un flock sobre archivos de lock junto a la DB (mismo host) y
+en Redis una clave SET NX con vencimiento. Sin él dos workers podrían atender
+turnos simultáneos del mismo uid y el último en guardar pisaría al otro.
+
+Selección por entorno con backend_from_env(): SESSION_BACKEND=memory|sqlite|redis
+(REDIS_URL para un Redis real).
+"""
+import json
+import os
+import secrets
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: waitress corre un solo proceso, alcanza el lock de SessionStore
+    fcntl = None
+
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "memory")
+SESSION_STATE_TTL = int(os.environ.get("SESSION_STATE_TTL", str(30 * 24 * 3600)))
+SESSION_BACKEND_MAX = int(os.environ.get("SESSION_BACKEND_MAX", "50000"))
+# Archivos de lock entre procesos (uids distintos pueden compartir uno)
+SESSION_LOCK_STRIPES = int(os.environ.get("SESSION_LOCK_STRIPES", "64"))
+# Vencimiento del lock en Redis (un worker caído no lo retiene más que esto)
+SESSION_LOCK_TTL = float(os.environ.get("SESSION_LOCK_TTL", "30"))
+SESSION_LOCK_TIMEOUT = float(os.environ.get("SESSION_LOCK_TIMEOUT", "10"))
+
+
+def dumps_state(state: Dict[str, Any]) -> str:
+    return json.dumps(state, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads_state(payload) -> Optional[Dict[str, Any]]:
+    if payload is None:
+        return None
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    return json.loads(payload)
+
+
+class SessionBackend:
+    """Interfaz: estado (dict JSON) por uid."""
+
+    shared = False
+
+    def load(self, uid: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def save(self, uid: str, state: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete(self, uid: str) -> None:
+        raise NotImplementedError
+
+    def lock(self, uid: str) -> ContextManager[None]:
+        """Exclusión del turno de uid entre procesos (en uno solo basta SessionStore.turn)."""
+        return nullcontext()
+
+
+class MemoryBackend(SessionBackend):
+    """Estados serializados en un dict del proceso, con tope LRU de entradas."""
+
+    def __init__(self, max_entries: int = SESSION_BACKEND_MAX):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, uid: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            payload = self._data.get(uid)
+            if payload is not None:
+                self._data.move_to_end(uid)
+        return loads_state(payload)
+
+    def save(self, uid: str, state: Dict[str, Any]) -> None:
+        payload = dumps_state(state)
+        with self._lock:
+            self._data[uid] = payload
+            self._data.move_to_end(uid)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, uid: str) -> None:
+        with self._lock:
+            self._data.pop(uid, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteBackend(SessionBackend):
+    """Tabla session_states de la DB SQLite de la app (ver database.py)."""
+
+    shared = True
+
+    def __init__(self, ttl: int = SESSION_STATE_TTL, lock_dir: Optional[Path] = None,
+                 stripes: int = SESSION_LOCK_STRIPES):
+        self.ttl = ttl
+        self.lock_dir = lock_dir
+        self.stripes = max(1, stripes)
+
+    @contextmanager
+    def lock(self, uid: str) -> Iterator[None]:
+        """flock exclusivo sobre uno de `stripes` archivos (lo libera el SO si el worker muere)."""
+        if fcntl is None:
+            yield
+            return
+        lock_dir = self.lock_dir
+        if lock_dir is None:
+            from database import DB_PATH
+            lock_dir = DB_PATH.with_name(DB_PATH.name + ".locks")
+        lock_dir.mkdir(parents=True, exist_ok=True)
+        stripe = zlib.crc32(uid.encode("utf-8")) % self.stripes
+        with open(lock_dir / f"{stripe}.lock", "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def load(self, uid: str) -> Optional[Dict[str, Any]]:
+        from database import load_session_state
+        return loads_state(load_session_state(uid))
+
+    def save(self, uid: str, state: Dict[str, Any]) -> None:
+        from database import save_session_state
+        save_session_state(uid, dumps_state(state))
+
+    def delete(self, uid: str) -> None:
+        from database import delete_session_state
+        delete_session_state(uid)
+
+    def purge(self) -> int:
+        """Borra estados sin actividad hace más de ttl segundos."""
+        from database import purge_session_states
+        return purge_session_states(datetime.now() - timedelta(seconds=self.ttl))
+
+
+class LocalRedis:
+    """Sustituto en proceso de un cliente Redis: get/set(ex=)/delete/exists/flushdb."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._alive(key)
+
+    def set(self, key: str, value, ex: Optional[float] = None, px: Optional[int] = None,
+            nx: bool = False) -> Optional[bool]:
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        ttl = px / 1000 if px else ex
+        with self._lock:
+            if nx and self._alive(key) is not None:
+                return None
+            self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def exists(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._alive(key) is not None for key in keys)
+
+    def flushdb(self) -> bool:
+        with self._lock:
+            self._data.clear()
+        return True
+
+
+class RedisBackend(SessionBackend):
+    """Estados en Redis (o LocalRedis) con TTL por clave."""
+
+    def __init__(self, client=None, prefix: str = "session:", ttl: int = SESSION_STATE_TTL):
+        # Sin cliente se usa LocalRedis, que vive en este proceso
+        self.shared = client is not None
+        self.client = client if client is not None else LocalRedis()
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def load(self, uid: str) -> Optional[Dict[str, Any]]:
+        return loads_state(self.client.get(self.prefix + uid))
+
+    def save(self, uid: str, state: Dict[str, Any]) -> None:
+        self.client.set(self.prefix + uid, dumps_state(state), ex=self.ttl or None)
+
+    def delete(self, uid: str) -> None:
+        self.client.delete(self.prefix + uid)
+
+    @contextmanager
+    def lock(self, uid: str) -> Iterator[None]:
+        """
+        Clave `<prefix>lock:<uid>` con SET NX y vencimiento SESSION_LOCK_TTL;
+        se espera hasta SESSION_LOCK_TIMEOUT y solo la borra quien la tomó.
+        """
+        if not self.shared:
+            yield
+            return
+        key = f"{self.prefix}lock:{uid}"
+        token = secrets.token_hex(8).encode()
+        deadline = time.monotonic() + SESSION_LOCK_TIMEOUT
+        while not self.client.set(key, token, px=int(SESSION_LOCK_TTL * 1000), nx=True):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Turno de {uid} tomado por otro worker")
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            if self.client.get(key) == token:
+                self.client.delete(key)
+
+
+def backend_from_env(kind: Optional[str] = None) -> SessionBackend:
+    """Backend según SESSION_BACKEND (memory por defecto)."""
+    kind = (kind or SESSION_BACKEND).strip().lower()
+    if kind == "sqlite":
+        return SQLiteBackend()
+    if kind == "redis":
+        url = os.environ.get("REDIS_URL")
+        if not url:
+            return RedisBackend()
+        try:
+            import redis
+        except ImportError:
+            print("⚠️ Paquete redis no instalado; se usa LocalRedis (no compartido entre procesos)")
+            return RedisBackend()
+        return RedisBackend(redis.Redis.from_url(url))
+    if kind != "memory":
+        print(f"⚠️ SESSION_BACKEND desconocido: {kind!r}; se usa memory")
+    return MemoryBackend()
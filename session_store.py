@@ -0,0 +1,310 @@
+"""
+Almacén acotado de sesiones (un ChatBot por uid) para web_app.
+
+Reemplaza al dict global `user_bots`, que crecía sin límite:
+
+- LRU: al superar `max_sessions` (o `max_bytes` estimados) se expulsa la
+  sesión usada hace más tiempo.
+- TTL de inactividad: las sesiones sin uso por más de `idle_ttl` segundos se
+  descartan en el próximo acceso al almacén.
+- Sesiones provisorias: los uid recién emitidos para clientes sin cookie van a
+  un área aparte, más chica y con TTL corto. Se promueven a sesión normal
+  cuando el cliente vuelve con la cookie; un cliente que descarta cookies solo
+  rota dentro de esa área y no hace crecer la memoria.
+- Turnos serializados por sesión: `with store.turn(uid):` toma un lock propio
+  de ese uid, así dos mensajes simultáneos del mismo usuario no pisan su
+  conversation_state, mientras usuarios distintos avanzan en paralelo. La
+  espera por ese lock se mide en un histograma.
+- Rehidratación: ante un miss se llama a `restore(uid)` para reconstruir la
+  sesión desde el estado persistido (por ejemplo, el perfil en la DB), y antes
+  de expulsar una sesión se llama a `persist(uid, bot)`.
+
+Los contadores (hits, misses, expulsiones, errores al persistir, espera de
+locks) se exponen con `stats()`.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from detect_trace import LatencyHistogram
+
+# Configuración por entorno (ver from_env)
+SESSION_MAX = int(os.environ.get("SESSION_MAX", "5000"))
+SESSION_IDLE_TTL = float(os.environ.get("SESSION_IDLE_TTL", str(6 * 3600)))
+SESSION_MAX_MB = float(os.environ.get("SESSION_MAX_MB", "0"))  # 0 = sin límite por memoria
+SESSION_PROVISIONAL_MAX = int(os.environ.get("SESSION_PROVISIONAL_MAX", "500"))
+SESSION_PROVISIONAL_TTL = float(os.environ.get("SESSION_PROVISIONAL_TTL", "900"))
+
+
+def estimate_size(obj: Any, _seen: Optional[set] = None) -> int:
+    """Tamaño aproximado (bytes) de un objeto y sus dicts/listas/atributos anidados."""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+        size += estimate_size(vars(obj), seen)
+    return size
+
+
+class _Entry:
+    __slots__ = ("bot", "last_used", "size")
+
+    def __init__(self, bot: Any, now: float, size: int):
+        self.bot = bot
+        self.last_used = now
+        self.size = size
+
+
+class _TurnLock:
+    """Lock de un uid y cuántos hilos lo usan o esperan (para liberarlo al final)."""
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+class SessionStore:
+    """Sesiones por uid con expulsión LRU + TTL de inactividad, thread-safe."""
+
+    def __init__(
+        self,
+        factory: Callable[[str], Any],
+        max_sessions: int = SESSION_MAX,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        max_bytes: int = 0,
+        max_provisional: int = SESSION_PROVISIONAL_MAX,
+        provisional_ttl: float = SESSION_PROVISIONAL_TTL,
+        restore: Optional[Callable[[str], Optional[Any]]] = None,
+        persist: Optional[Callable[[str, Any], None]] = None,
+        size_of: Callable[[Any], int] = estimate_size,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.factory = factory
+        self.max_sessions = max(1, max_sessions)
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.max_provisional = max(1, max_provisional)
+        self.provisional_ttl = provisional_ttl
+        self.restore = restore
+        self.persist = persist
+        self.size_of = size_of
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._sessions: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._provisional: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._turn_locks: Dict[str, _TurnLock] = {}
+        self.lock_wait = LatencyHistogram()
+        self.counters: Dict[str, int] = dict.fromkeys((
+            "hits", "misses", "created", "restored", "promoted",
+            "evicted_lru", "evicted_memory", "expired", "provisional_evicted",
+            "turns", "contended_turns", "persist_errors",
+        ), 0)
+
+    @classmethod
+    def from_env(cls, factory: Callable[[str], Any], **kwargs) -> "SessionStore":
+        """Almacén configurado con SESSION_MAX, SESSION_IDLE_TTL, SESSION_MAX_MB, etc."""
+        kwargs.setdefault("max_bytes", int(SESSION_MAX_MB * 2**20))
+        return cls(factory, **kwargs)
+
+    # --- acceso ---
+
+    def get(self, uid: str, provisional: bool = False) -> Any:
+        """
+        Devuelve la sesión de `uid`, creándola (o rehidratándola) si no existe.
+
+        Con provisional=True una sesión nueva queda en el área de provisorias
+        (uid recién emitido para un cliente sin cookie). La rehidratación
+        (I/O) corre fuera del lock global para no frenar a otros usuarios.
+        """
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            bot = self._lookup(uid, provisional, now)
+            if bot is not None:
+                self.counters["hits"] += 1
+                return bot
+            self.counters["misses"] += 1
+
+        bot = None
+        if self.restore is not None and not provisional:
+            bot = self.restore(uid)
+        restored = bot is not None
+        if bot is None:
+            bot = self.factory(uid)
+
+        with self._lock:
+            # Otro hilo pudo crear la misma sesión mientras tanto
+            existing = self._lookup(uid, provisional, now)
+            if existing is not None:
+                return existing
+            self.counters["restored" if restored else "created"] += 1
+            entry = _Entry(bot, now, 0)
+            if provisional:
+                self._provisional[uid] = entry
+                while len(self._provisional) > self.max_provisional:
+                    self._provisional.popitem(last=False)
+                    self.counters["provisional_evicted"] += 1
+            else:
+                self._insert(uid, entry)
+            return bot
+
+    def _lookup(self, uid: str, provisional: bool, now: float) -> Optional[Any]:
+        entry = self._sessions.get(uid)
+        if entry is not None:
+            self._sessions.move_to_end(uid)
+            entry.last_used = now
+            self._resize(entry)
+            return entry.bot
+
+        entry = self._provisional.pop(uid, None)
+        if entry is None:
+            return None
+        entry.last_used = now
+        if provisional:
+            self._provisional[uid] = entry
+        else:
+            # El cliente volvió con la cookie: pasa a sesión normal
+            self.counters["promoted"] += 1
+            self._insert(uid, entry)
+        return entry.bot
+
+    @contextmanager
+    def turn(self, uid: str) -> Iterator[None]:
+        """Serializa los turnos de un mismo uid; uids distintos no se bloquean entre sí."""
+        with self._lock:
+            turn_lock = self._turn_locks.get(uid)
+            if turn_lock is None:
+                turn_lock = self._turn_locks[uid] = _TurnLock()
+            turn_lock.users += 1
+
+        contended = not turn_lock.lock.acquire(blocking=False)
+        if contended:
+            start = time.perf_counter()
+            turn_lock.lock.acquire()
+            waited = time.perf_counter() - start
+        else:
+            waited = 0.0
+        with self._lock:
+            self.counters["turns"] += 1
+            self.counters["contended_turns"] += contended
+            self.lock_wait.observe(waited)
+        try:
+            yield
+        finally:
+            turn_lock.lock.release()
+            with self._lock:
+                turn_lock.users -= 1
+                if not turn_lock.users:
+                    del self._turn_locks[uid]
+
+    def touch(self, uid: str) -> None:
+        """Re-estima el tamaño de la sesión tras un turno (el estado pudo crecer)."""
+        with self._lock:
+            entry = self._sessions.get(uid)
+            if entry is not None:
+                self._resize(entry)
+                self._shrink()
+
+    def discard(self, uid: str) -> None:
+        """Elimina la sesión sin persistirla (ej.: logout)."""
+        with self._lock:
+            entry = self._sessions.pop(uid, None)
+            if entry is not None:
+                self._bytes -= entry.size
+            self._provisional.pop(uid, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+            self._provisional.clear()
+            self._bytes = 0
+
+    def __contains__(self, uid: str) -> bool:
+        with self._lock:
+            return uid in self._sessions or uid in self._provisional
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions) + len(self._provisional)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "sessions": len(self._sessions),
+                "provisional": len(self._provisional),
+                "max_sessions": self.max_sessions,
+                "idle_ttl": self.idle_ttl,
+                "estimated_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+                "active_turns": len(self._turn_locks),
+                "lock_wait": self.lock_wait.to_dict(),
+                **self.counters,
+            }
+
+    # --- expulsión ---
+
+    def _insert(self, uid: str, entry: _Entry) -> None:
+        self._sessions[uid] = entry
+        self._resize(entry)
+        while len(self._sessions) > self.max_sessions:
+            self._evict_oldest("evicted_lru")
+        self._shrink()
+
+    def _resize(self, entry: _Entry) -> None:
+        if not self.max_bytes:
+            return
+        size = self.size_of(entry.bot)
+        self._bytes += size - entry.size
+        entry.size = size
+
+    def _shrink(self) -> None:
+        # Siempre queda al menos la sesión más reciente
+        while self.max_bytes and self._bytes > self.max_bytes and len(self._sessions) > 1:
+            self._evict_oldest("evicted_memory")
+
+    def _evict_oldest(self, reason: str) -> None:
+        uid, entry = self._sessions.popitem(last=False)
+        self._bytes -= entry.size
+        self.counters[reason] += 1
+        self._persist(uid, entry.bot)
+
+    def _expire(self, now: float) -> None:
+        """Descarta sesiones inactivas; el orden LRU permite cortar en la primera vigente."""
+        while self._sessions:
+            uid, entry = next(iter(self._sessions.items()))
+            if now - entry.last_used <= self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+            self._bytes -= entry.size
+            self.counters["expired"] += 1
+            self._persist(uid, entry.bot)
+        while self._provisional:
+            uid, entry = next(iter(self._provisional.items()))
+            if now - entry.last_used <= self.provisional_ttl:
+                break
+            self._provisional.popitem(last=False)
+            self.counters["provisional_evicted"] += 1
+
+    def _persist(self, uid: str, bot: Any) -> None:
+        if self.persist is None:
+            return
+        try:
+            self.persist(uid, bot)
+        except Exception as e:
+            # La sesión ya salió del almacén: lo único que queda es avisar
+            self.counters["persist_errors"] += 1
+            print(f"⚠️ No se pudo guardar la sesión expulsada {uid}: {e}")
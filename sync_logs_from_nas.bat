@@ -19,9 +19,13 @@ if not exist Y:\deploy-nas (
     exit /b 1
 )
 
-REM Verificar que exista chat_logs.csv en el NAS
-if not exist Y:\deploy-nas\chat_logs.csv (
-    echo ADVERTENCIA: No se encontro chat_logs.csv en el NAS
+REM Logs segmentados (chat_logs\) o, en instalaciones anteriores, chat_logs.csv
+if exist Y:\deploy-nas\chat_logs\ (
+    set LOGS=chat_logs
+) else if exist Y:\deploy-nas\chat_logs.csv (
+    set LOGS=chat_logs.csv
+) else (
+    echo ADVERTENCIA: No se encontraron logs en el NAS
     echo Puede que aun no haya interacciones registradas
     pause
     exit /b 0
@@ -34,10 +38,14 @@ if exist chat_logs.csv (
     echo   [OK] Backup creado
 )
 
-REM Copiar log desde NAS
+REM Copiar logs desde NAS (en segmentos solo se copian los dias nuevos o modificados)
 echo.
 echo Descargando logs desde el NAS...
-copy /Y Y:\deploy-nas\chat_logs.csv chat_logs.csv >nul
+if "%LOGS%"=="chat_logs" (
+    xcopy /D /E /I /Y /Q Y:\deploy-nas\chat_logs chat_logs >nul
+) else (
+    copy /Y Y:\deploy-nas\chat_logs.csv chat_logs.csv >nul
+)
 if %ERRORLEVEL% EQU 0 (
     echo   [OK] Logs sincronizados correctamente
 ) else (
@@ -51,9 +59,13 @@ echo.
 echo ========================================
 echo  ESTADISTICAS DEL LOG
 echo ========================================
-for /f %%A in ('find /c /v "" ^< chat_logs.csv') do set lines=%%A
-set /a interactions=%lines%-1
-echo Total de interacciones: %interactions%
+if "%LOGS%"=="chat_logs" (
+    python log_store.py stats
+) else (
+    for /f %%A in ('find /c /v "" ^< chat_logs.csv') do set lines=%%A
+    call set /a interactions=%%lines%%-1
+    call echo Total de interacciones: %%interactions%%
+)
 echo.
 
 REM Preguntar si quiere analizar
@@ -70,7 +82,7 @@ echo ========================================
 echo  SINCRONIZACION COMPLETADA
 echo ========================================
 echo.
-echo Los logs estan en: %CD%\chat_logs.csv
-echo Este archivo NO se sube a GitHub (privacidad)
+echo Los logs estan en: %CD%\%LOGS%
+echo Los logs NO se suben a GitHub (privacidad)
 echo.
 pause
@@ -0,0 +1,78 @@
+import inspect
+
+import calculators
+from calc_cache import CalcCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _counting(fn):
+    calls = []
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        return fn(*args, **kwargs)
+    wrapper.__name__ = fn.__name__
+    wrapper.__signature__ = inspect.signature(fn)
+    return wrapper, calls
+
+
+def test_equivalent_calls_share_one_entry():
+    cache = CalcCache(max_entries=8, ttl=60, decimales=6)
+    fn, calls = _counting(calculators.calcular_interes_compuesto)
+    cached = cache.wrap(fn)
+    a = cached(10000, 12, 5)
+    assert cached(10000.0, 12.0000000001, 5, 0) is a
+    assert cached(capital=10000, tasa_anual=12, años=5, aporte_mensual=0.0) is a
+    assert len(calls) == 1
+    assert cached(10000, 12, 5, 100) != a
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2 and stats["hit_rate"] == 0.5
+    assert stats["by_function"]["calcular_interes_compuesto"] == {"hits": 2, "misses": 2}
+
+
+def test_miss_uses_original_arguments():
+    cache = CalcCache(decimales=1)
+    fn, calls = _counting(calculators.calcular_interes_compuesto)
+    cached = cache.wrap(fn)
+    # 7/12 años son 7 meses aunque la clave redondee a 0.6
+    assert cached(1000, 12, 7 / 12)["total_invertido"] == 1000
+    assert calls == [(1000, 12, 7 / 12)]
+
+
+def test_lru_and_ttl():
+    clock = FakeClock()
+    cache = CalcCache(max_entries=2, ttl=10, clock=clock)
+    cuota = cache.wrap(calculators.calcular_cuota_prestamo)
+    cuota(1000, 10, 12)
+    cuota(2000, 10, 12)
+    cuota(1000, 10, 12)          # la más reciente
+    cuota(3000, 10, 12)          # expulsa 2000
+    assert cache.stats()["evicted"] == 1
+    cuota(1000, 10, 12)
+    assert cache.stats()["hits"] == 2
+    clock.now = 11
+    cuota(1000, 10, 12)
+    assert cache.stats()["expired"] == 1 and cache.stats()["misses"] == 4
+
+
+def test_disabled_or_bad_arguments_bypass_the_cache():
+    cache = CalcCache(max_entries=0)
+    cached = cache.wrap(calculators.tiempo_pagar_deuda)
+    cached(1000, 100)
+    assert len(cache) == 0 and cache.stats()["misses"] == 0
+
+    cached = CalcCache().wrap(calculators.tiempo_pagar_deuda)
+    for bad in ((1000,), (1000, 100, 0, 5)):
+        try:
+            cached(*bad)
+        except TypeError:
+            pass
+        else:
+            raise AssertionError(bad)
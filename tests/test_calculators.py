@@ -0,0 +1,133 @@
+import random
+
+import numpy as np
+import pytest
+
+from calculators import (
+    calcular_cuota_prestamo,
+    calcular_cuota_prestamo_lote,
+    calcular_interes_compuesto,
+    calcular_interes_compuesto_lote,
+    evolucion_interes_compuesto,
+    grilla_calculo,
+    tiempo_pagar_deuda,
+    tiempo_pagar_deuda_lote,
+)
+
+
+def interes_compuesto_iterativo(capital, tasa_anual, años, aporte_mensual=0):
+    """Implementación anterior (mes a mes), como referencia."""
+    tasa_mensual = (tasa_anual / 100) / 12
+    monto = capital
+    total_invertido = capital
+    saldos = [monto]
+    for _ in range(int(años * 12)):
+        monto = monto * (1 + tasa_mensual) + aporte_mensual
+        total_invertido += aporte_mensual
+        saldos.append(monto)
+    return monto, total_invertido, saldos
+
+
+def _casos(n=500, seed=7):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield (
+            round(rng.choice([0, rng.uniform(0, 5_000_000)]), 2),
+            rng.choice([0.0, round(rng.uniform(-5, 120), 2), rng.choice([8.0, 12.0, 50.0])]),
+            rng.choice([rng.randint(1, 40), round(rng.uniform(0.1, 40), 2)]),
+            round(rng.choice([0, rng.uniform(1, 500_000)]), 2),
+        )
+
+
+def test_closed_form_matches_monthly_loop_to_the_cent():
+    for capital, tasa, años, aporte in _casos():
+        if capital == 0 and (aporte == 0 or int(años * 12) == 0):
+            continue  # rendimiento_porcentaje divide por el total invertido
+        monto, invertido, _ = interes_compuesto_iterativo(capital, tasa, años, aporte)
+        r = calcular_interes_compuesto(capital, tasa, años, aporte)
+        if monto < 1e10:
+            assert r["monto_final"] == round(monto, 2), (capital, tasa, años, aporte)
+        else:
+            # Montos astronómicos: el propio loop ya acumula error de redondeo
+            assert r["monto_final"] == pytest.approx(monto, rel=1e-12)
+        assert r["total_invertido"] == pytest.approx(invertido, abs=0.011)
+
+
+def test_evolucion_matches_loop_month_by_month():
+    for capital, tasa, años, aporte in list(_casos(50, seed=3)):
+        _, _, saldos = interes_compuesto_iterativo(capital, tasa, años, aporte)
+        evolucion = evolucion_interes_compuesto(capital, tasa, años, aporte)
+        assert len(evolucion["mes"]) == len(saldos)
+        np.testing.assert_allclose(evolucion["saldo"], saldos, rtol=1e-11, atol=0.005)
+        assert evolucion["aportado"][-1] == pytest.approx(capital + aporte * (len(saldos) - 1))
+
+
+@pytest.mark.parametrize("capital,tasa,años,aporte", [
+    (100000, 100.0, 1000, 0),     # (1 + r)^n se desborda
+    (0, 100.0, 1000, 5000),       # solo aportes: expm1 se desborda
+    (100000, 100.0, 1000, 5000),
+])
+def test_extreme_horizon_gives_inf_like_the_loop(capital, tasa, años, aporte):
+    monto, _, _ = interes_compuesto_iterativo(capital, tasa, años, aporte)
+    assert monto == float("inf")
+    r = calcular_interes_compuesto(capital, tasa, años, aporte)
+    assert r["monto_final"] == r["ganancia"] == float("inf")
+    with np.errstate(all="raise"):
+        assert evolucion_interes_compuesto(capital, tasa, años, aporte)["saldo"][-1] == float("inf")
+
+
+@pytest.mark.parametrize("tasa", [-1200.0, -1500.0, -3000.0])
+def test_monthly_rate_at_or_below_minus_100_matches_the_loop(tasa):
+    # log1p no está definido para r <= -1: se usa la potencia, como el loop
+    monto, _, saldos = interes_compuesto_iterativo(100000, tasa, 2, 100)
+    assert calcular_interes_compuesto(100000, tasa, 2, 100)["monto_final"] == pytest.approx(monto, rel=1e-9)
+    np.testing.assert_allclose(evolucion_interes_compuesto(100000, tasa, 2, 100)["saldo"], saldos, rtol=1e-9)
+
+
+def test_lote_interes_compuesto_matches_scalar_version():
+    casos = [c for c in _casos(300, seed=11) if c[0] or (c[3] and int(c[2] * 12))]
+    capital, tasa, años, aporte = (np.array(col) for col in zip(*casos))
+    lote = calcular_interes_compuesto_lote(capital, tasa, años, aporte)
+    for fila, caso in zip(lote, casos):
+        esperado = calcular_interes_compuesto(*caso)
+        for campo, valor in esperado.items():
+            assert fila[campo] == pytest.approx(valor, rel=1e-12, abs=0.011), (caso, campo)
+
+
+def test_lote_broadcasts_orthogonal_axes():
+    tasas = np.array([0.0, 8.0, 12.0, 50.0])
+    plazos = np.array([6, 12, 60, 360])
+    cuotas = calcular_cuota_prestamo_lote(100_000, tasas[:, None], plazos[None, :])
+    assert cuotas.shape == (4, 4)
+    for i, tasa in enumerate(tasas):
+        for j, meses in enumerate(plazos):
+            esperado = calcular_cuota_prestamo(100_000, tasa, int(meses))
+            assert cuotas[i, j]["cuota_mensual"] == pytest.approx(esperado["cuota_mensual"], abs=0.011)
+            assert cuotas[i, j]["intereses_totales"] == pytest.approx(esperado["intereses_totales"], abs=0.011)
+
+
+def test_lote_tiempo_pagar_deuda_marks_unpayable_cells():
+    deudas, pagos, tasas = [50_000, 50_000, 50_000, 30_000], [5_000, 500, 0, 1_000], [0, 24, 0, 30]
+    lote = tiempo_pagar_deuda_lote(deudas, pagos, tasas)
+    assert lote["pagable"].tolist() == [True, False, False, True]
+    for fila, caso in zip(lote, zip(deudas, pagos, tasas)):
+        esperado = tiempo_pagar_deuda(*caso)
+        if "error" in esperado:
+            assert not fila["pagable"] and np.isnan(fila["total_a_pagar"])
+        else:
+            assert fila["meses_necesarios"] == esperado["meses_necesarios"]
+            assert fila["total_a_pagar"] == pytest.approx(esperado["total_a_pagar"])
+            assert fila["años"] == esperado["años"]
+
+
+def test_grilla_calculo_builds_one_axis_per_list():
+    ejes, tabla = grilla_calculo("interes_compuesto", {
+        "capital": 10_000, "tasa_anual": [8, 10, 12], "años": [1, 5], "aporte_mensual": [0, 100, 200, 300],
+    })
+    assert list(ejes) == ["tasa_anual", "años", "aporte_mensual"]
+    assert tabla.shape == (3, 2, 4)
+    assert tabla[2, 1, 3]["monto_final"] == calcular_interes_compuesto(10_000, 12, 5, 300)["monto_final"]
+    with pytest.raises(ValueError):
+        grilla_calculo("interes_compuesto", {"capital": 1, "tasa_anual": 5})
+    with pytest.raises(ValueError):
+        grilla_calculo("hipoteca", {})
@@ -0,0 +1,52 @@
+import json
+
+from chatbot_core import ChatBot
+from detect_trace import NULL_TRACE, DetectTrace, TraceStats, TRACE_STATS
+
+
+def test_trace_names_rule_and_records_stages(monkeypatch):
+    monkeypatch.setattr(ChatBot, "trace_detect", True)
+    TRACE_STATS.reset()
+    bot = ChatBot()
+    assert bot.detect("que es inflacion") == "educacion"
+    assert bot.last_trace.rule in ("edu_phrase", "edu_trigger")
+    assert bot.detect("quisiera economizr") == "ahorro"
+    trace = bot.last_trace
+    assert trace.rule == "best_score"
+    assert set(trace.stages) >= {"scan", "priority_rules", "scoring", "fuzzy", "fallback"}
+    assert trace.scores_by_stage["total"]["ahorro"] > 0
+
+    snap = TRACE_STATS.snapshot()
+    assert snap["messages"] == 2
+    assert snap["rules"]["best_score"] == 1
+    assert snap["stages"]["scan"]["count"] == 2
+    json.loads(TRACE_STATS.to_json())
+
+
+def test_tracing_disabled_records_nothing(monkeypatch):
+    monkeypatch.setattr(ChatBot, "trace_detect", False)
+    TRACE_STATS.reset()
+    bot = ChatBot()
+    bot.detect("quiero ahorrar")
+    assert bot.last_trace is None
+    assert TRACE_STATS.snapshot()["messages"] == 0
+    assert NULL_TRACE.fire("x", "ahorro") == "ahorro"
+
+
+def test_every_rule_path_returns_same_scenario_with_and_without_trace():
+    bot = ChatBot()
+    for text in ["hola", "cer?", "tengo 100000 que hago", "quiero viajar a europa", "500000", "xyz"]:
+        assert bot.detect_rules(text, DetectTrace(text)) == bot.detect_rules(text)
+
+
+def test_stats_dump_writes_json(tmp_path):
+    stats = TraceStats()
+    trace = DetectTrace("hola")
+    trace.begin("scan")
+    trace.fire("default", "ayuda")
+    stats.record(trace)
+    path = tmp_path / "trace.json"
+    stats.dump(path)
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["rules"] == {"default": 1}
+    assert data["recent"][0]["scenario"] == "ayuda"
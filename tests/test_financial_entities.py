@@ -0,0 +1,94 @@
+import pytest
+
+from chatbot_core import ChatBot
+from financial_entities import (
+    CONTRIBUTION, DURATION, MONEY, RATE, extract_entities, parse_number,
+)
+
+
+@pytest.mark.parametrize("raw,expected", [
+    ("150000", 150000),
+    ("1.500.000", 1500000),
+    ("1.500.000,50", 1500000.5),
+    ("1,500.50", 1500.5),
+    ("50.000", 50000),
+    ("7,5", 7.5),
+    ("12.5", 12.5),
+    ("0,125", 0.125),
+])
+def test_parse_number_separators(raw, expected):
+    assert parse_number(raw) == expected
+
+
+@pytest.mark.parametrize("raw", ["192.168.1.1", "1.50.000", "1.500.5", "1,500,50.5"])
+def test_parse_number_rejects_malformed_thousands(raw):
+    with pytest.raises(ValueError):
+        parse_number(raw)
+
+
+def test_duration_range_is_not_an_amount():
+    ents = extract_entities("quiero ahorrar en 3-12 meses")
+    assert ents.amounts == []
+    assert [(e.value, e.upper) for e in ents.durations] == [(3, 12)]
+    assert ents.duration_months == 3
+    anios = extract_entities("entre 1 - 2 años").durations[0]
+    assert (anios.value, anios.upper) == (12, 24)
+    # "a" no arma rango: es el plazo de un monto
+    ents = extract_entities("cuota de prestamo 50000 a 12 meses")
+    assert [e.value for e in ents.money] == [50000]
+    assert ents.duration_months == 12
+
+
+def test_dotted_groups_must_have_three_digits():
+    assert extract_entities("mi ip es 192.168.1.1").entities == ()
+    assert extract_entities("vence el 1.5.2024").entities == ()
+    assert [e.value for e in extract_entities("1.500.000,50 pesos").money] == [1500000.5]
+
+
+def test_extract_typed_entities_in_one_scan():
+    ents = extract_entities("invierto 100 lucas al 12% por 2 años y aporto 5000 por mes")
+    assert [(e.kind, e.value) for e in ents.entities] == [
+        (MONEY, 100000), (RATE, 12), (DURATION, 24), (CONTRIBUTION, 5000),
+    ]
+    assert ents.duration_months == 24
+    assert ents.rate == 12
+    assert ents.contribution == 5000
+
+
+def test_currency_and_multipliers():
+    ents = extract_entities("tengo USD 1.500, 300 dólares y 2 palos")
+    assert [(e.value, e.currency) for e in ents.money] == [
+        (1500, "USD"), (300, "USD"), (2000000, "ARS"),
+    ]
+
+
+def test_rate_cue_and_contribution_cue():
+    ents = extract_entities("aporte mensual de 10000 y tasa 8")
+    assert ents.contribution == 10000
+    assert ents.rate == 8
+    assert ents.money == []
+
+
+def test_handlers_share_the_same_interpretation():
+    # "12 meses" es un plazo: ya no se toma como una deuda de $12
+    bot = ChatBot()
+    reply = bot.handle_deudas("12 meses", None)
+    assert "deuda de $12" not in reply
+    reply = bot.handle_calculadora("cuota de 50 lucas en 12 meses al 50%", None)
+    assert "$50,000" in reply and "12 meses" in reply
+
+
+def test_calculadora_does_not_reuse_typed_numbers_by_position():
+    bot = ChatBot()
+    # 6 meses = medio año, no 0 años con ganancia $0
+    reply = bot.handle_calculadora("comparar 200000 por 6 meses", None)
+    assert "por 0.5 años" in reply
+    assert "Ganancia: $0 " not in reply
+    # El 12 es un plazo, no un monto de $12
+    reply = bot.handle_calculadora("comparar la 12 meses", None)
+    assert "Monto: $12" not in reply and "Calculadora Financiera" in reply
+    # La tasa no se toma como capital ni como plazo
+    reply = bot.handle_calculadora("cuanto ganaria al 12% por 5 años", None)
+    assert "Calculadora Financiera" in reply
+    reply = bot.handle_calculadora("cuanto ganaria si invierto 100000 al 12%", None)
+    assert "Plazo: 5 años" in reply
@@ -1,3 +1,4 @@
+import json
 import re
 from web_app import app
 
@@ -44,3 +45,176 @@ def test_whatsapp_linking_flow():
         r2 = c.get(f'/claim/{token}', follow_redirects=False)
         assert r2.status_code in (301,302,303,307,308)
         assert 'uid=' in (r2.headers.get('Set-Cookie') or '')
+
+
+def test_classify_batch_is_stateless():
+    with app.test_client() as c:
+        msgs = ['quiero ahorrar', 'tengo deuda de 300000', 'que es inflacion', 'quiero ahorrar']
+        r = c.post('/api/classify', json=msgs)
+        assert r.status_code == 200
+        j = r.get_json()
+        assert j['count'] == 4
+        assert j['scenarios'] == ['ahorro', 'deudas', 'educacion', 'ahorro']
+        assert 'uid=' not in (r.headers.get('Set-Cookie') or '')
+
+        assert c.post('/api/classify', json={'message': 'hola'}).status_code == 400
+        assert c.post('/api/classify', json=['ok', 3]).status_code == 400
+
+
+def test_cookieless_clients_do_not_grow_session_store():
+    from web_app import sessions
+
+    before = sessions.stats()["sessions"]
+    for _ in range(5):
+        with app.test_client() as c:
+            c.post('/api/chat', json={'message': 'hola'})
+    stats = app.test_client().get('/debug/sessions').get_json()
+    assert stats["sessions"] == before
+    assert stats["provisional"] >= 1
+
+    with app.test_client() as c:
+        c.post('/api/chat', json={'message': 'hola'})
+        c.post('/api/chat', json={'message': 'hola de nuevo'})
+    assert sessions.stats()["sessions"] == before + 1
+
+
+def test_logs_api_pages_and_filters_on_server(tmp_path, monkeypatch):
+    import web_app
+    from log_aggregates import LogAggregates
+    from log_store import SegmentedLogStore
+
+    store = SegmentedLogStore(tmp_path / "chat_logs", index_every=8)
+    rows = [[f"2024-05-01T10:{i:02d}:00", "ahorro" if i % 3 == 0 else "deudas",
+             "negativo" if i % 2 else "neutral", "none", f"mensaje {i}", "ok"] for i in range(30)]
+    store.append(rows)
+    aggregates = LogAggregates(tmp_path / "aggregates.json")
+    aggregates.observe(rows)
+    monkeypatch.setattr(web_app, "LOG_STORE", store)
+    monkeypatch.setattr(web_app, "LOG_AGGREGATES", aggregates)
+    with app.test_client() as c:
+        first = c.get('/api/logs?per_page=5').get_json()
+        assert [r['user'] for r in first['rows']] == [f"mensaje {i}" for i in range(29, 24, -1)]
+        assert first['has_more'] is True
+
+        last = c.get('/api/logs?per_page=5&page=6').get_json()
+        assert last['rows'][-1]['user'] == "mensaje 0" and last['has_more'] is False
+
+        ahorro = c.get('/api/logs?scenario=ahorro&sentiment=neutral&per_page=50').get_json()
+        assert {r['user'] for r in ahorro['rows']} == {f"mensaje {i}" for i in range(0, 30, 6)}
+
+        assert [r['user'] for r in c.get('/api/logs?q=MENSAJE 1').get_json()['rows']][:2] == ["mensaje 19", "mensaje 18"]
+
+        stats = c.get('/api/logs/stats').get_json()
+        assert stats['rows'] == 30 and stats['scenarios'] == {"ahorro": 10, "deudas": 20}
+        assert stats['hours'] == {"10": 30}
+
+        shell = c.get('/logs').get_data(as_text=True)
+        assert '/api/logs' in shell and 'mensaje 29' not in shell
+
+
+def test_calc_grid_returns_one_nested_array_per_field():
+    with app.test_client() as c:
+        r = c.post('/api/calc/grid', json={
+            "calculo": "tiempo_pagar_deuda",
+            "params": {"deuda": 50000, "pago_mensual": [500, 5000], "tasa_anual": {"desde": 0, "hasta": 24, "pasos": 3}},
+            "campos": ["meses_necesarios", "total_a_pagar", "pagable"],
+        })
+        assert r.status_code == 200
+        j = r.get_json()
+        assert j["shape"] == [2, 3]
+        assert j["ejes"]["tasa_anual"] == [0.0, 12.0, 24.0]
+        assert j["resultados"]["meses_necesarios"][1][0] == 10
+        assert j["resultados"]["pagable"][0] == [True, False, False]
+        assert j["resultados"]["total_a_pagar"][0][2] is None
+
+        solo = c.post('/api/calc/grid', json={"params": {"capital": 1000, "tasa_anual": [5, 10], "años": 2}}).get_json()
+        assert list(solo["resultados"]) == ["monto_final"]  # por defecto, solo el campo principal
+
+        assert c.post('/api/calc/grid', json={"calculo": "hipoteca", "params": {}}).status_code == 400
+        assert c.post('/api/calc/grid', json={"params": {"capital": 1, "tasa_anual": 1, "años": 1},
+                                              "campos": ["cuota"]}).status_code == 400
+        assert c.post('/api/calc/grid', json=[1, 2]).status_code == 400
+        big = {"capital": 1, "tasa_anual": list(range(1000)), "años": list(range(1000))}
+        assert c.post('/api/calc/grid', json={"params": big}).status_code == 413
+
+
+def test_amortizacion_streams_ndjson_and_csv():
+    with app.test_client() as c:
+        r = c.get('/api/calc/amortizacion?monto=120000&tasa=24&meses=12&sistema=aleman&prepagos=6:30000')
+        assert r.status_code == 200 and r.mimetype == 'application/x-ndjson'
+        filas = [json.loads(line) for line in r.get_data(as_text=True).splitlines()]
+        assert [f["periodo"] for f in filas] == list(range(1, 10))  # el prepago acorta el plazo
+        assert filas[5]["prepago"] == 30000 and filas[-1]["saldo"] == 0
+
+        r = c.get('/api/calc/amortizacion?monto=1000000&tasa=10&meses=360&formato=csv')
+        lineas = r.get_data(as_text=True).splitlines()
+        assert r.mimetype == 'text/csv'
+        assert lineas[0] == 'periodo,cuota,interes,amortizacion,prepago,saldo'
+        assert len(lineas) == 361 and lineas[-1].endswith(',0.0')
+
+        assert c.get('/api/calc/amortizacion?monto=1000&meses=12&sistema=suizo').status_code == 400
+        assert c.get('/api/calc/amortizacion?monto=-1&meses=12').status_code == 400
+        assert c.get('/api/calc/amortizacion?monto=1000&meses=12&prepagos=x').status_code == 400
+
+
+def test_montecarlo_endpoint_returns_bands_and_probability():
+    with app.test_client() as c:
+        body = {"aporte_mensual": 1000, "años": 10, "caminos": 2000, "objetivo": 200000, "semilla": 9}
+        j = c.post('/api/calc/montecarlo', json=body).get_json()
+        assert j["caminos"] == 2000 and j["meses"] == 120 and j["semilla"] == 9
+        assert len(j["bandas"]["p50"]) == len(j["bandas"]["mes"])
+        assert j["final"]["p10"] < j["final"]["p50"] < j["final"]["p90"]
+        assert 0 <= j["prob_objetivo"] <= 1
+        assert c.post('/api/calc/montecarlo', json=body).get_json()["final"] == j["final"]
+
+        assert c.post('/api/calc/montecarlo', json={"meses": "mucho"}).status_code == 400
+        assert c.post('/api/calc/montecarlo', json={"tasa": 5}).status_code == 400
+        assert c.post('/api/calc/montecarlo', json={"meses": 0}).status_code == 400
+        assert c.post('/api/calc/montecarlo', json={"meses": 1200, "caminos": 10**6}).status_code == 413
+
+
+def test_chart_endpoints_reuse_cached_figures():
+    from calc_cache import CALC_CACHE
+
+    with app.test_client() as c:
+        url = '/api/grafico/comparacion?monto=123457&años=7'
+        first = c.get(url)
+        hits = CALC_CACHE.stats()["by_function"]["grafico_comparacion_inversiones"].get("hits", 0)
+        second = c.get(url)
+        assert second.get_json() == first.get_json()
+        assert second.get_json()["data"]
+        stats = c.get('/debug/calc-cache').get_json()
+        assert stats["by_function"]["grafico_comparacion_inversiones"]["hits"] == hits + 1
+
+
+def test_logs_page_keeps_all_css_inside_one_style_block():
+    with app.test_client() as c:
+        html = c.get('/logs').get_data(as_text=True)
+        assert html.count('</style>') == 1
+        assert html.index('.pager button') < html.index('</style>')
+
+
+def test_calc_grid_never_emits_non_json_numbers():
+    with app.test_client() as c:
+        r = c.post('/api/calc/grid', json={"calculo": "cuota_prestamo",
+                                           "params": {"monto": 1000, "tasa_anual": [0, 12], "meses": [0, 12]}})
+        assert r.status_code == 200
+        body = r.get_data(as_text=True)
+        assert 'Infinity' not in body and 'NaN' not in body
+        j = json.loads(body)
+        cuotas = j["resultados"]["cuota_mensual"]
+        if j["orden"] == ["meses", "tasa_anual"]:
+            cuotas = [list(fila) for fila in zip(*cuotas)]
+        assert j["orden"] in (["tasa_anual", "meses"], ["meses", "tasa_anual"])
+        assert cuotas[0][0] is None and cuotas[1][0] is None
+        assert cuotas[0][1] == 83.33 and cuotas[1][1] == 88.85
+
+
+def test_extreme_compound_interest_inputs_do_not_fail():
+    with app.test_client() as c:
+        r = c.post('/api/chat', json={'message': 'cuanto ganaria si invierto 100000 por 1000 años al 100%'})
+        assert r.status_code == 200
+        assert 'Simulación de Inversión' in r.get_json()['reply']
+        r = c.get('/api/grafico/inversion?capital=100000&tasa=100&años=1000&aporte=0')
+        assert r.status_code == 200
+        assert b'Infinity' not in r.data and b'NaN' not in r.data
@@ -0,0 +1,104 @@
+import dataclasses
+
+import pytest
+
+from chatbot_core import ChatBot, INTENT_LEXICON, INTENT_MATCHER
+from intent_matcher import DeletionIndex, MultiPatternMatcher
+
+
+def test_scan_returns_overlapping_hits_with_positions_and_groups():
+    matcher = MultiPatternMatcher({
+        "deudas": ["cuota", "cuotas de"],
+        "calculadora": ["cuota", "plazo"],
+    })
+    hits = matcher.scan("tengo cuotas de plazo")
+    found = sorted((h.start, h.end, h.pattern) for h in hits.hits)
+    assert found == [(6, 11, "cuota"), (6, 15, "cuotas de"), (16, 21, "plazo")]
+    assert hits.matched("deudas") == {"cuota", "cuotas de"}
+    assert hits.matched("calculadora") == {"cuota", "plazo"}
+    assert hits.first_group(["ahorro", "calculadora", "deudas"]) == "calculadora"
+
+
+def test_scan_matches_naive_substring_search():
+    patterns = ["he", "she", "his", "hers", "s"]
+    matcher = MultiPatternMatcher({"g": patterns})
+    text = "ushers and his shells"
+    got = sorted((h.start, h.pattern) for h in matcher.scan(text).hits)
+    expected = sorted(
+        (i, p) for p in patterns for i in range(len(text)) if text.startswith(p, i)
+    )
+    assert got == expected
+
+
+def test_intent_matcher_groups_direct_map_priority():
+    hits = INTENT_MATCHER.scan("quiero invertir y ahorrar")
+    assert hits.has("direct:inversiones")
+    assert hits.has("direct:ahorro")
+    assert ChatBot().detect("quiero invertir y ahorrar") == "inversiones"
+
+
+def test_intent_lexicon_is_shared_normalized_and_read_only():
+    a, b = ChatBot(), ChatBot()
+    assert a.lexicon is b.lexicon is INTENT_LEXICON
+    assert 'keywords' not in vars(a)
+    # "podrías explicar" queda normalizado (y cuenta dos veces, como antes)
+    assert INTENT_LEXICON.keyword_weights['educacion']['podrias explicar'] == 2
+    with pytest.raises(TypeError):
+        INTENT_LEXICON.keywords['ahorro'] = ('x',)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        INTENT_LEXICON.scenarios = ()
+
+
+def test_deletion_index_finds_typos_within_bounded_distance():
+    index = DeletionIndex(["presupuesto", "ahorrar", "tarjeta"], max_deletes=2)
+    assert "presupuesto" in index.lookup("presupusto")
+    assert "ahorrar" in index.lookup("ahorarr")
+    assert "tarjeta" in index.lookup("tarjta")
+    assert index.lookup("hipoteca") == frozenset()
+
+
+def test_deletion_index_with_min_similarity_misses_nothing_the_scan_accepts():
+    import random
+    from difflib import SequenceMatcher
+
+    terms = sorted({kw for weights in INTENT_LEXICON.keyword_weights.values() for kw in weights})
+    index = DeletionIndex(terms, min_similarity=0.85)
+    rng = random.Random(3)
+    for _ in range(500):
+        word = list(rng.choice(terms))
+        for _ in range(rng.randint(1, 4)):
+            i = rng.randrange(len(word))
+            op = rng.random()
+            if op < 0.33:
+                word.insert(i, rng.choice("abcdefghijklmnopqrstuvwxyz"))
+            elif op < 0.66 and len(word) > 1:
+                del word[i]
+            else:
+                word[i] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        word = "".join(word)
+        scan = {t for t in terms if SequenceMatcher(None, word, t).ratio() > 0.85}
+        assert scan <= index.lookup(word), word
+
+
+@pytest.mark.parametrize("word,expected", [
+    ("inversiosnss", "inversiones"),   # 3 borrados del lado de la palabra
+    ("prxuesupuestio", "presupuesto"),
+    ("organueirzar", "presupuesto"),
+])
+def test_detect_multi_edit_typos_like_the_similarity_scan(word, expected):
+    assert ChatBot().detect(word) == expected
+
+
+def test_detect_fuzzy_keyword_keeps_similarity_threshold():
+    # "economizr" solo llega a "economizar" por similitud (> 0.85)
+    assert ChatBot().detect("quisiera economizr") == "ahorro"
+
+
+def test_very_long_tokens_skip_fuzzy_lookup():
+    import time
+
+    index = DeletionIndex(["presupuesto", "ahorrar"], max_deletes=2)
+    start = time.perf_counter()
+    assert index.lookup("a" * 2000) == frozenset()
+    assert ChatBot().detect("quiero " + "ahorrar" * 300) is not None
+    assert time.perf_counter() - start < 1.0
@@ -0,0 +1,84 @@
+import csv
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from chatbot_core import ChatBot, MessageContext, normalize_message
+from intent_model import IntentModel, featurize, load_labeled_rows, train
+
+TRAIN = [
+    ("quiero ahorrar para un viaje", "ahorro"),
+    ("necesito juntar plata", "ahorro"),
+    ("quiero invertir mi aguinaldo", "inversiones"),
+    ("donde invierto 100000", "inversiones"),
+    ("tengo una deuda con la tarjeta", "deudas"),
+    ("no puedo pagar el prestamo", "deudas"),
+]
+
+
+@pytest.fixture(scope="module")
+def model():
+    texts = [normalize_message(t) for t, _ in TRAIN] * 5
+    labels = [l for _, l in TRAIN] * 5
+    return train(texts, labels, epochs=60)
+
+
+def test_featurize_is_stable_and_normalized():
+    ids_a, vals_a = featurize("hola che")
+    ids_b, vals_b = featurize("hola che")
+    assert np.array_equal(ids_a, ids_b)
+    assert abs(float((vals_a ** 2).sum()) - 1.0) < 1e-6
+
+
+def test_training_rows_featurize_like_inference(tmp_path):
+    mensajes = ["quiero invertir 100 lucas", "Tengo una DEUDA de 2,5 luca", "¿Cuánto ahorro?"]
+    path = tmp_path / "chat_logs.csv"
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["user", "scenario"])
+        writer.writeheader()
+        writer.writerows({"user": m, "scenario": "inversiones"} for m in mensajes)
+
+    texts, _ = load_labeled_rows(path)
+    assert texts[0] == "quiero invertir 100000"
+    for text, mensaje in zip(texts, mensajes):
+        ids_train, vals_train = featurize(text)
+        ids_chat, vals_chat = featurize(MessageContext.from_text(mensaje).normalized)
+        assert np.array_equal(ids_train, ids_chat) and np.array_equal(vals_train, vals_chat)
+
+
+def test_model_learns_training_set(model):
+    for text, label in TRAIN:
+        scenario, confidence = model.predict(normalize_message(text))
+        assert scenario == label
+        assert 0 < confidence <= 1
+    assert abs(float(model.predict_proba("algo").sum()) - 1.0) < 1e-5
+
+
+def test_save_and_load_roundtrip(model, tmp_path):
+    path = tmp_path / "intent_model.npz"
+    model.save(path)
+    start = time.perf_counter()
+    loaded = IntentModel.load(path)
+    assert time.perf_counter() - start < 0.5
+    assert loaded.labels == model.labels
+    assert loaded.predict("quiero invertir") == model.predict("quiero invertir")
+
+
+def test_chatbot_uses_model_above_threshold_and_rules_below(model, monkeypatch):
+    monkeypatch.setattr(ChatBot, "intent_model", model)
+    bot = ChatBot()
+    monkeypatch.setattr(ChatBot, "intent_model_threshold", 0.0)
+    assert bot.detect("no puedo pagar el prestamo") == "deudas"
+    assert bot.detect("que es inflacion") in model.labels  # el modelo decide aunque no conozca la clase
+    monkeypatch.setattr(ChatBot, "intent_model_threshold", 1.01)
+    assert bot.detect("que es inflacion") == bot.detect_rules("que es inflacion") == "educacion"
+
+
+def test_model_is_skipped_while_waiting_for_conversation_data(model, monkeypatch):
+    monkeypatch.setattr(ChatBot, "intent_model", model)
+    monkeypatch.setattr(ChatBot, "intent_model_threshold", 0.0)
+    bot = ChatBot()
+    bot.conversation_state['waiting_for'] = 'presupuesto_monto'
+    assert bot.detect("50000") == bot.detect_rules("50000")
@@ -0,0 +1,157 @@
+import csv
+import threading
+from datetime import datetime
+
+import pytest
+
+import chatbot_core
+from interaction_log import AsyncLogWriter
+from log_store import SegmentedLogStore
+
+
+class GatedSink:
+    """Sink que retiene al hilo escritor hasta que el test lo libera."""
+
+    def __init__(self):
+        self.rows = []
+        self.batches = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, rows):
+        self.gate.wait(5)
+        self.rows.extend(rows)
+        self.batches += 1
+
+
+def test_rows_are_written_in_batches_after_flush():
+    sink = GatedSink()
+    writer = AsyncLogWriter(sink, max_queue=100, batch_size=10, flush_interval=5)
+    for i in range(25):
+        assert writer.submit([i])
+    assert writer.flush(timeout=5)
+    assert [r[0] for r in sink.rows] == list(range(25))
+    stats = writer.stats()
+    assert stats["written"] == 25 and stats["enqueued"] == 25 and stats["dropped"] == 0
+    assert stats["batches"] <= 4
+    assert stats["depth"] == 0
+
+
+def test_flush_interval_writes_without_explicit_flush():
+    sink = GatedSink()
+    writer = AsyncLogWriter(sink, batch_size=1000, flush_interval=0.05)
+    writer.submit(["a"])
+    deadline = threading.Event()
+    for _ in range(100):
+        if sink.rows:
+            break
+        deadline.wait(0.02)
+    assert sink.rows == [["a"]]
+
+
+def _fill(writer, sink, n):
+    # El primer submit arranca el hilo, que queda trabado en el sink
+    sink.gate.clear()
+    writer.submit(["first"])
+    for _ in range(100):
+        if writer.stats()["depth"] == 0:
+            break
+        threading.Event().wait(0.01)
+    return [writer.submit([i]) for i in range(n)]
+
+
+def test_drop_policy_discards_when_full():
+    sink = GatedSink()
+    writer = AsyncLogWriter(sink, max_queue=3, batch_size=1, flush_interval=0, overflow="drop")
+    accepted = _fill(writer, sink, 10)
+    assert accepted.count(True) == 3
+    stats = writer.stats()
+    assert stats["dropped"] == 7 and stats["max_depth"] == 3
+    sink.gate.set()
+    writer.flush(timeout=5)
+    assert len(sink.rows) == 4
+
+
+def test_sample_policy_keeps_one_in_n():
+    sink = GatedSink()
+    writer = AsyncLogWriter(sink, max_queue=2, batch_size=1, flush_interval=0,
+                            overflow="sample", sample_every=3)
+    assert _fill(writer, sink, 2) == [True, True]
+    # Cola llena: de cada 3 filas de desborde se descartan 2 y la tercera espera lugar
+    assert writer.submit(["drop 1"]) is False
+    assert writer.submit(["drop 2"]) is False
+    kept = threading.Thread(target=writer.submit, args=(["keep"],))
+    kept.start()
+    sink.gate.set()
+    kept.join(5)
+    assert writer.flush(timeout=5)
+    assert writer.stats()["dropped"] == 2
+    assert [r[0] for r in sink.rows] == ["first", 0, 1, "keep"]
+
+
+def test_flush_with_full_queue_honors_timeout():
+    import time
+
+    sink = GatedSink()
+    writer = AsyncLogWriter(sink, max_queue=3, batch_size=1, flush_interval=0, overflow="drop")
+    _fill(writer, sink, 3)
+    start = time.monotonic()
+    assert writer.flush(timeout=0.2) is False  # no hay lugar ni para la marca de flush
+    assert time.monotonic() - start < 1
+    sink.gate.set()
+    assert writer.flush(timeout=5)
+
+
+def test_failed_batches_are_retried_then_reported(capsys):
+    calls = []
+
+    def flaky(rows):
+        calls.append(list(rows))
+        if len(calls) < 3:
+            raise OSError("disco lleno")
+
+    writer = AsyncLogWriter(flaky, batch_size=10, flush_interval=5, write_attempts=3, retry_delay=0)
+    writer.submit(["a"])
+    assert writer.flush(timeout=5)
+    stats = writer.stats()
+    assert (stats["written"], stats["retries"], stats["lost"]) == (1, 2, 0)
+
+    def broken(rows):
+        raise OSError("disco roto")
+
+    writer = AsyncLogWriter(broken, batch_size=10, flush_interval=5, write_attempts=2, retry_delay=0)
+    writer.submit(["a"])
+    writer.submit(["b"])
+    assert writer.flush(timeout=5)
+    stats = writer.stats()
+    assert (stats["written"], stats["write_errors"], stats["lost"]) == (0, 2, 2)
+    assert "Se descartan 2 filas" in capsys.readouterr().out
+
+
+def test_unknown_overflow_policy_is_rejected():
+    with pytest.raises(ValueError):
+        AsyncLogWriter(lambda rows: None, overflow="spill")
+
+
+def test_log_interaction_only_enqueues(tmp_path, monkeypatch):
+    chatbot_core.flush_interaction_log(timeout=5)  # filas de otros tests, al almacén real
+    store = SegmentedLogStore(tmp_path / "chat_logs")
+    monkeypatch.setattr(chatbot_core, "LOG_STORE", store)
+    monkeypatch.setattr(chatbot_core, "LOG_ASYNC", True)
+    for i in range(3):
+        chatbot_core.log_interaction(datetime(2024, 1, 1, 12, 0), "general", f"hola {i}", "respuesta")
+    assert chatbot_core.flush_interaction_log(timeout=5)
+    rows = list(store.between())
+    assert [r["user"] for r in rows] == ["hola 0", "hola 1", "hola 2"]
+    assert rows[0]["timestamp"] == "2024-01-01T12:00:00"
+
+
+def test_csv_format_keeps_single_file(tmp_path, monkeypatch):
+    log_path = tmp_path / "chat_logs.csv"
+    monkeypatch.setattr(chatbot_core, "LOG_PATH", log_path)
+    monkeypatch.setattr(chatbot_core, "LOG_FORMAT", "csv")
+    monkeypatch.setattr(chatbot_core, "LOG_ASYNC", False)
+    chatbot_core.log_interaction(datetime(2024, 1, 1, 12, 0), "ahorro", "quiero ahorrar", "dale")
+    with log_path.open(encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]["scenario"] == "ahorro" and rows[0]["user"] == "quiero ahorrar"
@@ -0,0 +1,72 @@
+import json
+
+from log_aggregates import LogAggregates
+
+
+def _row(ts, scenario="ahorro", sentiment="neutral", emotion="none"):
+    return [ts, scenario, sentiment, emotion, "hola", "respuesta"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_observe_counts_each_dimension(tmp_path):
+    agg = LogAggregates(tmp_path / "aggregates.json", checkpoint_interval=60)
+    agg.observe([_row("2024-05-01T09:10:00"), _row("2024-05-01T21:00:00", "ayuda", "negativo", "frustrado")])
+    snap = agg.snapshot()
+    assert snap["rows"] == 2
+    assert snap["scenarios"] == {"ahorro": 1, "ayuda": 1}
+    assert snap["sentiments"] == {"negativo": 1, "neutral": 1}
+    assert snap["emotions"] == {"frustrado": 1, "none": 1}
+    assert snap["hours"] == {"09": 1, "21": 1}
+    assert snap["unclassified"] == 1
+
+
+def test_checkpoint_is_periodic_and_survives_restart(tmp_path):
+    path = tmp_path / "aggregates.json"
+    clock = FakeClock()
+    agg = LogAggregates(path, checkpoint_interval=30, clock=clock)
+    agg.observe([_row("2024-05-01T10:00:00")])
+    assert not path.exists()
+    clock.now = 31
+    agg.observe([_row("2024-05-01T10:01:00")])
+    assert json.loads(path.read_text(encoding="utf-8"))["rows"] == 2
+    assert LogAggregates(path).snapshot()["rows"] == 2
+
+
+def test_processes_merge_their_pending_counts(tmp_path):
+    path = tmp_path / "aggregates.json"
+    worker_a = LogAggregates(path, checkpoint_interval=60)
+    worker_b = LogAggregates(path, checkpoint_interval=60)
+    worker_a.observe([_row("2024-05-01T10:00:00", "deudas")])
+    worker_b.observe([_row("2024-05-01T10:00:00", "ahorro"), _row("2024-05-01T11:00:00", "ahorro")])
+    worker_a.checkpoint()
+    worker_b.checkpoint()
+    assert worker_a.snapshot()["scenarios"] == {"ahorro": 2, "deudas": 1}
+    assert worker_b.snapshot()["rows"] == 3
+
+
+def test_rebuild_replaces_counts_and_drops_stale_pending(tmp_path):
+    path = tmp_path / "aggregates.json"
+    live = LogAggregates(path, checkpoint_interval=60)
+    live.observe([_row("2024-05-01T10:00:00")])
+    live.checkpoint()
+    live.observe([_row("2024-05-01T10:05:00")])  # ya escrita en el log crudo
+
+    raw = [dict(zip(("timestamp", "scenario", "sentiment", "emotion", "user", "bot"), _row(f"2024-05-01T1{i}:00:00", "deudas")))
+           for i in range(3)]
+    assert LogAggregates(path).rebuild(raw) == 3
+    live.checkpoint()
+    assert live.snapshot()["scenarios"] == {"deudas": 3}
+
+
+def test_missing_checkpoint_is_rebuilt_from_source(tmp_path):
+    rows = [{"timestamp": "2024-05-01T08:00:00", "scenario": "presupuesto", "sentiment": "positivo", "emotion": "none"}]
+    agg = LogAggregates(tmp_path / "aggregates.json", source=lambda: rows)
+    assert agg.snapshot()["scenarios"] == {"presupuesto": 1}
+    assert (tmp_path / "aggregates.json").exists()
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from log_store import SegmentedLogStore, newest_page, read_logs, reverse_csv_records
+
+
+def _row(ts, scenario="general", sentiment="neutral", user="hola"):
+    return [ts, scenario, sentiment, "none", user, "respuesta"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SegmentedLogStore(tmp_path / "chat_logs", index_every=4)
+
+
+def test_rows_go_to_daily_segments_with_sidecar_index(store):
+    store.append([_row("2024-05-01T10:00:00"), _row("2024-05-02T09:00:00", "ahorro")])
+    assert store.days() == ["2024-05-01", "2024-05-02"]
+    index = json.loads((store.root / "2024-05-02.idx.json").read_text(encoding="utf-8"))
+    assert index["rows"] == 1 and index["scenarios"] == {"ahorro": 1}
+    assert index["blocks"][0]["offset"] == 0
+
+
+def test_tail_returns_newest_first_across_segments(store):
+    store.append([_row(f"2024-05-01T10:{m:02d}:00", user=f"a{m}") for m in range(10)])
+    store.append([_row(f"2024-05-02T10:{m:02d}:00", user=f"b{m}") for m in range(3)])
+    assert [r["user"] for r in store.tail(5)] == ["b2", "b1", "b0", "a9", "a8"]
+
+
+def test_tail_with_scenario_reads_only_matching_blocks(store, monkeypatch):
+    rows = [_row(f"2024-05-01T10:{m:02d}:00") for m in range(20)]
+    rows[2] = _row("2024-05-01T10:02:00", "ayuda", user="socorro")
+    store.append(rows)
+    read = []
+    original = store._read_block
+    monkeypatch.setattr(store, "_read_block", lambda day, index, i: read.append(i) or original(day, index, i))
+    assert [r["user"] for r in store.tail(5, scenario="ayuda")] == ["socorro"]
+    assert read == [0]
+    assert store.tail(5, scenario="deudas") == []
+
+
+def test_between_filters_by_time_and_sentiment(store):
+    store.append([_row(f"2024-05-0{d}T12:00:00", sentiment="positivo" if d % 2 else "negativo") for d in range(1, 8)])
+    got = list(store.between("2024-05-02", "2024-05-05T23:59:59"))
+    assert [r["timestamp"][:10] for r in got] == ["2024-05-02", "2024-05-03", "2024-05-04", "2024-05-05"]
+    assert [r["timestamp"][:10] for r in store.between("2024-05-04", sentiment="positivo")] == ["2024-05-05", "2024-05-07"]
+
+
+def test_counts_come_from_indexes(store):
+    store.append([_row("2024-05-01T10:00:00", "ahorro"), _row("2024-05-01T11:00:00", "ahorro", "positivo"),
+                  _row("2024-05-02T10:00:00", "deudas")])
+    counts = store.counts()
+    assert counts["rows"] == 3 and counts["segments"] == 2
+    assert counts["scenarios"] == {"ahorro": 2, "deudas": 1}
+    assert counts["sentiments"] == {"neutral": 2, "positivo": 1}
+
+
+def test_index_catches_up_with_appends_from_another_process(store):
+    store.append([_row("2024-05-01T10:00:00", user="uno")])
+    other = SegmentedLogStore(store.root, index_every=4)
+    other.append([_row("2024-05-01T10:05:00", user="dos")])
+    assert [r["user"] for r in store.tail(2)] == ["dos", "uno"]
+    store.append([_row("2024-05-01T10:10:00", user="tres")])
+    assert len(SegmentedLogStore(store.root)) == 3
+
+
+def test_missing_or_stale_index_is_rebuilt(store):
+    store.append([_row(f"2024-05-01T10:{m:02d}:00") for m in range(6)])
+    (store.root / "2024-05-01.idx.json").unlink()
+    with (store.root / "2024-05-01.jsonl").open("a", encoding="utf-8") as f:
+        f.write(json.dumps(dict(zip(("timestamp", "scenario", "sentiment", "emotion", "user", "bot"),
+                                    _row("2024-05-01T11:00:00", "ayuda")))) + "\n")
+        f.write('{"timestamp": "2024-05-01T11:0')  # línea a medio escribir
+    fresh = SegmentedLogStore(store.root, index_every=4)
+    assert len(fresh) == 7
+    assert fresh.tail(1)[0]["scenario"] == "ayuda"
+    assert fresh.reindex() == 7
+
+
+def test_read_logs_accepts_directory_or_csv(store, tmp_path):
+    store.append([_row("2024-05-01T10:00:00", user="seg")])
+    csv_path = tmp_path / "chat_logs.csv"
+    csv_path.write_text("timestamp,scenario,sentiment,emotion,user,bot\n2024-05-01T10:00:00,ahorro,neutral,none,csv,ok\n",
+                        encoding="utf-8")
+    assert [r["user"] for r in read_logs(store.root)] == ["seg"]
+    assert [r["user"] for r in read_logs(csv_path)] == ["csv"]
+
+
+def test_reverse_csv_reader_handles_multiline_quoted_replies(tmp_path):
+    import csv
+
+    path = tmp_path / "chat_logs.csv"
+    rows = [[f"2024-05-01T10:{i:02d}:00", "ahorro", "neutral", "none", f'dijo "hola" {i}',
+             f"línea 1\nlínea 2, con coma {i}" if i % 2 else f"ok {i}"] for i in range(50)]
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "scenario", "sentiment", "emotion", "user", "bot"])
+        writer.writerows(rows)
+    with path.open(newline="", encoding="utf-8") as f:
+        expected = list(csv.DictReader(f))[::-1]
+    for chunk_size in (16, 1 << 16):
+        assert list(reverse_csv_records(path, chunk_size=chunk_size)) == expected
+
+    page = newest_page(path, page=4, per_page=3, q='HOLA" 4')
+    assert [r["user"] for r in page["rows"]] == ['dijo "hola" 40', 'dijo "hola" 4']
+    assert page["has_more"] is False
@@ -0,0 +1,31 @@
+from chatbot_core import ChatBot, MessageContext
+
+
+def test_context_derives_lucas_normalized_tokens_and_numbers():
+    ctx = MessageContext.from_text("Quiero ahorrar 50 lucas en 6 meses para el Viaje")
+    assert ctx.text == "Quiero ahorrar 50000 en 6 meses para el Viaje"
+    assert ctx.normalized == "quiero ahorrar 50000 en 6 meses para el viaje"
+    assert "el" in ctx.tokens and "el" not in ctx.content_tokens
+    assert ctx.numbers == [50000.0, 6.0]
+    assert MessageContext.of(ctx) is ctx
+
+
+def test_entities_are_memoized_on_the_turn():
+    ctx = MessageContext.from_text("debo $1.500.000 y pago 20000 por mes")
+    assert ctx.entities is ctx.entities
+    assert ctx.numbers == [1500000.0, 20000.0]
+
+
+def test_process_reports_per_stage_timings():
+    res = ChatBot().process("presupuesto con $50000")
+    assert res.scenario == "presupuesto"
+    assert set(res.timings) == {"context", "sentiment", "detect", "handler"}
+    assert all(v >= 0 for v in res.timings.values())
+
+
+def test_consumers_accept_plain_text_or_context():
+    bot = ChatBot()
+    text = "tengo una deuda de 100000 con la tarjeta"
+    ctx = MessageContext.from_text(text)
+    assert bot.detect(text) == bot.detect(ctx) == "deudas"
+    assert bot.analyze_sentiment(text) == bot.analyze_sentiment(ctx)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import montecarlo
+from calculators import calcular_interes_compuesto
+from montecarlo import jubilacion_montecarlo, simular_montecarlo
+
+
+def test_same_seed_same_result_and_bands_are_ordered():
+    a = simular_montecarlo(10_000, 500, 120, caminos=3_000, semilla=42, objetivo=150_000)
+    b = simular_montecarlo(10_000, 500, 120, caminos=3_000, semilla=42, objetivo=150_000)
+    assert a["final"] == b["final"] and a["prob_objetivo"] == b["prob_objetivo"]
+    bandas = a["bandas"]
+    assert bandas["mes"][-1] == 120 and len(bandas["mes"]) <= montecarlo.MONTECARLO_PUNTOS_BANDA
+    assert (bandas["p10"] <= bandas["p50"]).all() and (bandas["p50"] <= bandas["p90"]).all()
+    assert 0 < a["prob_objetivo"] < 1
+    assert simular_montecarlo(10_000, 500, 120, caminos=3_000, semilla=43)["final"] != a["final"]
+
+
+def test_zero_volatility_matches_deterministic_calculator():
+    r = simular_montecarlo(25_000, 1_000, 96, rendimiento_anual=18, volatilidad_anual=0, caminos=10, semilla=1)
+    esperado = calcular_interes_compuesto(25_000, 18, 8, 1_000)["monto_final"]
+    assert r["final"]["p10"] == pytest.approx(esperado, abs=0.01)
+    assert r["final"]["p90"] == pytest.approx(esperado, abs=0.01)
+
+
+def test_median_tracks_expected_growth_and_inflation_deflates():
+    r = simular_montecarlo(100_000, 0, 120, rendimiento_anual=12, volatilidad_anual=15,
+                           inflacion_anual=12, caminos=20_000, semilla=7)
+    esperado = calcular_interes_compuesto(100_000, 12, 10)["monto_final"]
+    assert r["final"]["media"] == pytest.approx(esperado, rel=0.03)
+    # Con inflación igual al rendimiento, en pesos de hoy queda cerca del capital
+    assert r["final_real"]["media"] == pytest.approx(100_000, rel=0.03)
+
+
+def test_pool_gives_the_same_answer_as_serial(monkeypatch):
+    monkeypatch.setattr(montecarlo, "MONTECARLO_POOL_MIN", 0)
+    monkeypatch.setattr(montecarlo, "MONTECARLO_BLOQUE", 500)
+    serie = simular_montecarlo(0, 100, 60, caminos=2_000, semilla=5, procesos=1)
+    pool = simular_montecarlo(0, 100, 60, caminos=2_000, semilla=5, procesos=2)
+    assert pool["caminos"] == 2_000
+    np.testing.assert_array_equal(pool["bandas"]["p50"], serie["bandas"]["p50"])
+
+
+def test_time_budget_truncates_or_times_out(monkeypatch):
+    monkeypatch.setattr(montecarlo, "MONTECARLO_BLOQUE", 100)
+    reloj = iter(range(100))  # cada consulta al reloj avanza un segundo
+    monkeypatch.setattr(montecarlo.time, "monotonic", lambda: next(reloj))
+    r = simular_montecarlo(0, 100, 12, caminos=1_000, semilla=1, presupuesto_s=3.5, procesos=1)
+    assert r["truncado"] and 0 < r["caminos"] < 1_000
+    with pytest.raises(TimeoutError):
+        simular_montecarlo(0, 100, 12, caminos=1_000, semilla=1, presupuesto_s=0, procesos=1)
+
+
+def test_jubilacion_montecarlo_validates_ages():
+    assert "error" in jubilacion_montecarlo(70, 65, 1_000)
+    r = jubilacion_montecarlo(60, 65, 1_000, caminos=500, semilla=2)
+    assert r["meses"] == 60 and r["total_aportado"] == 60_000
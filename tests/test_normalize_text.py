@@ -0,0 +1,50 @@
+import re
+import unicodedata
+
+import pytest
+
+from chatbot_core import _normalize, normalize_text
+
+
+def legacy_normalize(text: str) -> str:
+    """Implementación original (NFD + categoría por carácter + re.sub)."""
+    text = text.lower().replace('_', ' ').replace('-', ' ')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+@pytest.mark.parametrize("texto,esperado", [
+    ("Inversión", "inversion"),
+    ("quiero_ahorrar", "quiero ahorrar"),
+    ("plazo-fijo", "plazo fijo"),
+    ("DÓLAR", "dolar"),
+    ("Año", "ano"),
+    ("casa   auto", "casa auto"),
+    ("Ñoño", "nono"),
+    ("café", "cafe"),
+    ("CRÉDITO", "credito"),
+    ("Educación_Financiera", "educacion financiera"),
+])
+def test_casos_de_normalizacion(texto, esperado):
+    assert normalize_text(texto) == esperado
+
+
+@pytest.mark.parametrize("texto", [
+    "  dale  ",
+    "¿Cuánto ganaría si invierto\ten un año?",
+    "dale 👍 quiero ahorrar ✈️",
+    "cafe\u0301 con pin\u0303a",         # marcas combinantes sueltas
+    "\u0130stanbul \u01c5emal",           # minúsculas que cambian de largo
+    "a\U0001D16D\U0001D165\u0301",        # marcas que NFD reordena
+    "separado por espacios\x1f",
+])
+def test_identico_a_la_implementacion_original(texto):
+    assert normalize_text(texto) == legacy_normalize(texto)
+    assert _normalize(texto * 3) == legacy_normalize(texto * 3)
+
+
+def test_identico_para_todo_el_rango_latino():
+    for code in range(0x80, 0x370):
+        texto = f"a{chr(code)}b {chr(code)}"
+        assert normalize_text(texto) == legacy_normalize(texto), hex(code)
@@ -0,0 +1,135 @@
+import time
+
+import pytest
+
+from database import PROFILE_CACHE, flush_profiles, get_or_create_user, get_user, invalidate_user, update_user_fields
+from profile_cache import ProfileCache, UserProfile
+
+
+class FakeDB:
+    def __init__(self, rows=None, fail=False):
+        self.rows = dict(rows or {})
+        self.loads = 0
+        self.batches = []
+        self.fail = fail
+
+    def load(self, phone):
+        self.loads += 1
+        row = self.rows.get(phone)
+        return UserProfile(**row) if row else None
+
+    def write(self, batch):
+        if self.fail:
+            raise OSError("disco lleno")
+        self.batches.append(batch)
+        for profile, columns in batch:
+            row = self.rows.setdefault(profile.phone, {"phone": profile.phone})
+            row.update({c: getattr(profile, c) for c in columns})
+
+
+def make_cache(db, **kwargs):
+    kwargs.setdefault("flush_interval", 3600)  # sin flush periódico durante el test
+    return ProfileCache(db.load, db.write, **kwargs)
+
+
+def test_cached_reads_do_not_touch_db_including_missing_users():
+    db = FakeDB({"a": {"phone": "a", "monthly_income": 100.0}})
+    cache = make_cache(db)
+    for _ in range(3):
+        assert cache.get("a").monthly_income == 100.0
+        assert cache.get("nadie") is None
+    assert db.loads == 2
+    stats = cache.stats()
+    assert stats["hits"] == 4 and stats["misses"] == 2
+    assert stats["hit_ratio"] == round(4 / 6, 4)
+
+
+def test_updates_are_batched_until_flush():
+    db = FakeDB({"a": {"phone": "a"}})
+    cache = make_cache(db)
+    cache.update("a", monthly_income=1.0)
+    cache.update("a", total_debt=2.0)
+    cache.update("b", savings_goal=3.0)  # usuario nuevo
+    assert db.batches == [] and cache.stats()["dirty"] == 2
+
+    assert cache.flush() == 2
+    assert len(db.batches) == 1
+    written = {p.phone: set(cols) for p, cols in db.batches[0]}
+    assert written["a"] == {"monthly_income", "total_debt"}
+    assert "created_at" in written["b"]  # alta completa
+    assert db.rows["b"]["savings_goal"] == 3.0
+    assert cache.flush() == 0
+
+
+def test_size_trigger_wakes_background_flush():
+    db = FakeDB()
+    cache = make_cache(db, max_dirty=2)
+    cache.update("a", monthly_income=1.0)
+    cache.update("b", monthly_income=2.0)
+    deadline = time.time() + 5
+    while cache.stats()["flushes"] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(db.batches) == 1 and len(db.batches[0]) == 2
+    assert cache.stats()["flush_latency"]["count"] == 1
+
+
+def test_write_through_mode():
+    db = FakeDB()
+    cache = make_cache(db, flush_interval=0)
+    cache.update("a", monthly_income=1.0)
+    assert db.rows["a"]["monthly_income"] == 1.0
+    assert cache.stats()["flushes"] == 1
+
+
+def test_evicted_dirty_entry_is_not_lost():
+    db = FakeDB()
+    cache = make_cache(db, max_entries=1)
+    cache.update("a", monthly_income=1.0)
+    cache.get("b")  # expulsa "a" antes del flush
+    assert cache.get("a").monthly_income == 1.0
+    cache.flush()
+    assert db.rows["a"]["monthly_income"] == 1.0
+
+
+def test_failed_flush_keeps_changes_for_retry():
+    db = FakeDB(fail=True)
+    cache = make_cache(db)
+    cache.update("a", monthly_income=1.0)
+    with pytest.raises(OSError):
+        cache.flush()
+    assert cache.stats()["dirty"] == 1 and cache.stats()["flush_errors"] == 1
+    db.fail = False
+    assert cache.flush() == 1
+    assert db.rows["a"]["monthly_income"] == 1.0
+
+
+def test_invalidate_rereads_from_db():
+    db = FakeDB({"a": {"phone": "a", "name": "Ana"}})
+    cache = make_cache(db)
+    assert cache.get("a").name == "Ana"
+    db.rows["a"]["name"] = "Ana María"  # escrito por fuera del caché
+    cache.invalidate("a")
+    assert cache.get("a").name == "Ana María"
+
+
+def test_ttl_rereads_clean_entries_but_keeps_dirty_ones():
+    db = FakeDB({"a": {"phone": "a", "name": "Ana"}})
+    cache = make_cache(db, ttl=0.01)
+    cache.get("a")
+    cache.update("b", name="Beto")
+    db.rows["a"]["name"] = "Ana María"
+    time.sleep(0.02)
+    assert cache.get("a").name == "Ana María"
+    assert cache.get("b").name == "Beto" and db.loads == 3  # a, b (alta) y a otra vez
+
+
+def test_database_helpers_write_behind_round_trip():
+    phone = "test_profile_cache_db"
+    get_or_create_user(phone, name="Pepe")
+    update_user_fields(phone, monthly_income=250000, unknown=1)
+    assert get_user(phone).monthly_income == 250000
+    flush_profiles()
+    invalidate_user(phone)  # forzar lectura desde la DB
+    user = get_user(phone)
+    assert (user.name, user.monthly_income) == ("Pepe", 250000)
+    assert PROFILE_CACHE.stats()["dirty"] == 0
@@ -0,0 +1,47 @@
+import pytest
+
+from chatbot_core import ChatBot, EMOTION_KEYWORDS
+from intent_matcher import LiteralSetMatcher, MultiPatternMatcher
+
+
+def test_score_sentiment_exposes_every_emotion():
+    scores = ChatBot().score_sentiment("Estoy preocupado y nervioso, no me alcanza y estoy agobiado")
+    assert set(scores.emotions) == set(EMOTION_KEYWORDS)
+    assert scores.emotions["preocupado"] == 3  # preocupado, preocupa, nervioso
+    assert scores.emotions["estresado"] == 1
+    assert scores.emotion == "preocupado"
+    assert scores.sentiment == "negativo"
+    # palabras negativas (preocupado, agobiado) + bonus por estrés financiero
+    assert scores.negative == 4
+    with pytest.raises(TypeError):
+        scores.emotions["preocupado"] = 0
+
+
+def test_emotion_ties_keep_declaration_order():
+    # "quiero" (motivado) y "meta" (esperanzado) empatan: gana la primera declarada
+    scores = ChatBot().score_sentiment("quiero una meta")
+    assert scores.emotions["motivado"] == scores.emotions["esperanzado"] == 1
+    assert scores.emotion == "motivado"
+
+
+def test_analyze_sentiment_matches_scores():
+    bot = ChatBot()
+    text = "quiero aprender a organizar mi plata"
+    scores = bot.score_sentiment(text)
+    assert bot.analyze_sentiment(text) == (scores.sentiment, scores.emotion) == ("positivo", "motivado")
+
+
+def test_process_returns_emotion_scores():
+    res = ChatBot().process("estoy estresado con las deudas")
+    assert res.emotion == "estresado"
+    assert res.emotion_scores["estresado"] == 1
+
+
+def test_literal_set_matcher_agrees_with_automaton():
+    lexicons = {"a": ["no puedo", "no puedo más", "puedo"], "b": ["preocupa", "preocupado", "más"]}
+    text = "me preocupado que no puedo más"
+    literal = LiteralSetMatcher(lexicons)
+    automaton = MultiPatternMatcher(lexicons)
+    for group in lexicons:
+        assert literal.scan(text).matched(group) == automaton.scan(text).matched(group)
+    assert literal.count(text) == {"a": 3, "b": 3}
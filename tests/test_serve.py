@@ -0,0 +1,20 @@
+from serve import settings_from_env
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("WEB_BIND", "127.0.0.1:8000")
+    monkeypatch.setenv("WEB_WORKERS", "3")
+    monkeypatch.setenv("WEB_THREADS", "0")
+    monkeypatch.setenv("WEB_KEEPALIVE", "15")
+    monkeypatch.setenv("WEB_PRELOAD", "0")
+    settings = settings_from_env()
+    assert settings["bind"] == "127.0.0.1:8000"
+    assert settings["workers"] == 3
+    assert settings["threads"] == 1  # mínimo un thread por worker
+    assert settings["keepalive"] == 15
+    assert settings["preload_app"] is False
+
+
+def test_default_workers_are_capped(monkeypatch):
+    monkeypatch.delenv("WEB_WORKERS", raising=False)
+    assert 1 <= settings_from_env()["workers"] <= 2
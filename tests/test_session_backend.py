@@ -0,0 +1,153 @@
+import json
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from chatbot_core import ChatBot
+from session_backend import LocalRedis, MemoryBackend, RedisBackend, SQLiteBackend
+from session_store import SessionStore
+
+FLOW = ["quiero ahorrar para un auto", "500000", "12 meses"]
+
+
+def test_export_state_is_compact_json_and_round_trips():
+    bot = ChatBot()
+    bot.user_phone = None  # sin perfil en DB que pre-cargue user_data
+    bot.process(FLOW[0])
+    state = bot.export_state()
+    assert json.loads(json.dumps(state)) == state
+    assert state["waiting"] == "ahorro_monto" and state["turns"] == 1
+    assert "data" not in state  # los campos vacíos no se exportan
+
+    clone = ChatBot.from_state(state, user_phone="otro")
+    assert clone.conversation_state == bot.conversation_state
+    assert clone.last_scenario == bot.last_scenario
+    assert clone.user_phone == "otro"
+
+    clone.conversation_state["partial_data"]["x"] = 1
+    assert "x" not in bot.conversation_state["partial_data"]
+
+
+def test_imported_state_continues_conversation_like_original():
+    original, restored = ChatBot(), ChatBot()
+    original.process(FLOW[0])
+    restored.import_state(original.export_state())
+    for text in FLOW[1:]:
+        a, b = original.process(text), restored.process(text)
+        assert (a.scenario, a.reply) == (b.scenario, b.reply)
+    assert original.export_state() == restored.export_state()
+
+
+def test_import_rejects_unknown_version():
+    with pytest.raises(ValueError):
+        ChatBot().import_state({"v": 99})
+
+
+@pytest.mark.parametrize("make_backend", [
+    MemoryBackend,
+    SQLiteBackend,
+    lambda: RedisBackend(LocalRedis(), prefix="test:"),
+], ids=["memory", "sqlite", "redis"])
+def test_backends_round_trip(make_backend):
+    backend = make_backend()
+    uid = "test_backend_roundtrip"
+    state = {"v": 1, "turns": 2, "waiting": "ahorro_plazo", "partial": {"meta": "🚗 Auto", "monto": 5e5}}
+    backend.save(uid, state)
+    assert backend.load(uid) == state
+    state["turns"] = 3
+    backend.save(uid, state)
+    assert backend.load(uid)["turns"] == 3
+    backend.delete(uid)
+    assert backend.load(uid) is None
+
+
+def test_memory_backend_is_bounded():
+    backend = MemoryBackend(max_entries=2)
+    for uid in "abc":
+        backend.save(uid, {"v": 1, "turns": 0})
+    assert len(backend) == 2 and backend.load("a") is None
+
+
+def test_local_redis_expires_keys():
+    client = LocalRedis()
+    client.set("k", "v", ex=-1)
+    assert client.get("k") is None
+    client.set("k", "v")
+    assert client.get("k") == b"v" and client.exists("k") == 1
+
+
+def test_workers_share_conversation_through_sqlite_backend():
+    """Dos almacenes (como dos workers) alternan turnos del mismo uid."""
+    backend = SQLiteBackend()
+    uid = "test_shared_worker"
+    backend.delete(uid)
+
+    def restore(key):
+        state = backend.load(key)
+        return ChatBot.from_state(state, user_phone=key) if state else None
+
+    workers = [SessionStore(lambda key: ChatBot(), restore=restore) for _ in range(2)]
+    replies = []
+    for i, text in enumerate(FLOW):
+        bot = workers[i % 2].get(uid)
+        state = backend.load(uid)
+        if state:
+            bot.import_state(state)
+        replies.append(bot.process(text).reply)
+        backend.save(uid, bot.export_state())
+
+    reference = ChatBot()
+    assert replies == [reference.process(text).reply for text in FLOW]
+    backend.delete(uid)
+
+
+def _hold_lock(lock_dir, uid, acquired, release):
+    with SQLiteBackend(lock_dir=lock_dir).lock(uid):
+        acquired.set()
+        release.wait(5)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="requiere fork")
+def test_sqlite_lock_excludes_other_processes(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    acquired, release = ctx.Event(), ctx.Event()
+    worker = ctx.Process(target=_hold_lock, args=(tmp_path, "uid-1", acquired, release))
+    worker.start()
+    try:
+        assert acquired.wait(5)
+        got = threading.Event()
+
+        def take():
+            with SQLiteBackend(lock_dir=tmp_path).lock("uid-1"):
+                got.set()
+
+        waiter = threading.Thread(target=take)
+        waiter.start()
+        assert not got.wait(0.3)  # el otro proceso tiene el turno
+        release.set()
+        assert got.wait(5)
+        waiter.join()
+    finally:
+        release.set()
+        worker.join(5)
+
+
+def test_redis_lock_is_exclusive_and_released():
+    backend = RedisBackend(LocalRedis(), prefix="test:")
+    order = []
+
+    def turn(name):
+        with backend.lock("uid-1"):
+            order.append(name + ":in")
+            time.sleep(0.05)
+            order.append(name + ":out")
+
+    threads = [threading.Thread(target=turn, args=(n,)) for n in "ab"]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [o.split(":")[1] for o in order] == ["in", "out", "in", "out"]
+    assert backend.client.exists("test:lock:uid-1") == 0
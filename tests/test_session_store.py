@@ -0,0 +1,139 @@
+import threading
+import time
+
+from chatbot_core import ChatBot
+from session_store import SessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def new_bot(uid):
+    bot = ChatBot()
+    bot.user_phone = uid
+    return bot
+
+
+def test_lru_eviction_keeps_recently_used_sessions():
+    store = SessionStore(new_bot, max_sessions=2)
+    a = store.get("a")
+    store.get("b")
+    assert store.get("a") is a  # "a" pasa a ser la más reciente
+    store.get("c")
+    assert "a" in store and "c" in store and "b" not in store
+    stats = store.stats()
+    assert stats["evicted_lru"] == 1
+    assert stats["hits"] == 1 and stats["misses"] == 3
+
+
+def test_idle_ttl_expires_sessions_and_persists_them():
+    clock = FakeClock()
+    persisted = []
+    store = SessionStore(new_bot, idle_ttl=60, clock=clock,
+                         persist=lambda uid, bot: persisted.append(uid))
+    store.get("a")
+    clock.now = 30
+    store.get("b")
+    clock.now = 70
+    store.get("b")
+    assert "a" not in store and "b" in store
+    assert persisted == ["a"]
+    assert store.stats()["expired"] == 1
+
+
+def test_memory_cap_evicts_oldest_sessions():
+    store = SessionStore(new_bot, max_bytes=250, size_of=lambda bot: 100)
+    for uid in "abcd":
+        store.get(uid)
+    assert len(store) == 2
+    assert store.stats()["evicted_memory"] == 2
+    assert store.stats()["estimated_bytes"] == 200
+
+
+def test_restore_rehydrates_evicted_session():
+    saved = {}
+
+    def persist(uid, bot):
+        saved[uid] = dict(bot.user_data)
+
+    def restore(uid):
+        if uid not in saved:
+            return None
+        bot = new_bot(uid)
+        bot.user_data.update(saved[uid])
+        return bot
+
+    store = SessionStore(new_bot, max_sessions=1, persist=persist, restore=restore)
+    store.get("a").user_data["ingreso"] = 1000
+    store.get("b")
+    assert "a" not in store
+    assert store.get("a").user_data == {"ingreso": 1000}
+    assert store.stats()["restored"] == 1
+
+
+def test_failed_persist_is_counted_and_reported(capsys):
+    def persist(uid, bot):
+        raise OSError("db bloqueada")
+
+    store = SessionStore(new_bot, max_sessions=1, persist=persist)
+    store.get("a")
+    store.get("b")
+    assert "a" not in store
+    assert store.stats()["persist_errors"] == 1
+    assert "db bloqueada" in capsys.readouterr().out
+
+
+def test_provisional_sessions_are_bounded_and_promoted():
+    store = SessionStore(new_bot, max_sessions=10, max_provisional=3)
+    for i in range(50):
+        store.get(f"web_{i}", provisional=True)
+    stats = store.stats()
+    assert stats["provisional"] == 3 and stats["sessions"] == 0
+    assert stats["provisional_evicted"] == 47
+
+    bot = store.get("web_49")  # el cliente volvió con la cookie
+    assert store.stats()["promoted"] == 1
+    assert store.get("web_49") is bot
+    assert store.stats()["sessions"] == 1
+
+
+def _overlap(store, uids):
+    """Corre un turno lento por uid en hilos y devuelve el máximo de turnos simultáneos."""
+    active, peak = [0], [0]
+    guard = threading.Lock()
+
+    def worker(uid):
+        with store.turn(uid):
+            with guard:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with guard:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=worker, args=(uid,)) for uid in uids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return peak[0]
+
+
+def test_turns_of_same_uid_are_serialized():
+    store = SessionStore(new_bot)
+    assert _overlap(store, ["a"] * 4) == 1
+    stats = store.stats()
+    assert stats["turns"] == 4 and stats["contended_turns"] >= 1
+    assert stats["lock_wait"]["count"] == 4 and stats["lock_wait"]["mean_us"] > 0
+    assert stats["active_turns"] == 0  # los locks por uid se liberan al terminar
+
+
+def test_turns_of_different_uids_run_in_parallel():
+    store = SessionStore(new_bot)
+    assert _overlap(store, ["a", "b", "c"]) == 3
+    assert store.stats()["contended_turns"] == 0
@@ -77,6 +77,19 @@ def test_inversiones_flow_with_monto_plazo_then_simular_and_aporte_tasa():
     assert ("Simul" in r2.reply) or ("interés" in r2.reply.lower())
 
 
+def test_inversiones_horizon_then_rate_only_asks_for_amount():
+    for tasa in ("tasa 10%", "10%", "al 10%"):
+        bot = ChatBot()
+        bot.process("quiero invertir a 12 meses")
+        r2 = bot.process(tasa)
+        assert r2.scenario == "inversiones"
+        assert "monto" in r2.reply
+        inv = bot.conversation_state['partial_data']['inversion']
+        assert inv == {'monto': None, 'horizonte_meses': 12}
+        r3 = bot.process("150000")
+        assert "$150,000" in r3.reply
+
+
 def test_inversiones_dolar_then_explain_bonos_usd():
     bot = ChatBot()
     r1 = bot.process("dolares o pesos argentinos")
@@ -118,3 +131,14 @@ def test_slang_lucas_and_travel_mapping():
     assert r1.scenario == "presupuesto"
     r2 = bot.process("quiero viajar a japon")
     assert r2.scenario == "ahorro"
+
+
+def test_detect_batch_matches_fresh_bots_without_side_effects(monkeypatch):
+    import chatbot_core
+    writes = []
+    monkeypatch.setattr(chatbot_core, 'log_interaction', lambda *a, **k: writes.append(a))
+    monkeypatch.setattr(chatbot_core, 'UserTurn', lambda *a, **k: writes.append(a))
+    monkeypatch.setattr(chatbot_core, 'update_user_fields', lambda *a, **k: writes.append(a))
+    msgs = [msg for msg, _ in DETECTION_CASES] + [DETECTION_CASES[0][0]]
+    assert ChatBot.detect_batch(msgs) == [ChatBot().detect(m) for m in msgs]
+    assert writes == []
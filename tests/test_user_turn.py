@@ -0,0 +1,104 @@
+import uuid
+
+import pytest
+from sqlalchemy import event
+
+from chatbot_core import ChatBot
+from database import PROFILE_CACHE, UserTurn, engine, get_user
+
+
+@pytest.fixture
+def phone():
+    return f"test_turn_{uuid.uuid4().hex[:10]}"
+
+
+@pytest.fixture
+def commits(monkeypatch, phone):
+    """
+    Cuenta los commits contra la DB que escriben el perfil de `phone` (caché de
+    perfiles en modo write-through). Los de otros usuarios (cambios pendientes
+    de tests anteriores que escribe el hilo de flush) no cuentan.
+    """
+    PROFILE_CACHE.flush()
+    PROFILE_CACHE.clear()
+    monkeypatch.setattr(PROFILE_CACHE, "flush_interval", 0)
+    count = [0]
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if phone in repr(parameters):
+            conn.info["touches_phone"] = True
+
+    def on_commit(conn):
+        if conn.info.pop("touches_phone", False):
+            count[0] += 1
+
+    event.listen(engine, "after_cursor_execute", on_execute)
+    event.listen(engine, "commit", on_commit)
+    yield count
+    event.remove(engine, "commit", on_commit)
+    event.remove(engine, "after_cursor_execute", on_execute)
+
+
+def test_turn_with_profile_changes_commits_once(commits, phone):
+    bot = ChatBot()
+    bot.user_phone = phone
+    bot.process("quiero ahorrar para un auto")
+    bot.process("500000")  # guarda savings_goal
+    assert commits[0] == 2  # alta del usuario + cambio de perfil
+    user = get_user(bot.user_phone)
+    assert user.savings_goal == 500000
+    assert user.last_interaction is not None
+
+
+def test_turn_without_changes_does_not_write(commits, phone):
+    bot = ChatBot()
+    bot.user_phone = phone
+    bot.process("hola")
+    assert commits[0] == 1
+    bot.process("qué es la inflación")
+    bot.process("gracias")
+    assert commits[0] == 1  # last_interaction reciente: sin escrituras
+
+
+def test_user_turn_accumulates_updates_and_ignores_unknown_fields(commits, phone):
+    with UserTurn(phone) as turn:
+        turn.update(monthly_income=1000, savings_purpose="auto")
+        turn.update(total_debt=200, risk_profile=None)
+    assert commits[0] == 1
+    user = get_user(phone)
+    assert (user.monthly_income, user.total_debt) == (1000, 200)
+
+
+def test_user_turn_rolls_back_on_error(commits, phone):
+    with pytest.raises(RuntimeError):
+        with UserTurn(phone) as turn:
+            turn.update(monthly_income=1000)
+            raise RuntimeError
+    assert commits[0] == 0
+    assert get_user(phone) is None
+
+
+def test_failed_turn_does_not_save_partial_profile_changes(commits, phone, monkeypatch):
+    bot = ChatBot()
+    bot.user_phone = phone
+
+    def failing_turn(user_text, when):
+        bot._update_profile(monthly_income=1000)
+        raise RuntimeError
+
+    monkeypatch.setattr(bot, "_process_turn", failing_turn)
+    with pytest.raises(RuntimeError):
+        bot.process("gano 1000")
+    assert commits[0] == 0
+    assert get_user(phone) is None
+
+
+def test_turn_close_errors_are_reported(phone, monkeypatch, capsys):
+    def failing_close(self, commit=True):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(UserTurn, "close", failing_close)
+    bot = ChatBot()
+    bot.user_phone = phone
+    assert bot.process("hola").reply
+    assert "disco lleno" in capsys.readouterr().out
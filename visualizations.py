@@ -4,6 +4,8 @@ Módulo de visualizaciones y gráficos financieros
 import plotly.graph_objects as go
 import json
 
+from calculators import evolucion_interes_compuesto
+
 
 def grafico_presupuesto(necesidades: float, personales: float, ahorro: float) -> str:
     """
@@ -32,25 +34,11 @@ def grafico_interes_compuesto(capital: float, tasa: float, años: int, aporte_me
     """
     Genera gráfico de crecimiento con interés compuesto.
     """
-    meses = años * 12
-    tasa_mensual = (tasa / 100) / 12
-    
-    # Calcular valores mes a mes
-    meses_list = list(range(0, meses + 1))
-    valores = []
-    invertido_total = []
-    
-    monto = capital
-    inv_acum = capital
-    
-    valores.append(capital)
-    invertido_total.append(capital)
-    
-    for mes in range(1, meses + 1):
-        monto = monto * (1 + tasa_mensual) + aporte_mensual
-        inv_acum += aporte_mensual
-        valores.append(monto)
-        invertido_total.append(inv_acum)
+    # Valores mes a mes (vectorizado en calculators)
+    evolucion = evolucion_interes_compuesto(capital, tasa, años, aporte_mensual)
+    meses_list = evolucion["mes"].tolist()
+    valores = evolucion["saldo"].tolist()
+    invertido_total = evolucion["aportado"].tolist()
     
     fig = go.Figure()
     
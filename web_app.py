@@ -1,26 +1,107 @@
 from flask import Flask, request, jsonify, send_from_directory, Response, redirect
 import os
 import hashlib
+import itertools
+import secrets
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
-from chatbot_core import ChatBot, stamp, is_night
+from typing import Optional
+from chatbot_core import INTERACTION_LOG, LOG_AGGREGATES, LOG_ASYNC, LOG_PATH, LOG_STORE, ChatBot, flush_interaction_log, stamp, is_night
+from detect_trace import TRACE_STATS
+from log_store import newest_page
+from session_backend import backend_from_env
+from session_store import SessionStore
 from twilio.twiml.messaging_response import MessagingResponse
-from database import get_or_create_user, update_user_fields, get_user, create_link_token, claim_link_token
+from database import PROFILE_CACHE, UserTurn, get_user, create_link_token, claim_link_token
 
 import json
-from visualizations import (
-    grafico_presupuesto, grafico_interes_compuesto,
-    grafico_comparacion_inversiones
-)
-from calculators import presupuesto_50_30_20, calcular_interes_compuesto
+import numpy as np
+import visualizations
+from amortizacion import CAMPOS as CAMPOS_AMORTIZACION, cronograma
+from calc_cache import CALC_CACHE
+from calculators import presupuesto_50_30_20, calcular_interes_compuesto, grilla_calculo
+from montecarlo import simular_montecarlo
 
 
 app = Flask(__name__, static_folder=str(Path(__file__).parent))
-# Diccionario de bots por usuario para mantener estado conversacional
-user_bots = {}
+
+# Gráficos cacheados junto con las calculadoras (mismos parámetros → mismo JSON de plotly)
+grafico_presupuesto = CALC_CACHE.wrap(visualizations.grafico_presupuesto)
+grafico_interes_compuesto = CALC_CACHE.wrap(visualizations.grafico_interes_compuesto)
+grafico_comparacion_inversiones = CALC_CACHE.wrap(visualizations.grafico_comparacion_inversiones)
 BASE_DIR = Path(__file__).parent
 
 
+
+
+def _new_bot(uid: str) -> ChatBot:
+    bot = ChatBot()
+    bot.user_phone = uid
+    return bot
+
+
+def _restore_bot(uid: str):
+    """Rehidrata una sesión expulsada desde el backend o, si no está, desde el perfil en la DB."""
+    state = session_backend.load(uid)
+    if state is not None:
+        return ChatBot.from_state(state, user_phone=uid)
+    user = get_user(uid)
+    if not user:
+        return None
+    bot = _new_bot(uid)
+    for key, value in (("ingreso", user.monthly_income), ("objetivo_ahorro", user.savings_goal),
+                       ("deuda", user.total_debt)):
+        if value:
+            bot.user_data[key] = value
+    return bot
+
+
+def _persist_bot(uid: str, bot: ChatBot) -> None:
+    session_backend.save(uid, bot.export_state())
+
+
+# Estado conversacional serializado (SESSION_BACKEND=memory|sqlite|redis)
+session_backend = backend_from_env()
+# Bots por usuario (estado conversacional), acotados por LRU + TTL de inactividad
+# (con un backend compartido el estado ya se guarda en cada turno)
+sessions = SessionStore.from_env(
+    _new_bot, restore=_restore_bot, persist=None if session_backend.shared else _persist_bot,
+)
+
+
+def begin_turn(uid: str, provisional: bool = False) -> ChatBot:
+    """Bot de la sesión; con un backend compartido se trae el estado que dejó otro worker."""
+    bot = sessions.get(uid, provisional=provisional)
+    if session_backend.shared and not provisional:
+        state = session_backend.load(uid)
+        if state is not None:
+            bot.import_state(state)
+    return bot
+
+
+def end_turn(uid: str, bot: ChatBot, provisional: bool = False) -> None:
+    # Las sesiones provisorias (sin cookie) no se escriben en el backend
+    sessions.touch(uid)
+    if session_backend.shared and not provisional:
+        _persist_bot(uid, bot)
+
+
+def run_turn(uid: str, text: str, provisional: bool = False, when: Optional[datetime] = None):
+    """
+    Procesa un mensaje en la sesión de uid. Los turnos del mismo uid se
+    serializan (un lock por sesión y, con un backend compartido, el lock del
+    backend entre workers); los de usuarios distintos corren en paralelo.
+    """
+    shared = session_backend.shared and not provisional
+    with sessions.turn(uid), (session_backend.lock(uid) if shared else nullcontext()):
+        # process abre un UserTurn: carga/crea el perfil y hace un solo commit
+        bot = begin_turn(uid, provisional=provisional)
+        res = bot.process(text, when=when)
+        end_turn(uid, bot, provisional=provisional)
+    return res
+
+
 @app.get("/health")
 def health():
     """Endpoint simple de estado para healthchecks"""
@@ -69,10 +150,10 @@ def api_login():
     else:
         return jsonify({"error": "Debes enviar 'dni' o 'nickname'"}), 400
 
-    # Crear/actualizar perfil
-    user = get_or_create_user(user_id, name=name)
-    if name and not user.name:
-        update_user_fields(user_id, name=name)
+    # Crear/actualizar perfil en una sola transacción
+    with UserTurn(user_id) as turn:
+        if name and not turn.user.name:
+            turn.update(name=name)
 
     resp = jsonify({"ok": True, "uid": user_id})
     resp.set_cookie('uid', user_id, max_age=60*60*24*365, samesite='Lax')
@@ -81,6 +162,10 @@ def api_login():
 
 @app.post("/api/logout")
 def api_logout():
+    uid = request.cookies.get('uid')
+    if uid:
+        sessions.discard(uid)
+        session_backend.delete(uid)
     resp = jsonify({"ok": True})
     resp.delete_cookie('uid')
     return resp
@@ -116,20 +201,14 @@ def api_chat():
 
     # Identidad del usuario web por cookie 'uid'
     uid = request.cookies.get('uid')
-    if not uid:
-        # Generar uid simple basado en hora y hash
-        uid = f"web_{hashlib.sha1(str(datetime.now().timestamp()).encode()).hexdigest()[:10]}"
-    
-    # Obtener o crear bot específico para este usuario
-    if uid not in user_bots:
-        user_bots[uid] = ChatBot()
-        user_bots[uid].user_phone = uid
-    bot = user_bots[uid]
-    
-    # Vincular al bot y garantizar perfil en DB
-    get_or_create_user(uid)
+    minted = not uid
+    if minted:
+        # uid nuevo para un cliente sin cookie; su sesión queda como provisoria
+        # hasta que vuelva con la cookie
+        uid = f"web_{secrets.token_hex(5)}"
 
-    res = bot.process(text, when=when)
+    # Turno en la sesión (bot) específica de este usuario
+    res = run_turn(uid, text, provisional=minted, when=when)
     periodo = "noche" if is_night(res.when) else "día"
     resp = jsonify({
         "reply": res.reply,
@@ -145,6 +224,64 @@ def api_chat():
     return resp
 
 
+# Máximo de mensajes por llamada a /api/classify
+CLASSIFY_MAX_MESSAGES = int(os.getenv("CLASSIFY_MAX_MESSAGES", "50000"))
+
+
+@app.post("/api/classify")
+def api_classify():
+    """
+    Clasifica un arreglo JSON de mensajes sin estado ni efectos secundarios
+    (no crea usuarios, no escribe logs). Devuelve los escenarios en el mismo orden.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, list) or not all(isinstance(m, str) for m in data):
+        return jsonify({"error": "Se espera un arreglo JSON de strings"}), 400
+    if len(data) > CLASSIFY_MAX_MESSAGES:
+        return jsonify({"error": f"Máximo {CLASSIFY_MAX_MESSAGES} mensajes por llamada"}), 413
+
+    scenarios = ChatBot.detect_batch(data)
+    return jsonify({
+        "count": len(scenarios),
+        "scenarios": scenarios,
+    })
+
+
+@app.get("/debug/detect")
+def debug_detect():
+    """Contadores por regla e histogramas por etapa de detect (requiere DETECT_TRACE=1)."""
+    recent = request.args.get("recent", default=20, type=int)
+    return jsonify({"enabled": ChatBot.trace_detect, **TRACE_STATS.snapshot(recent)})
+
+
+@app.get("/debug/sessions")
+def debug_sessions():
+    """Tamaño del almacén de sesiones y contadores de hits/misses/expulsiones."""
+    return jsonify({
+        "backend": type(session_backend).__name__,
+        "shared": session_backend.shared,
+        **sessions.stats(),
+    })
+
+
+@app.get("/debug/profiles")
+def debug_profiles():
+    """Caché de perfiles: entradas, pendientes de escribir, hit ratio y latencia de flush."""
+    return jsonify(PROFILE_CACHE.stats())
+
+
+@app.get("/debug/logs-queue")
+def debug_logs_queue():
+    """Cola del log de interacciones: profundidad, filas escritas/descartadas y latencia por lote."""
+    return jsonify({"async": LOG_ASYNC, **INTERACTION_LOG.stats(), "aggregates": LOG_AGGREGATES.stats()})
+
+
+@app.get("/debug/calc-cache")
+def debug_calc_cache():
+    """Caché de calculadoras y gráficos: entradas, hit rate y hits/misses por función."""
+    return jsonify(CALC_CACHE.stats())
+
+
 @app.get("/debug")
 def debug_info():
     """Devuelve información para verificar la carpeta activa en el contenedor."""
@@ -360,7 +497,7 @@ def api_grafico_presupuesto():
         dist['gastos_personales'],
         dist['ahorro_inversion']
     )
-    return jsonify(json.loads(grafico_json))
+    return Response(grafico_json, mimetype="application/json")
 
 
 @app.get("/api/grafico/inversion")
@@ -372,7 +509,7 @@ def api_grafico_inversion():
     aporte = float(request.args.get('aporte', 0))
     
     grafico_json = grafico_interes_compuesto(capital, tasa, años, aporte)
-    return jsonify(json.loads(grafico_json))
+    return Response(grafico_json, mimetype="application/json")
 
 
 @app.get("/api/grafico/comparacion")
@@ -382,7 +519,197 @@ def api_grafico_comparacion():
     años = int(request.args.get('años', 10))
     
     grafico_json = grafico_comparacion_inversiones(monto, años)
-    return jsonify(json.loads(grafico_json))
+    return Response(grafico_json, mimetype="application/json")
+
+
+# Máximo de celdas por grilla en /api/calc/grid
+CALC_GRID_MAX_CELLS = int(os.getenv("CALC_GRID_MAX_CELLS", "200000"))
+
+
+def _valores_grilla(valor):
+    """Escalar, lista o rango {"desde", "hasta", "pasos"} → lo que recibe grilla_calculo."""
+    if isinstance(valor, dict):
+        try:
+            desde, hasta, pasos = float(valor["desde"]), float(valor["hasta"]), int(valor.get("pasos", 10))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Un rango se escribe {"desde": x, "hasta": y, "pasos": n}')
+        if not 1 <= pasos <= CALC_GRID_MAX_CELLS:
+            raise ValueError(f"'pasos' debe estar entre 1 y {CALC_GRID_MAX_CELLS}")
+        return np.linspace(desde, hasta, pasos)
+    return valor
+
+
+def _columnas(resultado: np.ndarray, campos=None) -> dict:
+    """Cada campo del array estructurado como lista anidada (NaN/±inf → null, JSON válido)."""
+    columnas = {}
+    for campo in campos or resultado.dtype.names:
+        valores = resultado[campo]
+        if valores.dtype.kind == "f":
+            finitos = np.isfinite(valores)
+            if not finitos.all():
+                valores = np.where(finitos, valores, None)
+        columnas[campo] = valores.tolist()
+    return columnas
+
+
+@app.post("/api/calc/grid")
+def api_calc_grid():
+    """
+    Tabla de sensibilidad de una calculadora, sin estado.
+    Body: {"calculo": "interes_compuesto", "params": {"capital": 10000,
+           "tasa_anual": [8, 10, 12], "años": {"desde": 1, "hasta": 30, "pasos": 30}}}
+    Cada parámetro con varios valores es un eje; "resultados" trae un arreglo
+    anidado por campo con forma "shape", ejes en el orden de "orden".
+    Por defecto solo va el campo principal (monto_final, cuota_mensual o
+    meses_necesarios); "campos": [...] pide otros. Codificar el JSON cuesta
+    mucho más que calcular la grilla: con 10k celdas, ~1 ms el cálculo, ~6-8 ms
+    por campo pedido (los cuatro de interes_compuesto, ~30 ms).
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("params"), dict):
+        return jsonify({"error": 'Se espera {"calculo": ..., "params": {...}}'}), 400
+    calculo = data.get("calculo", "interes_compuesto")
+    try:
+        params = {k: _valores_grilla(v) for k, v in data["params"].items()}
+        celdas = 1
+        for v in params.values():
+            celdas *= max(np.size(v), 1)
+        if celdas > CALC_GRID_MAX_CELLS:
+            return jsonify({"error": f"Máximo {CALC_GRID_MAX_CELLS} celdas por grilla"}), 413
+        ejes, resultado = grilla_calculo(calculo, params)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # El primer campo de cada dtype de calculators es el principal
+    campos = data.get("campos", list(resultado.dtype.names[:1]))
+    if not isinstance(campos, list) or not set(campos) <= set(resultado.dtype.names):
+        return jsonify({"error": f"'campos' debe ser una lista con: {', '.join(resultado.dtype.names)}"}), 400
+
+    return jsonify({
+        "calculo": calculo,
+        "ejes": {k: v.tolist() for k, v in ejes.items()},
+        # jsonify ordena las claves de "ejes": el orden de los ejes va aparte
+        "orden": list(ejes),
+        "shape": list(resultado.shape),
+        "resultados": _columnas(resultado, campos),
+    })
+
+
+# Filas del cronograma por cada escritura al cliente
+AMORTIZACION_CHUNK_ROWS = int(os.getenv("AMORTIZACION_CHUNK_ROWS", "64"))
+AMORTIZACION_MAX_MESES = int(os.getenv("AMORTIZACION_MAX_MESES", "1200"))
+
+
+def _parse_prepagos(texto: str) -> dict:
+    """"12:50000,24:30000" → {12: 50000.0, 24: 30000.0}"""
+    prepagos = {}
+    for item in filter(None, (p.strip() for p in texto.split(","))):
+        periodo, _, monto = item.partition(":")
+        prepagos[int(periodo)] = prepagos.get(int(periodo), 0.0) + float(monto)
+    return prepagos
+
+
+def _en_bloques(lineas, n: int):
+    bloque = []
+    for linea in lineas:
+        bloque.append(linea)
+        if len(bloque) >= n:
+            yield "".join(bloque)
+            bloque = []
+    if bloque:
+        yield "".join(bloque)
+
+
+@app.get("/api/calc/amortizacion")
+def api_calc_amortizacion():
+    """
+    Cronograma de amortización en streaming (una fila por período, sin armarlo entero).
+    ?monto=1000000&tasa=10&meses=360&sistema=frances|aleman|americano
+    &prepagos=12:50000,24:50000&reducir=plazo|cuota&formato=ndjson|csv
+    """
+    formato = request.args.get("formato", "ndjson")
+    if formato not in ("ndjson", "csv"):
+        return jsonify({"error": "formato debe ser 'ndjson' o 'csv'"}), 400
+    try:
+        meses = int(request.args.get("meses", 12))
+        if meses > AMORTIZACION_MAX_MESES:
+            raise ValueError(f"Máximo {AMORTIZACION_MAX_MESES} meses")
+        filas = cronograma(
+            float(request.args.get("monto", 0)),
+            float(request.args.get("tasa", 0)),
+            meses,
+            sistema=request.args.get("sistema", "frances"),
+            prepagos=_parse_prepagos(request.args.get("prepagos", "")),
+            reducir=request.args.get("reducir", "plazo"),
+        )
+        # El generador valida en la primera fila: los errores salen como 400, no a mitad del stream
+        primera = next(filas)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    filas = itertools.chain([primera], filas)
+
+    if formato == "csv":
+        lineas = itertools.chain(
+            [",".join(CAMPOS_AMORTIZACION) + "\n"],
+            (",".join(str(f[c]) for c in CAMPOS_AMORTIZACION) + "\n" for f in filas),
+        )
+        mimetype = "text/csv"
+    else:
+        lineas = (json.dumps(f) + "\n" for f in filas)
+        mimetype = "application/x-ndjson"
+    return Response(_en_bloques(lineas, AMORTIZACION_CHUNK_ROWS), mimetype=mimetype)
+
+
+# Máximo de celdas (caminos × meses) por simulación en /api/calc/montecarlo
+MONTECARLO_MAX_CELDAS = int(os.getenv("MONTECARLO_MAX_CELDAS", "10000000"))
+
+_PARAMS_MONTECARLO = {
+    "capital": float, "aporte_mensual": float, "meses": int, "rendimiento_anual": float,
+    "volatilidad_anual": float, "inflacion_anual": float, "volatilidad_inflacion": float,
+    "caminos": int, "objetivo": float, "semilla": int,
+}
+
+
+def _bandas_json(bandas: dict) -> dict:
+    return {k: (v.tolist() if k == "mes" else np.round(v, 2).tolist()) for k, v in bandas.items()}
+
+
+@app.post("/api/calc/montecarlo")
+def api_calc_montecarlo():
+    """
+    Simulación Monte Carlo de una inversión con aporte mensual (bandas p10/p50/p90).
+    Body: {"capital": 0, "aporte_mensual": 50000, "meses": 480, "rendimiento_anual": 12,
+           "volatilidad_anual": 15, "inflacion_anual": 30, "objetivo": 1e8, "semilla": 42}
+    (o "años" en lugar de "meses")
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Se espera un objeto JSON con los parámetros"}), 400
+    data = dict(data)
+    extra = set(data) - set(_PARAMS_MONTECARLO) - {"años"}
+    if extra:
+        return jsonify({"error": f"Parámetros desconocidos: {', '.join(sorted(extra))}"}), 400
+    try:
+        if "años" in data:
+            años = data.pop("años")
+            data.setdefault("meses", round(float(años) * 12))
+        params = {k: _PARAMS_MONTECARLO[k](v) for k, v in data.items() if v is not None}
+    except (TypeError, ValueError):
+        return jsonify({"error": "Los parámetros deben ser numéricos"}), 400
+    params.setdefault("capital", 0.0)
+    params.setdefault("aporte_mensual", 0.0)
+    params.setdefault("meses", 120)
+    if params.get("caminos", 10_000) * params["meses"] > MONTECARLO_MAX_CELDAS:
+        return jsonify({"error": f"Máximo {MONTECARLO_MAX_CELDAS} celdas (caminos × meses)"}), 413
+
+    try:
+        r = simular_montecarlo(**params)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except TimeoutError as e:
+        return jsonify({"error": str(e)}), 503
+    r["bandas"] = _bandas_json(r["bandas"])
+    r["bandas_reales"] = _bandas_json(r["bandas_reales"])
+    return jsonify(r)
 
 
 # --- WhatsApp (Twilio) Webhook ---
@@ -403,14 +730,6 @@ def whatsapp_webhook():
 
     # Normalizar id del usuario desde WhatsApp
     user_id = wa_from or "whatsapp_unknown"
-    
-    # Obtener o crear bot específico para este usuario de WhatsApp
-    if user_id not in user_bots:
-        user_bots[user_id] = ChatBot()
-        user_bots[user_id].user_phone = user_id
-    bot = user_bots[user_id]
-    
-    get_or_create_user(user_id)
 
     # Detectar solicitud de vinculación con la web/dashboard
     lower = body.lower()
@@ -423,7 +742,8 @@ def whatsapp_webhook():
         )
         return Response(str(twiml), mimetype="application/xml")
 
-    res = bot.process(body)
+    # Turno en la sesión (bot) específica de este usuario de WhatsApp
+    res = run_turn(user_id, body)
     twiml = MessagingResponse()
     twiml.message(res.reply)
     return Response(str(twiml), mimetype="application/xml")
@@ -440,33 +760,45 @@ def claim_token(token: str):
     return resp
 
 
+def _log_source():
+    """Almacén segmentado si tiene datos; si no, el chat_logs.csv anterior (o None)."""
+    if LOG_STORE.days():
+        return LOG_STORE
+    return LOG_PATH if LOG_PATH.exists() else None
+
+
+@app.get("/api/logs")
+def api_logs():
+    """
+    Página de interacciones, de la más nueva a la más vieja.
+    Filtros: ?page=1&per_page=50&scenario=ahorro&sentiment=negativo&q=tarjeta
+    """
+    # Incluir las interacciones que siguen en la cola del escritor
+    flush_interaction_log(timeout=2.0)
+    source = _log_source()
+    page = request.args.get("page", default=1, type=int)
+    per_page = min(request.args.get("per_page", default=50, type=int), 200)
+    if source is None:
+        return jsonify({"page": page, "per_page": per_page, "rows": [], "has_more": False})
+    return jsonify(newest_page(
+        source, page=page, per_page=per_page,
+        scenario=request.args.get("scenario") or None,
+        sentiment=request.args.get("sentiment") or None,
+        q=(request.args.get("q") or "").strip() or None,
+    ))
+
+
+@app.get("/api/logs/stats")
+def api_logs_stats():
+    """Totales por escenario, sentimiento, emoción y hora (agregados incrementales, sin leer filas)."""
+    flush_interaction_log(timeout=2.0)
+    return jsonify(LOG_AGGREGATES.snapshot())
+
+
 @app.get("/logs")
 def view_logs():
-    """Visualiza las interacciones de los usuarios"""
-    import csv
-    from pathlib import Path
-    
-    log_path = Path(__file__).parent / "chat_logs.csv"
-    
-    if not log_path.exists():
-        return "<h1>No hay logs disponibles</h1>"
-    
-    # Leer logs
-    logs = []
-    with open(log_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        logs = list(reader)
-    
-    # Invertir para mostrar más recientes primero
-    logs.reverse()
-    
-    # Estadísticas rápidas
-    from collections import Counter
-    total = len(logs)
-    scenarios = Counter(log['scenario'] for log in logs)
-    sentiments = Counter(log['sentiment'] for log in logs)
-    
-    html = f"""
+    """Visualiza las interacciones de los usuarios (los datos llegan de /api/logs)"""
+    return """
     <!DOCTYPE html>
     <html>
     <head>
@@ -474,51 +806,51 @@ def view_logs():
         <meta name="viewport" content="width=device-width, initial-scale=1">
         <title>Logs de Interacciones</title>
         <style>
-            * {{ box-sizing: border-box; }}
-            body {{ 
+            * { box-sizing: border-box; }
+            body { 
                 font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Arial, sans-serif; 
                 margin: 0; 
                 padding: 20px; 
                 background: #f5f5f5; 
-            }}
-            .container {{ max-width: 1400px; margin: 0 auto; }}
-            h1 {{ color: #333; margin-bottom: 10px; }}
-            .stats {{ 
+            }
+            .container { max-width: 1400px; margin: 0 auto; }
+            h1 { color: #333; margin-bottom: 10px; }
+            .stats { 
                 display: grid; 
                 grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); 
                 gap: 15px; 
                 margin: 20px 0; 
-            }}
-            .stat-card {{ 
+            }
+            .stat-card { 
                 background: white; 
                 padding: 20px; 
                 border-radius: 8px; 
                 box-shadow: 0 2px 4px rgba(0,0,0,0.1); 
-            }}
-            .stat-value {{ font-size: 32px; font-weight: bold; color: #45B7D1; }}
-            .stat-label {{ color: #666; font-size: 14px; margin-top: 5px; }}
-            .filters {{
+            }
+            .stat-value { font-size: 32px; font-weight: bold; color: #45B7D1; }
+            .stat-label { color: #666; font-size: 14px; margin-top: 5px; }
+            .filters {
                 background: white;
                 padding: 15px;
                 border-radius: 8px;
                 margin: 20px 0;
                 box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            }}
-            .filters input, .filters select {{
+            }
+            .filters input, .filters select {
                 padding: 8px;
                 margin: 0 10px 10px 0;
                 border: 1px solid #ddd;
                 border-radius: 4px;
-            }}
-            table {{ 
+            }
+            table { 
                 width: 100%; 
                 background: white; 
                 border-collapse: collapse; 
                 box-shadow: 0 2px 4px rgba(0,0,0,0.1);
                 border-radius: 8px;
                 overflow: hidden;
-            }}
-            th {{ 
+            }
+            th { 
                 background: #45B7D1; 
                 color: white; 
                 padding: 12px; 
@@ -526,49 +858,49 @@ def view_logs():
                 font-weight: 600;
                 position: sticky;
                 top: 0;
-            }}
-            td {{ padding: 12px; border-bottom: 1px solid #eee; }}
-            tr:hover {{ background: #f9f9f9; }}
-            .timestamp {{ color: #666; font-size: 12px; }}
-            .scenario {{ 
+            }
+            td { padding: 12px; border-bottom: 1px solid #eee; }
+            tr:hover { background: #f9f9f9; }
+            .timestamp { color: #666; font-size: 12px; }
+            .scenario { 
                 display: inline-block; 
                 padding: 4px 8px; 
                 border-radius: 4px; 
                 font-size: 11px; 
                 font-weight: 600;
                 text-transform: uppercase;
-            }}
-            .scenario-presupuesto {{ background: #E3F2FD; color: #1976D2; }}
-            .scenario-ahorro {{ background: #E8F5E9; color: #388E3C; }}
-            .scenario-inversiones {{ background: #FFF3E0; color: #F57C00; }}
-            .scenario-deudas {{ background: #FFEBEE; color: #D32F2F; }}
-            .scenario-educacion {{ background: #F3E5F5; color: #7B1FA2; }}
-            .scenario-calculadora {{ background: #E0F2F1; color: #00796B; }}
-            .scenario-ayuda {{ background: #EEEEEE; color: #616161; }}
-            .sentiment {{ 
+            }
+            .scenario-presupuesto { background: #E3F2FD; color: #1976D2; }
+            .scenario-ahorro { background: #E8F5E9; color: #388E3C; }
+            .scenario-inversiones { background: #FFF3E0; color: #F57C00; }
+            .scenario-deudas { background: #FFEBEE; color: #D32F2F; }
+            .scenario-educacion { background: #F3E5F5; color: #7B1FA2; }
+            .scenario-calculadora { background: #E0F2F1; color: #00796B; }
+            .scenario-ayuda { background: #EEEEEE; color: #616161; }
+            .sentiment { 
                 display: inline-block; 
                 padding: 2px 6px; 
                 border-radius: 3px; 
                 font-size: 10px;
-            }}
-            .sentiment-positivo {{ background: #C8E6C9; color: #2E7D32; }}
-            .sentiment-negativo {{ background: #FFCDD2; color: #C62828; }}
-            .sentiment-neutral {{ background: #E0E0E0; color: #616161; }}
-            .user-msg {{ 
+            }
+            .sentiment-positivo { background: #C8E6C9; color: #2E7D32; }
+            .sentiment-negativo { background: #FFCDD2; color: #C62828; }
+            .sentiment-neutral { background: #E0E0E0; color: #616161; }
+            .user-msg { 
                 color: #333; 
                 font-weight: 500;
                 max-width: 400px;
                 word-wrap: break-word;
-            }}
-            .bot-msg {{ 
+            }
+            .bot-msg { 
                 color: #666; 
                 font-size: 13px;
                 max-width: 500px;
                 word-wrap: break-word;
                 max-height: 100px;
                 overflow-y: auto;
-            }}
-            .back-link {{
+            }
+            .back-link {
                 display: inline-block;
                 padding: 10px 20px;
                 background: #4ECDC4;
@@ -576,47 +908,57 @@ def view_logs():
                 text-decoration: none;
                 border-radius: 6px;
                 margin-right: 10px;
-            }}
-            .back-link:hover {{ background: #42b8ad; }}
-            .analyze-link {{
+            }
+            .back-link:hover { background: #42b8ad; }
+            .analyze-link {
                 display: inline-block;
                 padding: 10px 20px;
                 background: #FF6B6B;
                 color: white;
                 text-decoration: none;
                 border-radius: 6px;
-            }}
-            .analyze-link:hover {{ background: #ee5a52; }}
+            }
+            .analyze-link:hover { background: #ee5a52; }
+            .pager { margin: 15px 0; color: #666; }
+            .pager button {
+                padding: 8px 14px;
+                margin-right: 10px;
+                border: 1px solid #ddd;
+                border-radius: 4px;
+                background: white;
+                cursor: pointer;
+            }
+            .pager button:disabled { opacity: 0.4; cursor: default; }
         </style>
     </head>
     <body>
         <div class="container">
             <h1>📊 Logs de Interacciones del Bot</h1>
-            <p style="color: #666; margin-bottom: 20px;">Total: {total} interacciones registradas</p>
+            <p style="color: #666; margin-bottom: 20px;">Total: <span id="total">…</span> interacciones registradas</p>
             
             <div class="stats">
                 <div class="stat-card">
-                    <div class="stat-value">{scenarios.get('inversiones', 0)}</div>
+                    <div class="stat-value" data-scenario="inversiones">…</div>
                     <div class="stat-label">📈 Inversiones</div>
                 </div>
                 <div class="stat-card">
-                    <div class="stat-value">{scenarios.get('presupuesto', 0)}</div>
+                    <div class="stat-value" data-scenario="presupuesto">…</div>
                     <div class="stat-label">📊 Presupuestos</div>
                 </div>
                 <div class="stat-card">
-                    <div class="stat-value">{scenarios.get('ahorro', 0)}</div>
+                    <div class="stat-value" data-scenario="ahorro">…</div>
                     <div class="stat-label">🏦 Ahorros</div>
                 </div>
                 <div class="stat-card">
-                    <div class="stat-value">{scenarios.get('deudas', 0)}</div>
+                    <div class="stat-value" data-scenario="deudas">…</div>
                     <div class="stat-label">💳 Deudas</div>
                 </div>
                 <div class="stat-card">
-                    <div class="stat-value">{sentiments.get('positivo', 0)}</div>
+                    <div class="stat-value" data-sentiment="positivo">…</div>
                     <div class="stat-label">😊 Positivos</div>
                 </div>
                 <div class="stat-card">
-                    <div class="stat-value">{scenarios.get('ayuda', 0)}</div>
+                    <div class="stat-value" data-scenario="ayuda">…</div>
                     <div class="stat-label">❓ Sin clasificar</div>
                 </div>
             </div>
@@ -657,77 +999,109 @@ def view_logs():
                         <th>Respuesta Bot</th>
                     </tr>
                 </thead>
-                <tbody>
-    """
-    
-    for log in logs[:200]:  # Limitar a 200 más recientes
-        timestamp = log['timestamp'][:16].replace('T', ' ')
-        scenario = log['scenario']
-        sentiment = log['sentiment']
-        emotion = log['emotion']
-        user_msg = log['user'][:100]
-        bot_msg = log['bot'][:200]
-        
-        html += f"""
-                    <tr data-scenario="{scenario}" data-sentiment="{sentiment}">
-                        <td class="timestamp">{timestamp}</td>
-                        <td><span class="scenario scenario-{scenario}">{scenario}</span></td>
-                        <td><span class="sentiment sentiment-{sentiment}">{sentiment}</span></td>
-                        <td>{emotion}</td>
-                        <td class="user-msg">{user_msg}</td>
-                        <td class="bot-msg">{bot_msg}</td>
-                    </tr>
-        """
-    
-    html += """
-                </tbody>
+                <tbody></tbody>
             </table>
+            
+            <div class="pager">
+                <button id="prevPage">← Más nuevos</button>
+                <button id="nextPage">Más viejos →</button>
+                <span id="pageInfo"></span>
+            </div>
         </div>
         
         <script>
-            // Filtros en tiempo real
+            // Filtros y paginación en el servidor (/api/logs)
+            const PER_PAGE = 50;
             const searchBox = document.getElementById('searchBox');
             const scenarioFilter = document.getElementById('scenarioFilter');
             const sentimentFilter = document.getElementById('sentimentFilter');
-            const table = document.getElementById('logsTable');
-            const rows = table.querySelectorAll('tbody tr');
+            const tbody = document.querySelector('#logsTable tbody');
+            const prevPage = document.getElementById('prevPage');
+            const nextPage = document.getElementById('nextPage');
+            let page = 1;
+            let searchTimer = null;
+            
+            function cell(text, className) {
+                const td = document.createElement('td');
+                if (className) td.className = className;
+                td.textContent = text;
+                return td;
+            }
+            
+            function badge(kind, value) {
+                const td = document.createElement('td');
+                const span = document.createElement('span');
+                span.className = `${kind} ${kind}-${value}`;
+                span.textContent = value;
+                td.appendChild(span);
+                return td;
+            }
             
-            function filterTable() {
-                const search = searchBox.value.toLowerCase();
-                const scenario = scenarioFilter.value;
-                const sentiment = sentimentFilter.value;
+            async function loadPage() {
+                const params = new URLSearchParams({page, per_page: PER_PAGE});
+                if (searchBox.value.trim()) params.set('q', searchBox.value.trim());
+                if (scenarioFilter.value) params.set('scenario', scenarioFilter.value);
+                if (sentimentFilter.value) params.set('sentiment', sentimentFilter.value);
+                const data = await (await fetch(`/api/logs?${params}`)).json();
                 
-                rows.forEach(row => {
-                    const text = row.textContent.toLowerCase();
-                    const rowScenario = row.dataset.scenario;
-                    const rowSentiment = row.dataset.sentiment;
-                    
-                    const matchSearch = !search || text.includes(search);
-                    const matchScenario = !scenario || rowScenario === scenario;
-                    const matchSentiment = !sentiment || rowSentiment === sentiment;
-                    
-                    row.style.display = (matchSearch && matchScenario && matchSentiment) ? '' : 'none';
+                tbody.replaceChildren(...data.rows.map(log => {
+                    const tr = document.createElement('tr');
+                    tr.append(
+                        cell((log.timestamp || '').slice(0, 16).replace('T', ' '), 'timestamp'),
+                        badge('scenario', log.scenario),
+                        badge('sentiment', log.sentiment),
+                        cell(log.emotion),
+                        cell((log.user || '').slice(0, 100), 'user-msg'),
+                        cell((log.bot || '').slice(0, 200), 'bot-msg'),
+                    );
+                    return tr;
+                }));
+                prevPage.disabled = page <= 1;
+                nextPage.disabled = !data.has_more;
+                document.getElementById('pageInfo').textContent = `Página ${page}`;
+            }
+            
+            async function loadStats() {
+                const stats = await (await fetch('/api/logs/stats')).json();
+                document.getElementById('total').textContent = stats.rows;
+                document.querySelectorAll('[data-scenario]').forEach(el => {
+                    el.textContent = stats.scenarios[el.dataset.scenario] || 0;
                 });
+                document.querySelectorAll('[data-sentiment]').forEach(el => {
+                    el.textContent = stats.sentiments[el.dataset.sentiment] || 0;
+                });
+            }
+            
+            function resetAndLoad() {
+                page = 1;
+                loadPage();
             }
             
-            searchBox.addEventListener('input', filterTable);
-            scenarioFilter.addEventListener('change', filterTable);
-            sentimentFilter.addEventListener('change', filterTable);
+            searchBox.addEventListener('input', () => {
+                clearTimeout(searchTimer);
+                searchTimer = setTimeout(resetAndLoad, 300);
+            });
+            scenarioFilter.addEventListener('change', resetAndLoad);
+            sentimentFilter.addEventListener('change', resetAndLoad);
+            prevPage.addEventListener('click', () => { page -= 1; loadPage(); });
+            nextPage.addEventListener('click', () => { page += 1; loadPage(); });
             
             function analyzeErrors() {
                 alert('Ejecuta "python analyze_logs.py" en la terminal para ver un análisis completo de errores.');
             }
+            
+            loadStats();
+            loadPage();
         </script>
     </body>
     </html>
     """
-    
-    return html
 
 
 if __name__ == "__main__":
     # Ejecuta el servidor accesible desde cualquier interfaz de red
     debug_enabled = os.getenv("FLASK_DEBUG", "0") == "1"
-    app.run(host="0.0.0.0", port=5000, debug=debug_enabled)
+    # threaded: los turnos del mismo usuario se serializan con SessionStore.turn
+    app.run(host="0.0.0.0", port=5000, debug=debug_enabled, threaded=True)
 
     
\ No newline at end of file